@@ -0,0 +1,181 @@
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .client import Client
+from .objects import Entry, Order, Position
+
+log = logging.getLogger(__name__)
+
+
+class AccountManager(object):
+    """
+    Runs many accounts (api key/secret pairs) from one process: every account's :class:`client.Client` sends its
+    requests through one shared requests.Session, so they reuse one pool of keep-alive connections instead of each
+    opening their own, while auth tokens, order rate limits and (optionally) request rate limits stay per account.
+
+    Fan-out helpers call a method on every account concurrently, on one shared thread pool, and return the results by
+    account label. An account that fails does not fail the others: its exception is returned in place of its result.
+
+    Accounts are given as (secret, api_key) by label. ``request_rate_limit`` gives each account a budget of non-order
+    requests per minute (e.g. 250), and other keyword arguments (e.g. retry_policy, timeout) are passed to every Client.
+
+    .. code-block:: python
+
+        manager = AccountManager({'main': (secret, api_key), 'hedge': (secret2, api_key2)})
+        positions = manager.get_positions()             # {'main': [Position, ...], 'hedge': [...]}
+        for account, position in manager.merge(positions):
+            ...
+
+    :ivar clients:     :class:`client.Client` by account label
+    :ivar session:     the shared requests.Session
+    :ivar max_workers: threads used for fan-out (and connections kept per host), default: 16
+    """
+
+    def __init__(self, accounts: Dict[str, Tuple[str, str]] = None, max_workers: int = 16,
+                 session: requests.Session = None, request_rate_limit: int = None, **client_kwargs):
+        self.max_workers = max_workers
+        self.session = session or self._session(max_workers)
+        self.clients = {}
+        self._request_rate_limit = request_rate_limit
+        self._client_kwargs = client_kwargs
+        self._lock = threading.Lock()
+        self._executor = None
+        for label, (secret, api_key) in (accounts or {}).items():
+            self.add_account(label, secret, api_key)
+
+    @staticmethod
+    def _session(pool_size: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def add_account(self, label: str, secret: str, api_key: str, **client_kwargs) -> Client:
+        """
+        adds an account, replacing any account with the same label
+
+        :returns: the account's client
+        :rtype: client.Client
+        """
+        kwargs = dict(self._client_kwargs, **client_kwargs)
+        kwargs.setdefault('request_rate_limit', self._request_rate_limit)
+        client = Client(secret, api_key, session=self.session, **kwargs)
+        with self._lock:
+            self.clients[label] = client
+        return client
+
+    def remove_account(self, label: str):
+        with self._lock:
+            self.clients.pop(label, None)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='jockmkt-account')
+            return self._executor
+
+    def _selected(self, accounts: Iterable[str] = None) -> Dict[str, Client]:
+        with self._lock:
+            if accounts is None:
+                return dict(self.clients)
+            return {label: self.clients[label] for label in accounts}
+
+    @staticmethod
+    def _call(client: Client, method: Union[str, Callable], args, kwargs):
+        if callable(method):
+            return method(client, *args, **kwargs)
+        return getattr(client, method)(*args, **kwargs)
+
+    def fan_out(self, method: Union[str, Callable], *args, accounts: Iterable[str] = None, **kwargs) -> Dict:
+        """
+        calls a client method (by name, e.g. 'get_positions') or ``method(client)`` for every account concurrently
+
+        :param accounts: labels of the accounts to call, default: all
+        :type accounts: list, optional
+
+        :returns: the result, or the exception raised, by account label
+        :rtype: dict
+        """
+        futures = {label: self._pool().submit(contextvars.copy_context().run, self._call, client, method, args, kwargs)
+                   for label, client in self._selected(accounts).items()}
+        results = {}
+        for label, future in futures.items():
+            try:
+                results[label] = future.result()
+            except Exception as e:
+                log.warning('%s failed for account %s: %s', getattr(method, '__name__', method), label, e)
+                results[label] = e
+        return results
+
+    async def fan_out_async(self, method: Union[str, Callable], *args, accounts: Iterable[str] = None,
+                            **kwargs) -> Dict:
+        """
+        :meth:`fan_out` for asyncio: awaits every account's call on the manager's thread pool without blocking the loop
+        """
+        loop = asyncio.get_event_loop()
+        clients = self._selected(accounts)
+        calls = [loop.run_in_executor(self._pool(), contextvars.copy_context().run, self._call, client, method, args,
+                                      kwargs) for client in clients.values()]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        return dict(zip(clients, results))
+
+    @staticmethod
+    def merge(results: Dict[str, List]) -> List[Tuple[str, object]]:
+        """
+        flattens fan-out results into one list of (account label, item), skipping accounts that failed
+        """
+        return [(label, item) for label, items in results.items() if not isinstance(items, Exception)
+                for item in items]
+
+    def get_positions(self, accounts: Iterable[str] = None) -> Dict[str, List[Position]]:
+        """
+        :returns: every account's positions by account label
+        :rtype: Dict[str, List[objects.Position]]
+        """
+        return self.fan_out('get_positions', accounts=accounts)
+
+    def get_balances(self, accounts: Iterable[str] = None) -> Dict[str, Dict]:
+        """
+        :returns: every account's balances by account label
+        :rtype: Dict[str, dict]
+        """
+        return self.fan_out('get_account_bal', accounts=accounts)
+
+    def get_orders(self, event_id: str = None, active: bool = False,
+                   accounts: Iterable[str] = None) -> Dict[str, List[Order]]:
+        """
+        :returns: every account's orders (first page) by account label
+        :rtype: Dict[str, List[objects.Order]]
+        """
+        return self.fan_out('get_orders', event_id=event_id, active=active, accounts=accounts)
+
+    def get_entries(self, accounts: Iterable[str] = None, **kwargs) -> Dict[str, List[Entry]]:
+        """
+        :returns: every account's entries (first page) by account label
+        :rtype: Dict[str, List[objects.Entry]]
+        """
+        return self.fan_out('get_entries', accounts=accounts, **kwargs)
+
+    def close(self):
+        """
+        shuts down the thread pool and closes the shared session's connections
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
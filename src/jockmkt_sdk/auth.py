@@ -0,0 +1,207 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Optional
+
+from . import timeouts
+from .exception import DeadlineExceeded
+
+log = logging.getLogger(__name__)
+
+_CURRENT = object()
+
+
+class TokenManager(object):
+    """
+    Holds the auth token for one api key and shares it between every :class:`client.Client` (and every thread or asyncio
+    task) using that key. The user should not need to create one directly, :meth:`TokenManager.for_keys` is called by
+    the Client.
+
+    - Only one OAuth request is ever in flight per key: concurrent callers wait for it instead of racing.
+    - Once a token is obtained, a daemon timer refreshes it ``refresh_margin`` seconds before it expires, so requests
+      never pay for the OAuth round-trip.
+    - If ``cache_path`` is given, tokens are persisted to that file and reused across process restarts.
+
+    :ivar api_key:        the api key this token belongs to
+    :ivar cache_path:     path of the json token cache, or None
+    :ivar refresh_margin: how many seconds before expiry the token is refreshed in the background
+    """
+    REFRESH_MARGIN = 300
+    _MANAGERS = {}
+    _MANAGERS_LOCK = threading.Lock()
+
+    def __init__(self, api_key: str, secret: str, fetch: Callable[[str, str], Dict], cache_path: str = None,
+                 refresh_margin: float = None, background_refresh: bool = True):
+        self.api_key = api_key
+        self._secret = secret
+        self._fetch = fetch
+        self.cache_path = cache_path
+        self.refresh_margin = self.REFRESH_MARGIN if refresh_margin is None else refresh_margin
+        self._background_refresh = background_refresh
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._timer = None
+        self._token = None
+        if cache_path is not None:
+            cached = self._read_cache()
+            if cached is not None and not self._expired(cached):
+                log.debug('using cached auth token for %s', api_key)
+                self._store(cached)
+
+    @classmethod
+    def for_keys(cls, api_key: str, secret: str, fetch: Callable[[str, str], Dict], cache_path: str = None) \
+            -> 'TokenManager':
+        """
+        returns the manager shared by every client using this key/secret pair, creating it if necessary
+        """
+        key = f'{api_key}:{secret}'
+        with cls._MANAGERS_LOCK:
+            manager = cls._MANAGERS.get(key)
+            if manager is None:
+                manager = cls(api_key, secret, fetch, cache_path=cache_path)
+                cls._MANAGERS[key] = manager
+            elif cache_path is not None and manager.cache_path is None:
+                manager.cache_path = cache_path
+            return manager
+
+    @property
+    def token(self) -> Optional[Dict]:
+        """
+        the current token as a dict: {'token': str, 'expired_at': 13 digit timestamp}
+        """
+        return self._token
+
+    @token.setter
+    def token(self, auth_dict: Optional[Dict]):
+        with self._lock:
+            self._store(auth_dict)
+
+    @staticmethod
+    def _expired(auth_dict: Dict) -> bool:
+        return auth_dict['expired_at'] < round(time.time() * 1000)
+
+    def get_token(self) -> str:
+        """
+        returns a valid token, fetching one only if there is no valid token yet
+        """
+        auth = self._token
+        if auth is not None and not self._expired(auth):
+            return auth['token']
+        return self.refresh(stale=auth)['token']
+
+    async def get_token_async(self) -> str:
+        """
+        asyncio version of :meth:`get_token`. A refresh runs in the loop's executor, so the loop is never blocked and
+        concurrent tasks share the same in-flight request. The refresh runs in a copy of the task's context, under its
+        :class:`timeouts.Deadline`.
+        """
+        auth = self._token
+        if auth is not None and not self._expired(auth):
+            return auth['token']
+        loop = asyncio.get_event_loop()
+        context = contextvars.copy_context()
+        refreshed = await loop.run_in_executor(None, context.run, self.refresh, auth)
+        return refreshed['token']
+
+    def refresh(self, stale: Optional[Dict] = _CURRENT) -> Dict:
+        """
+        Fetches a new token. If another thread already replaced ``stale`` with a valid token, that token is returned
+        instead, and if a fetch is already in flight the caller waits for its result.
+
+        :param stale: the token the caller considers outdated, default: the current token
+        :type stale:  dict, optional
+
+        :returns: the new token dict
+        :rtype: dict
+        """
+        with self._lock:
+            current = self._token
+            if stale is _CURRENT:
+                stale = current
+            if current is not None and current is not stale and not self._expired(current):
+                return current
+            future = self._inflight
+            owner = future is None
+            if owner:
+                future = self._inflight = Future()
+        if not owner:
+            return self._wait(future)
+
+        try:
+            auth = self._fetch(self.api_key, self._secret)
+        except BaseException as e:
+            with self._lock:
+                self._inflight = None
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._store(auth)
+            self._inflight = None
+        future.set_result(auth)
+        if self.cache_path is not None:
+            self._write_cache(auth)
+        return auth
+
+    @staticmethod
+    def _wait(future: Future) -> Dict:
+        """
+        waits for another caller's fetch, for no longer than the current :class:`timeouts.Deadline` allows
+        """
+        running = timeouts.current()
+        remaining = running.remaining() if running is not None else None
+        try:
+            return future.result(None if remaining is None else max(0.0, remaining))
+        except FutureTimeout:
+            raise DeadlineExceeded(f'deadline of {running.total}s exceeded waiting for an auth token',
+                                   phase='deadline', timings=running.timings())
+
+    def _store(self, auth: Optional[Dict]):
+        """
+        must be called with self._lock held
+        """
+        self._token = auth
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if auth is None or not self._background_refresh:
+            return
+        delay = auth['expired_at'] / 1000 - time.time() - self.refresh_margin
+        if delay > 0:
+            self._timer = threading.Timer(min(delay, threading.TIMEOUT_MAX), self._refresh_in_background, (auth,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _refresh_in_background(self, stale: Dict):
+        try:
+            self.refresh(stale=stale)
+            log.debug('refreshed auth token for %s in the background', self.api_key)
+        except Exception as e:
+            log.warning('background auth token refresh failed: %s', e)
+
+    def _read_cache(self) -> Optional[Dict]:
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f).get(self.api_key)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, auth: Dict):
+        try:
+            try:
+                with open(self.cache_path) as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+            cache[self.api_key] = auth
+            tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            log.warning('could not write auth token cache %s: %s', self.cache_path, e)
@@ -0,0 +1,297 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, List, Union
+
+from .objects import Trade
+
+log = logging.getLogger(__name__)
+
+BAR_FIELDS = ('start', 'open', 'high', 'low', 'close', 'volume', 'notional', 'trades')
+
+Bar = namedtuple('Bar', BAR_FIELDS)
+Bar.__doc__ = """
+An OHLCV bar. ``start`` is the bar's start time in ms, ``notional`` the sum of price * quantity (so notional / volume
+is the bar's VWAP) and ``trades`` the number of trades.
+"""
+
+
+class BarSeries(object):
+    """
+    The bars of one tradeable: the bar being built and a ring buffer of the last ``size`` completed bars, so memory is
+    fixed however long the slate runs. Bars without trades are not created. Created by :class:`TradeAggregator`.
+
+    A bar closes when a trade arrives after its interval, or when :meth:`flush` is called after it. The rolling vwap and
+    volume cover the current bar and the completed bars that started in the last ``window`` seconds, counted back from
+    the latest trade or flush.
+
+    :ivar tradeable_id: the tradeable
+    :ivar interval:     bar length in seconds
+    :ivar size:         completed bars kept
+    :ivar window:       seconds of bars in the rolling vwap and volume, at most ``interval * size``
+    :ivar current:      the bar being built, or None
+    """
+
+    def __init__(self, tradeable_id: str, interval: float = 60, size: int = 500, window: float = 1200):
+        if window > interval * size:
+            raise ValueError('window must not be longer than interval * size seconds')
+        self.tradeable_id = tradeable_id
+        self.interval = interval
+        self.size = size
+        self.window = window
+        self.current = None
+        self._ring = [None] * size
+        self._count = 0
+        # index of the oldest completed bar in the rolling window, and the time it is counted back from
+        self._first = 0
+        self._now = 0
+        self._window_volume = 0.0
+        self._window_notional = 0.0
+
+    def _leave(self):
+        leaving = self._ring[self._first % self.size]
+        self._window_volume -= leaving.volume
+        self._window_notional -= leaving.notional
+        self._first += 1
+
+    def _advance(self, now: int):
+        """moves the rolling window forward to ``now`` (ms)"""
+        self._now = max(self._now, now)
+        cutoff = self._now - self.window * 1000
+        while self._first < self._count and self._ring[self._first % self.size].start < cutoff:
+            self._leave()
+
+    def _close(self) -> Bar:
+        bar = self.current
+        if self._first <= self._count - self.size:
+            # about to be overwritten
+            self._leave()
+        self._ring[self._count % self.size] = bar
+        self._count += 1
+        self._window_volume += bar.volume
+        self._window_notional += bar.notional
+        self.current = None
+        return bar
+
+    def flush(self, now: float) -> Union[Bar, None]:
+        """
+        closes the current bar if its interval has ended by ``now``
+
+        :param now: the time, in ms
+        :returns: the bar closed, if any
+        :rtype: Bar
+        """
+        closed = None
+        if self.current is not None and now >= self.current.start + self.interval * 1000:
+            closed = self._close()
+        self._advance(now)
+        return closed
+
+    def add(self, price: float, quantity: float, timestamp: int) -> Union[Bar, None]:
+        """
+        adds a trade. Trades older than the current bar are counted in the current bar.
+
+        :param timestamp: the trade's created_at, in ms
+        :returns: the bar the trade closed, if it started a new one
+        :rtype: Bar
+        """
+        start = int(timestamp // (self.interval * 1000) * self.interval * 1000)
+        closed = None
+        bar = self.current
+        if bar is not None and start > bar.start:
+            closed = self._close()
+            bar = None
+        if bar is None:
+            self.current = Bar(start, price, price, price, price, quantity, price * quantity, 1)
+        else:
+            self.current = Bar(bar.start, bar.open, max(bar.high, price), min(bar.low, price), price,
+                               bar.volume + quantity, bar.notional + price * quantity, bar.trades + 1)
+        self._advance(timestamp)
+        return closed
+
+    def bars(self, include_current: bool = False) -> List[Bar]:
+        """
+        :returns: the completed bars kept, oldest first, and the current bar if include_current
+        :rtype: List[Bar]
+        """
+        first = max(0, self._count - self.size)
+        bars = [self._ring[i % self.size] for i in range(first, self._count)]
+        if include_current and self.current is not None:
+            bars.append(self.current)
+        return bars
+
+    @property
+    def volume(self) -> float:
+        """volume of the completed bars in the last ``window`` seconds and the current bar"""
+        return self._window_volume + (self.current.volume if self.current is not None else 0)
+
+    @property
+    def vwap(self) -> Union[float, None]:
+        """volume weighted average price of the completed bars in the last ``window`` seconds and the current bar"""
+        notional = self._window_notional + (self.current.notional if self.current is not None else 0)
+        volume = self.volume
+        return notional / volume if volume else None
+
+    def __repr__(self):
+        return str(self.__dict__) + '\n'
+
+
+class TradeAggregator(object):
+    """
+    Aggregates the public trade tape of a socket (the 'event_activity' topic) into OHLCV bars per tradeable, with a rolling
+    VWAP and volume, in fixed-size ring buffers.
+
+    A bar closes when the tradeable's next trade arrives after its interval. So that quiet tradeables' bars close on
+    time too, call :meth:`flush` periodically, e.g. every second from a timer or the socket's loop.
+
+    .. code-block:: python
+
+        aggregator = TradeAggregator(interval=60, size=500, window=900)
+        aggregator.attach(socket_manager)
+        aggregator.subscribe(lambda tradeable_id, bar: print(tradeable_id, bar.close, bar.volume))
+        ...
+        aggregator.flush()
+        print(aggregator.vwap('tdbl_xxx'))
+        bars = aggregator.to_numpy()       # or to_arrow(), for analysis
+
+    :ivar interval: bar length in seconds, default: 60
+    :ivar size:     completed bars kept per tradeable, default: 500
+    :ivar window:   seconds of bars in the rolling vwap and volume, at most ``interval * size``, default: 1200
+    """
+
+    def __init__(self, interval: float = 60, size: int = 500, window: float = 1200):
+        if window > interval * size:
+            raise ValueError('window must not be longer than interval * size seconds')
+        self.interval = interval
+        self.size = size
+        self.window = window
+        self._series = {}
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._managers = []
+
+    def series(self, tradeable_id: str) -> BarSeries:
+        """
+        the tradeable's bars, created empty if necessary
+
+        :rtype: BarSeries
+        """
+        series = self._series.get(tradeable_id)
+        if series is None:
+            series = self._series[tradeable_id] = BarSeries(tradeable_id, self.interval, self.size, self.window)
+        return series
+
+    def add_trade(self, trade: Trade) -> Union[Bar, None]:
+        """
+        :returns: the bar the trade closed, if any
+        :rtype: Bar
+        """
+        with self._lock:
+            closed = self.series(trade.tradeable_id).add(float(trade.price), float(trade.quantity), trade.created_at)
+        if closed is not None:
+            self._notify(trade.tradeable_id, closed)
+        return closed
+
+    def flush(self, now: float = None) -> Dict[str, Bar]:
+        """
+        closes every bar whose interval has ended, without waiting for the tradeable's next trade
+
+        :param now: the time in ms, default: the current time
+        :type now: float, optional
+        :returns: the bars closed, by tradeable_id
+        :rtype: Dict[str, Bar]
+        """
+        if now is None:
+            now = time.time() * 1000
+        closed = {}
+        with self._lock:
+            for tradeable_id, series in self._series.items():
+                bar = series.flush(now)
+                if bar is not None:
+                    closed[tradeable_id] = bar
+        for tradeable_id, bar in closed.items():
+            self._notify(tradeable_id, bar)
+        return closed
+
+    def _notify(self, tradeable_id: str, bar: Bar):
+        for callback in list(self._subscribers):
+            try:
+                callback(tradeable_id, bar)
+            except Exception as e:
+                log.warning('bar subscriber %s failed: %s', callback, e)
+
+    def bars(self, tradeable_id: str, include_current: bool = False) -> List[Bar]:
+        """
+        :rtype: List[Bar]
+        """
+        series = self._series.get(tradeable_id)
+        return series.bars(include_current) if series is not None else []
+
+    def vwap(self, tradeable_id: str) -> Union[float, None]:
+        series = self._series.get(tradeable_id)
+        return series.vwap if series is not None else None
+
+    def volume(self, tradeable_id: str) -> float:
+        series = self._series.get(tradeable_id)
+        return series.volume if series is not None else 0.0
+
+    def _rows(self, tradeable_id: str = None, include_current: bool = False):
+        with self._lock:
+            tradeable_ids = [tradeable_id] if tradeable_id is not None else list(self._series)
+            return [(tid,) + tuple(bar) for tid in tradeable_ids for bar in self.bars(tid, include_current)]
+
+    def to_numpy(self, tradeable_id: str = None, include_current: bool = False):
+        """
+        the bars of one or every tradeable as a numpy structured array with a tradeable_id column (numpy required)
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError('exporting bars to numpy requires numpy: pip install numpy')
+        dtype = [('tradeable_id', 'U40'), ('start', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'),
+                 ('close', 'f8'), ('volume', 'f8'), ('notional', 'f8'), ('trades', 'i8')]
+        return np.array(self._rows(tradeable_id, include_current), dtype=dtype)
+
+    def to_arrow(self, tradeable_id: str = None, include_current: bool = False):
+        """
+        the bars of one or every tradeable as a pyarrow Table (pyarrow required)
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError('exporting bars to arrow requires pyarrow: pip install pyarrow')
+        columns = list(zip(*self._rows(tradeable_id, include_current))) or [()] * (len(BAR_FIELDS) + 1)
+        return pa.table({name: list(column) for name, column in zip(('tradeable_id',) + BAR_FIELDS, columns)})
+
+    def subscribe(self, callback: Callable):
+        """
+        :param callback: called with (tradeable_id, bar) whenever a bar closes
+        :type callback: callable, required
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def on_message(self, message: dict):
+        """
+        socket listener: adds trade messages
+        """
+        obj = message.get(message.get('object'))
+        if isinstance(obj, Trade):
+            self.add_trade(obj)
+
+    def attach(self, socket_manager):
+        """
+        builds bars from a socket manager's trades. Subscribe the manager to the 'event_activity' topic of each event.
+        """
+        socket_manager.add_listener(self.on_message)
+        self._managers.append(socket_manager)
+
+    def detach(self):
+        for manager in self._managers:
+            manager.remove_listener(self.on_message)
+        self._managers = []
@@ -1,19 +1,57 @@
 import asyncio
+import contextvars
+import copy
+import json
+import logging
 import random
 import requests
-from datetime import datetime
+import threading
 import time
-from typing import List, Dict, Union, Iterable, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Union, Iterable, Iterator, Callable, Tuple
 # from exception import JockAPIException
 # from objects import Team, Game, GameLog, Event, Tradeable, Entry, Order, Position, AccountActivity, Entity, \
 #     _case_switch_ent
 # from jm_sockets import sockets, sockets_update
-from .exception import JockAPIException
+from .auth import TokenManager
+from .exception import DeadlineExceeded, JockAPIException
+from .fields import FieldSet, resolve as resolve_fields
+from .interning import STRINGS
+from .parsing import ParsePool
+from .poller import SingleFlight
+from .retry import RetryPolicy
+from . import timeouts
 from .objects import Team, Game, GameLog, Event, Tradeable, Entry, Order, Position, AccountActivity, Entity, \
     _case_switch_ent
-from .jm_sockets import sockets, sockets_update
+from .jm_sockets import sockets, sockets_update, threaded
+from .log import enable_logging, enable_verbose_logging, next_request_id
+from .ratelimit import RateLimiter
 from decimal import Decimal, ROUND_DOWN
 
+log = logging.getLogger(__name__)
+
+
+def _request_auth_token(api_key: str, secret: str) -> Dict:
+    """requests a new auth token from the oauth endpoint. Used by :class:`auth.TokenManager`
+    """
+    payload = {
+        'grant_type': 'client_credentials',
+        'key': str(api_key),
+        'secret': str(secret)
+    }
+    timeout = timeouts.request_timeout(what='auth token request')
+    attempt_started = time.monotonic()
+    try:
+        response = requests.post(f'{Client.BASE_URL}/{Client.API_VERSION}/oauth/tokens', data=payload,
+                                 timeout=timeout).json()
+    except requests.exceptions.Timeout as e:
+        raise timeouts.timeout_error(e, 'post', 'oauth/tokens', attempt_started, timeout) from e
+    if response['status'] == 'error':
+        log.debug('auth token request failed: %s', response.get('message'))
+        raise KeyError("Your authorization keys are not valid!")
+    log.info('Successfully obtained an auth token!')
+    return {'token': response['token']['access_token'], 'expired_at': response['token']['expired_at']}
+
 
 class Client(object):
     """The user should initialize an instance of this class:
@@ -23,6 +61,32 @@ class Client(object):
 
     :ivar secret: The user's secret key: xxx
     :ivar api_key: the user's api key: jm_api_xxx
+    :ivar token_cache: optional path to a json file in which auth tokens are persisted, so that restarting the process
+        does not require a new token. Tokens are shared between every Client using the same keys and refreshed in the
+        background before they expire.
+    :ivar verbose: when True, the SDK's log messages are written to stdout, unless the SDK's logging is already
+        configured (see :func:`log.enable_verbose_logging`). See :func:`log.enable_logging` for finer control (levels,
+        JSON output with request ids and latencies).
+    :ivar registry: optional :class:`registry.Registry`. When set, the entities, teams and tradeables in every response
+        are interned in it, and returned objects point at the registered copies.
+    :ivar parse_pool: optional :class:`parsing.ParsePool`. When set, large list responses (game logs, entities, events,
+        orders) are decoded in worker processes.
+    :ivar freshness: seconds for which a GET response may be reused, by path prefix (e.g. {'balances': 1,
+        'events/': 2}). Identical GETs made concurrently always share one request; within its freshness window a
+        response is also reused by later identical GETs. Any POST or DELETE clears reusable responses, and a GET that
+        was in flight during one is not kept. Each caller receives its own copy of a reused response. At most
+        Client.FRESH_ENTRIES responses are kept. See :attr:`request_stats` for requests saved.
+    :ivar retry_policy: the :class:`retry.RetryPolicy` failed requests are retried under. By default idempotent requests
+        are retried up to 3 times with jittered backoff, and orders are only retried when they were rate limited.
+    :ivar timeout: (connect, read) seconds each attempt of a request may take, or one number for both, default:
+        (3.05, 30). Timeouts raise :class:`exception.RequestTimeout`.
+    :ivar deadline: seconds each call may take in total, auth refresh, retries and their backoffs included, default:
+        None. Remaining retries are cancelled once it passes, raising :class:`exception.DeadlineExceeded`. Use
+        :func:`timeouts.deadline` for per-call limits.
+    :ivar session: optional requests.Session to send requests through, e.g. one shared by many clients so they reuse
+        one pool of connections (see :class:`accounts.AccountManager`)
+    :ivar request_limiter: optional :class:`ratelimit.RateLimiter` of non-order requests for this api key, created
+        when ``request_rate_limit`` is given
 
     """
 
@@ -31,9 +95,11 @@ class Client(object):
     WS_BASE_URL = 'wss://api.jockmkt.net/streaming/'
     _API_KEYS = {}
     _AUTH_TOKEN = {}
-    _AUTH_TOKEN_MAP = {}
     _EXPIRATION = None
     _ATTEMPTS = 0
+    ORDER_RATE_LIMIT = 10
+    ORDER_WORKERS = 4
+    FRESH_ENTRIES = 1024
     LEAGUES = ['nba', 'nfl', 'nhl', 'pga', 'mlb', 'nascar']
     MLB_SCORING = {'at_bat': 0.5, 'single': 2.5, 'double': 3, 'triple': 3.5, 'home_run': 4, 'walk': 2, 'run': 2,
                    'rbi': 2, 'stolen_base': 3, 'strikeout': -1}
@@ -52,14 +118,35 @@ class Client(object):
     ACCOUNT = {}
     balance = {}
 
-    def __init__(self, secret, api_key, request_params=None, verbose=False):
+    def __init__(self, secret, api_key, request_params=None, verbose=False, token_cache=None, registry=None,
+                 parse_pool: ParsePool = None, freshness: Dict[str, float] = None, retry_policy: RetryPolicy = None,
+                 timeout: Union[float, Tuple[float, float]] = timeouts.DEFAULT_TIMEOUT, deadline: float = None,
+                 session: requests.Session = None, request_rate_limit: int = None):
         self._request_params = request_params
         self.secret = secret
         self.api_key = api_key
-        user_auth = Client._AUTH_TOKEN_MAP.get(f'{api_key}:{secret}', None)
-        self.auth = user_auth
+        self.token_manager = TokenManager.for_keys(api_key, secret, _request_auth_token, cache_path=token_cache)
+        self.order_limiter = RateLimiter.shared(f'orders:{api_key}', self.ORDER_RATE_LIMIT)
         self.verbose = verbose
-        self.balance = 0
+        self.registry = registry
+        self.parse_pool = parse_pool
+        self.freshness = dict(freshness or {})
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeout = timeout
+        self.deadline = deadline
+        self.session = session
+        self.request_limiter = None
+        if request_rate_limit is not None:
+            self.request_limiter = RateLimiter.shared(f'requests:{api_key}', request_rate_limit)
+        self.request_stats = {'sent': 0, 'coalesced': 0, 'cached': 0}
+        self._flights = SingleFlight()
+        self._fresh = {}
+        self._fresh_lock = threading.Lock()
+        self._generation = 0
+        self._stats_lock = threading.Lock()
+        self.balance = {}
+        if verbose:
+            enable_verbose_logging()
 
     def _create_path(self, path, api_version=None):
         """generates a path for self._request
@@ -67,43 +154,126 @@ class Client(object):
         api_version = api_version or self.API_VERSION
         return '/{}/{}'.format(api_version, path)
 
-    def _get_auth_token(self):
-        payload = {
-            'grant_type': 'client_credentials',
-            'key': str(self.api_key),
-            'secret': str(self.secret)
-        }
-        response = requests.post(f'{Client.BASE_URL}/{Client.API_VERSION}/oauth/tokens', data=payload).json()
-        if self.verbose:
-            print(response)
-        if response['status'] == 'error':
-            raise KeyError("Your authorization keys are not valid!")
-        else:
-            if self.verbose:
-                print("Successfully obtained an auth token!")
+    @property
+    def auth(self) -> Dict:
+        """the current auth token dict ({'token': str, 'expired_at': int}), shared by every Client with these keys
+        """
+        return self.token_manager.token
 
-        auth_token_dict = {'token': response['token']['access_token'], 'expired_at': response['token']['expired_at']}
-        Client._AUTH_TOKEN_MAP[f'{self.api_key}:{self.secret}'] = auth_token_dict
-        self.auth = auth_token_dict
-        return auth_token_dict['token']
+    @auth.setter
+    def auth(self, auth_dict: Dict):
+        self.token_manager.token = auth_dict
+
+    def _get_auth_token(self):
+        """forces a new auth token. Concurrent callers share a single oauth request.
+        """
+        return self.token_manager.refresh()['token']
 
     @staticmethod
     def _build_auth_header(token):
         return {'Authorization': 'Bearer ' + token}
 
-    def _request(self, method, path, api_version=None, attempt_number=0, **kwargs) -> Dict:
-        """method by which all requests are made
+    @property
+    def requests_saved(self) -> int:
+        """number of GETs answered without a network request, by sharing an in-flight request or a fresh response
+        """
+        return self.request_stats['coalesced'] + self.request_stats['cached']
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.request_stats[stat] += 1
+
+    def _freshness_for(self, path: str) -> float:
+        """the freshness window of the longest configured prefix of path
+        """
+        prefixes = [prefix for prefix in self.freshness if path.startswith(prefix)]
+        return self.freshness[max(prefixes, key=len)] if prefixes else 0
+
+    def _request(self, method, path, api_version=None, raw=False, **kwargs) -> Dict:
+        """method by which all requests are made. Identical concurrent GETs share one request and one parsed result,
+        see Client.freshness. Runs under the current :class:`timeouts.Deadline`, or the client's.
+        """
+        if timeouts.current() is None:
+            with timeouts.deadline(self.deadline):
+                return self._request(method, path, api_version, raw, **kwargs)
+        if method != 'get':
+            self._invalidate()
+            return self._send_with_retries(method, path, api_version, raw, **kwargs)
+        key = (self._create_path(path, api_version), raw, json.dumps(kwargs, sort_keys=True, default=str))
+        ttl = self._freshness_for(path)
+        if ttl:
+            with self._fresh_lock:
+                cached = self._fresh.get(key)
+            if cached is not None and time.monotonic() < cached[0]:
+                self._count('cached')
+                return cached[1] if raw else copy.deepcopy(cached[1])
+        generation = self._generation
+        # a GET issued after a write never joins a flight that started before it
+        res, shared = self._flights.do(key + (generation,), self._send_with_retries, method, path, api_version, raw,
+                                       **kwargs)
+        self._count('coalesced' if shared else 'sent')
+        if ttl and not shared:
+            self._remember(key, res if raw else copy.deepcopy(res), ttl, generation)
+        return res
+
+    def _invalidate(self):
+        """forgets reusable responses, including those of GETs still in flight, after a write
+        """
+        with self._fresh_lock:
+            self._generation += 1
+            self._fresh.clear()
+
+    def _remember(self, key: tuple, res, ttl: float, generation: int):
+        """keeps a GET response for ttl seconds, unless a write happened while it was in flight. Expired responses
+        are pruned, then the oldest, to keep at most FRESH_ENTRIES.
+        """
+        now = time.monotonic()
+        with self._fresh_lock:
+            if generation != self._generation:
+                return
+            self._fresh.pop(key, None)
+            if len(self._fresh) >= self.FRESH_ENTRIES:
+                for stale in [k for k, (expires_at, _) in self._fresh.items() if expires_at <= now]:
+                    del self._fresh[stale]
+                while len(self._fresh) >= self.FRESH_ENTRIES:
+                    del self._fresh[next(iter(self._fresh))]
+            self._fresh[key] = (now + ttl, res)
+
+    def _send_with_retries(self, method, path, api_version=None, raw=False, **kwargs) -> Dict:
+        """sends a request, retrying it under self.retry_policy
+        """
+        def send(attempt_number):
+            return self._send_request(method, path, api_version, attempt_number, raw, **kwargs)
+        return self.retry_policy.call(method, path, send)
+
+    async def request_async(self, method: str, path: str, api_version: str = None, **kwargs) -> Dict:
+        """awaitable request for asyncio applications: attempts run in the event loop's default executor and retry
+        backoffs are awaited, so the loop is never blocked. Responses are decoded json, as with the other methods.
+
+        :param method: 'get', 'post' or 'delete'
+        :type method: str, required
+        :param path: the path after the api version, e.g. 'events/evt_xxx'
+        :type path: str, required
+        :param kwargs: params (get) or data (post)
+
+        :returns: the decoded response
+        :rtype: dict
+        """
+        if timeouts.current() is None:
+            with timeouts.deadline(self.deadline):
+                return await self.request_async(method, path, api_version, **kwargs)
+        if method != 'get':
+            self._invalidate()
+
+        def send(attempt_number):
+            return self._send_request(method, path, api_version, attempt_number, **kwargs)
+        return await self.retry_policy.call_async(method, path, send)
+
+    def _send_request(self, method, path, api_version=None, attempt_number=0, raw=False, **kwargs) -> Dict:
+        """sends a request. With raw=True, successful responses are returned undecoded (bytes).
         """
         response = {}
-        auth = self.auth
-        if auth is None:
-            if self.verbose:
-                print('no auth token')
-            token = self._get_auth_token()
-        elif auth['expired_at'] < round(time.time() * 1000):
-            token = self._get_auth_token()
-        else:
-            token = auth['token']
+        token = self.token_manager.get_token()
 
         if self._request_params:
             kwargs.update(self._request_params)
@@ -114,70 +284,103 @@ class Client(object):
         kwargs['is_test'] = kwargs.get('is_test', {})
 
         full_path = self._create_path(path, api_version)
-        if method == 'get':
-            kwargs['payload'] = kwargs.get('params')
-            response = requests.get('{}{}'.format(self.BASE_URL, full_path), params=kwargs['payload'],
-                                    headers=self._build_auth_header(token))
-
-        if method == 'post':
-            kwargs['payload'] = kwargs.get('data')
-            response = requests.post('{}{}'.format(self.BASE_URL, full_path), data=kwargs['payload'],
-                                     headers=self._build_auth_header(token))
-
-        if method == 'delete':
-            response = requests.delete('{}{}'.format(self.BASE_URL, full_path), headers=self._build_auth_header(token))
-
-        res = self._handle_response(response, method, path, attempt_number=attempt_number, payload=kwargs)
+        if self.request_limiter is not None and (method == 'get' or not path.startswith('orders')):
+            # order posts and deletes are limited separately, by self.order_limiter
+            self.request_limiter.acquire()
+        http = self.session or requests
+        timeout = timeouts.request_timeout(self.timeout, what=f'{method.upper()} {path}')
+        started = time.perf_counter()
+        attempt_started = time.monotonic()
+        try:
+            if method == 'get':
+                kwargs['payload'] = kwargs.get('params')
+                response = http.get('{}{}'.format(self.BASE_URL, full_path), params=kwargs['payload'],
+                                    headers=self._build_auth_header(token), timeout=timeout)
+
+            if method == 'post':
+                kwargs['payload'] = kwargs.get('data')
+                response = http.post('{}{}'.format(self.BASE_URL, full_path), data=kwargs['payload'],
+                                     headers=self._build_auth_header(token), timeout=timeout)
+
+            if method == 'delete':
+                response = http.delete('{}{}'.format(self.BASE_URL, full_path),
+                                       headers=self._build_auth_header(token), timeout=timeout)
+        except requests.exceptions.Timeout as e:
+            raise timeouts.timeout_error(e, method, full_path, attempt_started, timeout) from e
+
+        if log.isEnabledFor(logging.DEBUG):
+            latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            log.debug('%s %s -> %s in %sms', method.upper(), full_path, response.status_code, latency_ms,
+                      extra={'request_id': next_request_id(), 'method': method, 'path': full_path,
+                             'status_code': response.status_code, 'latency_ms': latency_ms,
+                             'attempt': attempt_number})
+
+        res = self._handle_response(response, method, path, attempt_number=attempt_number, raw=raw, payload=kwargs)
 
         return res
 
-    def _handle_response(self, json_response, method, path, attempt_number, **kwargs):
+    def _handle_response(self, json_response, method, path, attempt_number, raw=False, **kwargs):
         """helper to handle api responses and determine exceptions
         """
         if json_response.status_code == 429 and 'tradeable_id' in kwargs['payload']['data']:
-            order = kwargs.get('payload')
-            is_test = order['is_test']
-            return self._retry_order(order['data'], is_test=is_test)
-
-        elif str(json_response.status_code).startswith('50'):
-            payload = kwargs.get('payload')
-            return self._retry_request(json_response, method, path, payload, attempt_number)
+            # resend with the caller's own arguments (is_test, params, ...), not just the order
+            request = {key: value for key, value in kwargs['payload'].items() if key not in ('data', 'payload')}
+            error = JockAPIException.from_response(json_response)
+            return self._retry_order(kwargs['payload']['data'], reset_at=getattr(error, 'reset_at', None), **request)
 
         elif not str(json_response.status_code).startswith('2'):
-            raise JockAPIException(json_response)
+            raise JockAPIException.from_response(json_response)
 
+        if raw:
+            return json_response.content
         try:
-            res = json_response.json()
+            res = json_response.json(object_hook=STRINGS.object_hook)
             return res
         except ValueError:
             raise JockAPIException('Invalid Response: %s' % json_response.text)
 
-    def _retry_request(self, json_response, method, path, payload, attempt_number):
-        max_attempts = 3
-        if attempt_number >= max_attempts:
-            raise JockAPIException(json_response)
-        backoff_times = [3, 10, 30]
-        if self.verbose:
-            print(
-                f"Request failed. Code: {json_response.status_code}, Message: {json_response.json()['message']}. Retrying"
-                f"in {backoff_times[attempt_number]} seconds")
-        time.sleep(backoff_times[attempt_number])
-        response = self._request(method, path, attempt_number=attempt_number + 1, payload=payload['payload'])
-
-        if response['status'] == 'success':
-            return response
-
-    def _retry_order(self, order, **kwargs):
-        next_minute = 60 - datetime.now().second
-        if self.verbose:
-            print(f"You've placed too many orders in the past minute. Sleeping for {next_minute} seconds")
+    def _retry_order(self, order, reset_at: float = None, **kwargs):
+        reset_at = reset_at or (time.time() // 60 + 1) * 60
+        running = timeouts.current()
+        if running is not None and running.remaining() is not None and running.remaining() < reset_at - time.time():
+            raise DeadlineExceeded('the order rate limit resets after the deadline', phase='deadline',
+                                   timings=running.timings(reset_in=round(reset_at - time.time(), 4)))
+        log.warning("You've placed too many orders in the past minute. Sleeping for %.1f seconds",
+                    max(0.0, reset_at - time.time()))
         is_test = kwargs.get('is_test', False)
         if is_test:
-            print('sleeping...')
             return 'successfully rerouted an order that would have failed.'
+        self.order_limiter.exhaust(reset_at)
+        self.order_limiter.acquire()
+        return self._post('orders', data=order, **kwargs)
+
+    @staticmethod
+    def _log_page(path, res):
+        """logs pagination info for list endpoints
+        """
+        if log.isEnabledFor(logging.INFO):
+            log.info('%s: status=%s start=%s limit=%s count=%s', path, res.get('status'), res.get('start'),
+                     res.get('limit'), res.get('count'))
+
+    def _intern(self, obj):
+        """registers a response object in self.registry, if there is one"""
+        if self.registry is None:
+            return obj
+        return self.registry.add(obj)
+
+    def _get_objects(self, path: str, key: str, model: Callable, params: Dict) -> Tuple[List, Dict]:
+        """fetches a list endpoint and builds a ``model`` object from each item of ``response[key]``, in self.parse_pool
+        if there is one. Objects are registered in self.registry.
+
+        :returns: (the objects, the rest of the response)
+        """
+        if self.parse_pool is None:
+            res = self._get(path, params=params)
+            objs = [model(item) for item in res[key]]
         else:
-            time.sleep(next_minute)
-        return self._post('orders', data=order)
+            objs, res = self.parse_pool.parse(self._get(path, params=params, raw=True), key, model)
+        self._log_page(path, res)
+        return [self._intern(obj) for obj in objs], res
 
     def _get(self, path, api_version=None, **kwargs):
         """method for get requests
@@ -197,12 +400,14 @@ class Client(object):
     def get_account_bal(self) -> Dict:
         """method retreiving user's USD balance
         """
-        Client.balance = self._get("balances")['balances']
-        return self._get("balances")['balances']
+        balances = self._get("balances")['balances']
+        self.balance = balances
+        return balances
 
     def get_account(self) -> Dict:
-        Client.ACCOUNT = self._get('account')['account']
-        return self._get('account')['account']
+        account = self._get('account')['account']
+        self.ACCOUNT = account
+        return account
 
     def get_scoring(self, league: str) -> Dict[str, Dict[str, float]]:
         """
@@ -240,12 +445,9 @@ class Client(object):
         if league is not None:
             params['league'] = league
         res = self._get('teams', params=params)
-        print('status: ' + res['status'])
-        print('start: ' + str(res['start']))
-        print('limit: ' + str(res['limit']))
-        print('count: ' + str(res['count']))
+        self._log_page('teams', res)
         for team in res['teams']:
-            teams.append(Team(team))
+            teams.append(self._intern(Team(team)))
         return teams
 
     def get_team(self, team_id: str) -> Team:
@@ -258,7 +460,7 @@ class Client(object):
         :rtype: objects.Team
         """
         team = self._get(f"teams/{team_id}")['team']
-        return Team(team)
+        return self._intern(Team(team))
 
     def get_entities(self, start: int = 0, limit: int = 100, include_team: bool = True, league: str = None,
                      include_count: bool = False) -> Union[List[Entity], Tuple[List[Entity], int]]:
@@ -279,21 +481,13 @@ class Client(object):
         :rtype: List[objects.Entity] | Tuple[List[objects.Entity], int]
         """
         params = {}
-        entities = []
         if league is not None:
             params['league'] = league
         if include_team:
             params['include'] = 'team'
         params['start'] = start * limit
         params['limit'] = limit
-        res = self._get("entities", params=params)
-        if self.verbose:
-            print('status: ' + res['status'])
-            print('start: ' + str(res['start']))
-            print('limit: ' + str(res['limit']))
-            print('count: ' + str(res['count']))
-        for entity in res['entities']:
-            entities.append(_case_switch_ent(entity))
+        entities, res = self._get_objects('entities', 'entities', _case_switch_ent, params)
         if include_count:
             return entities, res['count']
         return entities
@@ -315,7 +509,7 @@ class Client(object):
         else:
             params = {}
         ent = self._get(f"entities/{entity_id}", params=params)['entity']
-        return _case_switch_ent(ent)
+        return self._intern(_case_switch_ent(ent))
 
     def get_games(self, start: int = 0, limit: int = 100, league: str = None, include_count: bool = False) -> \
             Union[List[Game], Tuple[List[Game], int]]:
@@ -342,11 +536,7 @@ class Client(object):
         if league is not None:
             params['league'] = league
         res = self._get('games', params=params)
-        if self.verbose:
-            print('status: ' + res['status'])
-            print('start: ' + str(res['start']))
-            print('limit: ' + str(res['limit']))
-            print('count: ' + str(res['count']))
+        self._log_page('games', res)
         for game in res['games']:
             games.append(Game(game))
         if include_count:
@@ -367,8 +557,8 @@ class Client(object):
 
     def get_game_logs(self, start: int = 0, limit: int = 100, log_id: str = None, entity_id: str = None,
                       game_id: str = None, include_ent: bool = True, include_game: bool = False,
-                      include_team: bool = False, include_count: bool = False) -> Union[
-        List[GameLog], Tuple[List[GameLog], int]]:
+                      include_team: bool = False, include_count: bool = False,
+                      fields: Union[str, FieldSet] = None) -> Union[List[GameLog], Tuple[List[GameLog], int]]:
         """fetch game logs
 
         :param start: Page at which the user wants to start their search, default: 0
@@ -393,6 +583,9 @@ class Client(object):
         :type include_team: bool, optional
         :param include_count: include the count of available game logs for this request as part of a tuple in the return value
         :type include_count: bool, optional
+        :param fields: a :class:`fields.FieldSet` or preset name ('full', 'prices', 'summary') selecting which includes
+            are requested and which fields are built, default: 'full'
+        :type fields: str or fields.FieldSet, optional
 
         :returns: a list of :class:`objects.GameLogs`, containing scoring information for a player in a specific game.
         If include_count == True, it will be at tuple of the list of logs and an integer for count of game logs available.
@@ -401,7 +594,6 @@ class Client(object):
         """
         params = {}
         include = []
-        game_logs = []
         if log_id is not None:
             params['id'] = log_id
         if entity_id is not None:
@@ -414,24 +606,17 @@ class Client(object):
             include.append('entity')
         if include_team:
             include.append('team')
-        if len(include) != 0:
-            params['include'] = str(include)
+        fields = resolve_fields(fields)
+        params.update(fields.params('game_log', include))
         params['start'] = start * limit
         params['limit'] = limit
-        res = self._get("game_logs", params=params)
-        if self.verbose:
-            print('status: ' + res['status'])
-            print('start: ' + str(res['start']))
-            print('limit: ' + str(res['limit']))
-            print('count: ' + str(res['count']))
-        for log in res['game_logs']:
-            game_logs.append(GameLog(log))
+        game_logs, res = self._get_objects('game_logs', 'game_logs', fields.builder('game_log', GameLog), params)
         if include_count:
             return game_logs, res['count']
         return game_logs
 
     def get_events(self, start: int = 0, limit: int = 25, league: str = None, include_sims: bool = False,
-                   include_count: bool = False) \
+                   include_count: bool = False, fields: Union[str, FieldSet] = None) \
             -> Union[
                 List[Event], Tuple[List[Event], int]]:
         """Populates event objects with recent and upcoming events
@@ -447,47 +632,49 @@ class Client(object):
         :type include_sims: bool, optional
         :param include_count: include the count of available events for this request as part of a tuple in the return value
         :type include_count: bool, optional
+        :param fields: a :class:`fields.FieldSet` or preset name ('full', 'prices', 'summary') selecting which includes
+            are requested and which fields are built, default: 'full'
+        :type fields: str or fields.FieldSet, optional
 
         :returns: list of :class:`objects.Events`, containing the event_id and information for each
         :rtype: List[objects.Event]
 
         """
-        print('fetching events')
+        log.debug('fetching events')
         list_events = []
         data = {'start': str(start * limit), 'limit': limit}
         if league is not None:
             data['league'] = league
-        res = self._get('events', params=data)
-        if self.verbose:
-            print('status: ' + res['status'])
-            print('start: ' + str(res['start']))
-            print('limit: ' + str(res['limit']))
-            print('count: ' + str(res['count']))
-        for event in res['events']:
-            if event['league'] != 'simulated_horse_racing':
-                list_events.append(Event(event))
+        fields = resolve_fields(fields)
+        data.update(fields.params('events', []))
+        events, res = self._get_objects('events', 'events', fields.builder('event', Event), data)
+        for event in events:
+            if event.league != 'simulated_horse_racing':
+                list_events.append(event)
             elif include_sims:
-                list_events.append(Event(event))
+                list_events.append(event)
         if include_count:
             return list_events, res['count']
         return list_events
 
-    def get_event(self, event_id: str) -> Event:
+    def get_event(self, event_id: str, fields: Union[str, FieldSet] = None) -> Event:
         """fetch a particular event, by default includes games, payouts and tradeables. This is easier than
         pulling payouts, tradeables, and games separately
 
         :param event_id: The event_id for your chosen event, (e.g. evt_60dbec530d2197a973c5dddcf6f65e12)
         :type event_id: str, required
+        :param fields: a :class:`fields.FieldSet` or preset name ('full', 'prices', 'summary') selecting which includes
+            are requested and which fields are built, default: 'full'
+        :type fields: str or fields.FieldSet, optional
 
         :returns: An :class:`objects.Event`, including its payouts, tradeables and games
         :rtype: objects.Event
 
         """
-        params = {}
-        include = ['tradeables.entity', 'games', 'payouts']
-        params['include'] = str(include)
+        fields = resolve_fields(fields)
+        params = fields.params('event', ['tradeables.entity', 'games', 'payouts'])
         res = self._get(f"events/{event_id}", params=params)
-        return Event(res['event'])
+        return self._intern(fields.builder('event', Event)(res['event']))
 
     def get_event_payouts(self, event_id: str) -> dict:  # should this be appended to the event object itself?
         """get payouts for each rank of an event
@@ -517,25 +704,29 @@ class Client(object):
             games.append(Game(game))
         return games
 
-    def get_event_tradeables(self, event_id: str) -> List[Tradeable]:
+    def get_event_tradeables(self, event_id: str, fields: Union[str, FieldSet] = None) -> List[Tradeable]:
         """get all tradeables in an event
 
         :param event_id: The event_id for your chosen event, (e.g. evt_60dbec530d2197a973c5dddcf6f65e12)
         :type event_id: str, required
+        :param fields: a :class:`fields.FieldSet` or preset name ('full', 'prices', 'summary') selecting which includes
+            are requested and which fields are built, default: 'full'
+        :type fields: str or fields.FieldSet, optional
 
         :returns: a list of :class:`objects.Tradeable` objects participating in the chosen event
         :rtype: List[objects.Tradeable]
 
         """
+        build = resolve_fields(fields).builder('tradeable', Tradeable)
         res = self._get(f"events/{event_id}/tradeables")
         tradeables = []
         for tdbl in res['tradeables']:
-            tradeables.append(Tradeable(tdbl))
+            tradeables.append(self._intern(build(tdbl)))
         return tradeables
 
     def get_entries(self, start: int = 0, limit: int = 10, include_payouts: bool = False,
-                    include_tradeables: bool = False, include_count: bool = False) -> Union[
-        List[Entry], Tuple[List[Entry], int]]:
+                    include_tradeables: bool = False, include_count: bool = False,
+                    fields: Union[str, FieldSet] = None) -> Union[List[Entry], Tuple[List[Entry], int]]:
         """obtain information about events a user has entered
 
         :param start: Page at which the user wants to start their search,
@@ -550,6 +741,9 @@ class Client(object):
         :type include_tradeables: bool, optional
         :param include_count: Include the total entry count as part of a returned tuple
         :type include_count: bool, optional
+        :param fields: a :class:`fields.FieldSet` or preset name ('full', 'prices', 'summary') selecting which includes
+            are requested and which fields are built, default: 'full'
+        :type fields: str or fields.FieldSet, optional
 
         :returns: A list of :class:`objects.Entry` objects, or a tuple of the list and an int representing the total number of entries.
         :rtype: object.Entry | tuple(list[object.Entry], int)
@@ -561,22 +755,20 @@ class Client(object):
             include.append('payouts')
         if include_tradeables:
             include.append('payouts.tradeable')
-        params['include'] = str(include)
+        fields = resolve_fields(fields)
+        params.update(fields.params('entry', include))
+        build = fields.builder('entry', Entry)
         response_list = []
         res = self._get("entries", params=params)
-        if self.verbose:
-            print('status: ' + res['status'])
-            print('start: ' + str(res['start']))
-            print('limit: ' + str(res['limit']))
-            print('count: ' + str(res['count']))
+        self._log_page('entries', res)
         for entry in res['entries']:
-            response_list.append(Entry(entry))
+            response_list.append(self._intern(build(entry)))
         if include_count:
             return response_list, res['count']
         return response_list
 
     def get_entry(self, entry_id: str, include_event: bool = False, include_payouts: bool = False,
-                  include_tradeables: bool = False) -> Entry:
+                  include_tradeables: bool = False, fields: Union[str, FieldSet] = None) -> Entry:
         """Method to obtain information about an event that a user has entered. include_payouts and include_tradeables
         will only provide info after the event is paid out.
 
@@ -589,6 +781,9 @@ class Client(object):
         :type include_payouts: bool, optional
         :param include_tradeables: Include relevant event :class:`object.Tradeable` objects
         :type include_tradeables: bool, optional
+        :param fields: a :class:`fields.FieldSet` or preset name ('full', 'prices', 'summary') selecting which includes
+            are requested and which fields are built, default: 'full'
+        :type fields: str or fields.FieldSet, optional
 
         :returns: a list of :class:`objects.Entry` objects, containing the user's chosen fields
         :rtype: objects.Entry
@@ -602,10 +797,10 @@ class Client(object):
             include.append('payouts')
         if include_tradeables:
             include.append('payouts.tradeable')
-        if len(include) != 0:
-            params['include'] = str(include)
+        fields = resolve_fields(fields)
+        params.update(fields.params('entry', include))
         entry = self._get(f"entries/{entry_id}", params=params)
-        return Entry(entry['entry'])
+        return self._intern(fields.builder('entry', Entry)(entry['entry']))
 
     def create_entry(self, event_id: str) -> Dict:
         """create an entry to an event given an event_id e.g. evt_60dbec530d2197a973c5dddcf6f65e12
@@ -616,7 +811,7 @@ class Client(object):
         try:
             return self._post(f"entries", data={'event_id': event_id})
         except JockAPIException:
-            print('Event already joined.')
+            log.info('Event already joined.')
 
     def place_order(self, id: str, price: float, qty: int = 1, side: str = 'buy', phase: str = 'ipo', **kwargs) \
             -> Union[Order, Dict]:
@@ -642,26 +837,131 @@ class Client(object):
         :returns: A json response with information about the order that was sent
 
         """
+        order = self._build_order(id, price, qty, side, phase, kwargs.get('order_size'))
+        return self._send_order(order, is_test=kwargs.get('is_test', False))
+
+    @staticmethod
+    def _build_order(id: str, price: float, qty: int = 1, side: str = 'buy', phase: str = 'ipo',
+                     order_size: float = None) -> Dict[str, str]:
+        """validates an order and builds its request body, with the price capped at 25 and rounded down to the cent
+        """
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"side must be 'buy' or 'sell', not {side!r}")
+        if phase not in ('ipo', 'live'):
+            raise ValueError(f"phase must be 'ipo' or 'live', not {phase!r}")
         if price > 25:
             price = 25
 
-        if 'order_size' in kwargs:
-            size = kwargs.get('order_size', 0)
-            qty = size // price
+        # str() first: Decimal(5.01) is 5.00999... and would round down to 5.00
+        price = Decimal(str(price)).quantize(Decimal('0.00'), rounding=ROUND_DOWN)
+        if price <= 0:
+            raise ValueError(f'price must be at least 0.01, not {price}')
 
-        price = Decimal(price).quantize(Decimal('0.00'), rounding=ROUND_DOWN)
+        if order_size is not None:
+            qty = int(Decimal(str(order_size)) // price)
+        if int(qty) < 1:
+            raise ValueError(f'order for {id} has a quantity of {qty}, it must be at least 1')
 
         price = "{:.2f}".format(price)
 
-        order = {'tradeable_id': id, 'side': side, 'type': 'limit', 'phase': phase, 'quantity': str(qty),
-                 'limit_price': price}
-        order_response = self._post('orders', data=order, is_test=kwargs.get('is_test', False))
+        return {'tradeable_id': id, 'side': side, 'type': 'limit', 'phase': phase, 'quantity': str(int(qty)),
+                'limit_price': price}
+
+    def _send_order(self, order: Dict[str, str], is_test: bool = False) -> Union[Order, str]:
+        """posts an already built order once the order rate budget allows it
+        """
+        self.order_limiter.acquire()
+        order_response = self._post('orders', data=order, is_test=is_test)
 
         if type(order_response) == str:
             return order_response
 
         return Order(order_response['order'])
 
+    def place_orders(self, orders: Iterable[Dict], max_workers: int = None) \
+            -> Iterator[Tuple[Dict, Union[Order, Exception]]]:
+        """
+        Places many orders concurrently. Every order is validated, capped and rounded before any of them is sent, so a
+        bad order in the batch raises a ValueError and nothing is placed. Orders are then sent by a pool of worker
+        threads, never faster than the order rate limit (10 per clock minute).
+
+        :param orders: a list of dicts taking the same arguments as :meth:`place_order`, e.g.
+            ``{'id': tradeable_id, 'price': 5.5, 'qty': 2, 'side': 'buy', 'phase': 'live'}``
+        :type orders: list of dict, required
+        :param max_workers: number of orders that can be in flight at once, default: Client.ORDER_WORKERS
+        :type max_workers: int, optional
+
+        :returns: an iterator yielding (order request, :class:`objects.Order` or the exception raised) tuples, in the
+            order in which the requests complete. Every order is sent whether or not the iterator is consumed; closing
+            it early (e.g. breaking out of a loop over it) cancels the orders not yet sent.
+        :rtype: Iterator[Tuple[dict, objects.Order | Exception]]
+        """
+        built = []
+        for order in orders:
+            built.append(self._build_order(order.get('id', order.get('tradeable_id')), order['price'],
+                                           order.get('qty', 1), order.get('side', 'buy'), order.get('phase', 'ipo'),
+                                           order.get('order_size')))
+        return self._run_batch(self._send_order, built, max_workers)
+
+    def cancel_orders(self, order_ids: Iterable[str] = None, event_id: str = None, max_workers: int = None) \
+            -> Iterator[Tuple[str, Union[Dict, Exception]]]:
+        """
+        Cancels many orders concurrently, within the order rate limit. Pass either a list of order ids, or an event_id to
+        cancel all of the user's active orders in that event.
+
+        :param order_ids: the order ids to cancel (e.g. ord_601b5ad6538ec34875ee1687c4a657f8)
+        :type order_ids: list of str, optional
+        :param event_id: cancel every active order in this event
+        :type event_id: str, optional
+        :param max_workers: number of cancellations that can be in flight at once, default: Client.ORDER_WORKERS
+        :type max_workers: int, optional
+
+        :returns: an iterator yielding (order_id, deletion response or the exception raised) tuples as they complete.
+            Every cancellation is sent whether or not the iterator is consumed; closing it early stops the rest.
+        :rtype: Iterator[Tuple[str, dict | Exception]]
+        """
+        if (order_ids is None) == (event_id is None):
+            raise ValueError('pass either order_ids or event_id')
+        if event_id is not None:
+            order_ids = [order.order_id for order in self._get_active_orders(event_id)]
+        return self._run_batch(self.delete_order, list(order_ids), max_workers)
+
+    def _get_active_orders(self, event_id: str = None) -> List[Order]:
+        """fetches every page of the user's active orders, optionally for one event
+        """
+        orders, count = self.get_orders(event_id=event_id, active=True, include_count=True)
+        page = 1
+        while len(orders) < count:
+            next_page = self.get_orders(start=page, event_id=event_id, active=True)
+            if not next_page:
+                break
+            orders.extend(next_page)
+            page += 1
+        return orders
+
+    def _run_batch(self, fn: Callable, items: List, max_workers: int = None) -> Iterator[Tuple]:
+        """submits fn(item) for every item to a thread pool and yields (item, result or exception) as they complete.
+        Items run under the caller's deadline, if any. Every item is submitted up front and the pool is shut down at
+        once, so its threads exit when the last item is done whether or not the results are consumed. Closing the
+        iterator early cancels the items that have not started.
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers or self.ORDER_WORKERS)
+        futures = {executor.submit(contextvars.copy_context().run, fn, item): item for item in items}
+        executor.shutdown(wait=False)
+
+        def completed():
+            try:
+                for future in as_completed(futures):
+                    try:
+                        yield futures[future], future.result()
+                    except Exception as e:
+                        yield futures[future], e
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return completed()
+
     # NOTE: the docs for order object > status contain 'outbid' twice
 
     def get_orders(self, start: int = 0, limit: int = 100, event_id: str = None, active: bool = False,
@@ -688,21 +988,13 @@ class Client(object):
 
         """
         params = {'start': start * limit, 'limit': limit}
-        orders = []
         if event_id is not None:
             params['event_id'] = str(event_id)
         if active:
             params['active'] = 'true'
         if updated_after is not None:
             params['updated_after'] = str(updated_after)
-        orders_response = self._get('orders', params=params)
-        if self.verbose:
-            print('status: ' + orders_response['status'])
-            print('start: ' + str(orders_response['start']))
-            print('limit: ' + str(orders_response['limit']))
-            print('count: ' + str(orders_response['count']))
-        for order in orders_response['orders']:
-            orders.append(Order(order))
+        orders, orders_response = self._get_objects('orders', 'orders', Order, params)
         if include_count:
             return orders, orders_response['count']
         return orders
@@ -717,7 +1009,7 @@ class Client(object):
         :rtype: Order
 
         """
-        return Order(self._get(f"orders/{order_id}")['order'])
+        return self._intern(Order(self._get(f"orders/{order_id}")['order']))
 
     def delete_order(self, order_id: str) -> Dict:
         """delete a specific order
@@ -729,11 +1021,12 @@ class Client(object):
         :returns: json response with information about the order deletion
 
         """
+        self.order_limiter.acquire()
         deletion_res = self._delete(f"orders/{order_id}")
         if deletion_res['status'] == 'success':
-            if self.verbose:
-                print('order successfully canceled')
-        print(deletion_res)
+            log.info('order %s successfully canceled', order_id)
+        else:
+            log.debug('order %s deletion response: %s', order_id, deletion_res)
         return deletion_res
 
     def get_positions(self, include_count: bool = False) -> Union[List[Position], Tuple[List[Position], int]]:
@@ -745,9 +1038,7 @@ class Client(object):
         """
         positions = []
         positions_res = self._get("positions")
-        if self.verbose:
-            print('status: ' + positions_res['status'])
-            print('count: ' + str(positions_res['count']))
+        self._log_page('positions', positions_res)
         for position in positions_res['positions']:
             positions.append(Position(position))
         if include_count:
@@ -776,8 +1067,9 @@ class Client(object):
         return acct_activity
 
     def ws_token_generator(self):
-        self._get('account')
-        return self.auth['token']
+        """returns a valid auth token for authenticating the websocket connection
+        """
+        return self.token_manager.get_token()
 
     def get_ws_topics(self) -> Dict[str, Dict]:
         """
@@ -824,3 +1116,64 @@ class Client(object):
         """
         return sockets_update.JockmktSocketManager.create(loop, self, queue, error_handler, subscriptions, callback,
                                                           ws_url=self.WS_BASE_URL)
+
+    def ws_connect_threaded(self, subscriptions: List[Dict], callback: Callable = None,
+                            loop: asyncio.AbstractEventLoop = None, maxsize: int = 10000,
+                            overflow: str = 'drop_oldest', error_handler: Callable = None,
+                            timeout: float = 30) -> threaded.ThreadedSocketManager:
+        """
+        Connect to websockets on a dedicated thread with its own asyncio loop, so slow message handling never delays
+        the socket's reads or pings. Unlike ws_connect_new this is not awaited and needs no loop. See
+        :class:`jm_sockets.threaded.ThreadedSocketManager`.
+
+        :param subscriptions: subscriptions in the same format as ws_connect_new
+        :type subscriptions:  list, required
+        :param callback:      called with each message, on ``loop`` if given, otherwise on a dispatcher thread. Without
+            a callback, read messages with .get()
+        :type callback:       callable, optional
+        :param loop:          the user's asyncio loop to deliver messages to, with call_soon_threadsafe
+        :type loop:           asyncio loop, optional
+        :param maxsize:       messages waiting for the consumer before messages are dropped, default: 10,000
+        :type maxsize:        int, optional
+        :param overflow:      'drop_oldest' or 'drop_newest', default: 'drop_oldest'
+        :type overflow:       str, optional
+        :param error_handler: an async function that handles errors, default: reconnect
+        :type error_handler:  Callable, optional
+        :param timeout:       seconds to wait for the socket thread to start
+        :type timeout:        float, optional
+
+        :returns: the started socket manager; call .stop() when done
+        :rtype: jm_sockets.threaded.ThreadedSocketManager
+        """
+        return threaded.ThreadedSocketManager(self, subscriptions, callback, loop, maxsize, overflow,
+                                              error_handler).start(timeout)
+
+    def stream(self, subscriptions: List[Dict], batch_size: int = None, timeout: float = None,
+               duration: float = None, maxsize: int = 10000, overflow: str = 'drop_oldest') -> threaded.MessageStream:
+        """
+        Websocket messages as a blocking iterator, for synchronous code: the socket runs on a background thread (see
+        ws_connect_threaded) and messages are yielded as they arrive.
+
+        .. code-block:: python
+
+            for message in client.stream([{'endpoint': 'event_activity', 'event_id': event_id}], timeout=60):
+                obj = message[message['object']]
+
+        :param subscriptions: subscriptions in the same format as ws_connect_new
+        :type subscriptions:  list, required
+        :param batch_size:    yield lists of up to batch_size messages instead of single messages
+        :type batch_size:     int, optional
+        :param timeout:       seconds to wait for a message before raising exception.RequestTimeout, default: forever
+        :type timeout:        float, optional
+        :param duration:      seconds after which the stream ends, default: never
+        :type duration:       float, optional
+        :param maxsize:       messages waiting for the consumer before messages are dropped, default: 10,000
+        :type maxsize:        int, optional
+        :param overflow:      'drop_oldest' or 'drop_newest', default: 'drop_oldest'
+        :type overflow:       str, optional
+
+        :returns: the stream; the socket is stopped when iteration ends or the stream is closed
+        :rtype: jm_sockets.threaded.MessageStream
+        """
+        socket = self.ws_connect_threaded(subscriptions, maxsize=maxsize, overflow=overflow)
+        return threaded.MessageStream(socket, batch_size, timeout, duration)
@@ -1,4 +1,57 @@
-from datetime import datetime, timedelta
+import logging
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+_HELPERS = {
+    'bad_request': "try fixing your parameters, or check if you're missing one!",
+    'not_authorized': 'Double check your secret keys, or that your auth token is valid',
+    'event_status': "Please wait for the market to open, or check that you're attempting to trade in an event that is "
+                    "currently open",
+    'invalid_entry': 'Please join this event before attempting to trade!',
+    'not_found': '',
+    'rate_limit': 'You have made too many requests this minute.',
+    'request_failed': 'You have already entered the event or deleted your order',
+    'bad_gateway': 'Maxmimum attempts made to resource with no valid response. Check your network or try again later.',
+    'insufficient_funds': 'You have insufficient funds available for this order.',
+    'mixed_position': 'Close out your current position before placing this order.'
+}
+
+
+def _reset_at(headers) -> Optional[float]:
+    """
+    when a rate limit resets (epoch seconds), from Retry-After (seconds or an HTTP date) or X-RateLimit-Reset /
+    RateLimit-Reset (epoch seconds or milliseconds, or seconds from now) headers
+    """
+    if not isinstance(headers, Mapping):
+        return None
+    now = time.time()
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return now + float(retry_after)
+        except ValueError:
+            try:
+                return parsedate_to_datetime(retry_after).timestamp()
+            except (TypeError, ValueError):
+                pass
+    for header in ('X-RateLimit-Reset', 'RateLimit-Reset'):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        if value > 1e12:
+            return value / 1000
+        if value > 1e9:
+            return value
+        return now + value
+    return None
 
 
 class JockAPIException(Exception):
@@ -11,44 +64,137 @@ class JockAPIException(Exception):
     429 -- rate_limit -- max 10 orders (post, delete) per minute, max 250 other requests per minute. This limit resets
     at the beginning of every new clock minute (e.g 12:00:00, 12:01:00)
     50x -- internal_error -- request failed due to platform or network error. This SDK will automatically retry 3 times.
+
+    Errors raised by the client are instances of the subclass matching the error: :class:`RateLimited`,
+    :class:`AuthError`, :class:`InsufficientFunds`, :class:`EventStatus` or :class:`ServerError`.
+
+    :ivar code:        the api's error type, e.g. 'rate_limit'
+    :ivar message:     the api's error message
+    :ivar helper:      a hint for fixing the error
+    :ivar status_code: the http status code, if the error came from a response
+    :ivar body:        the decoded error response, if any
     """
 
-    def __init__(self, response):
-        now = datetime.now().strftime("%I:%M")
-        rate_limit_reset = (datetime.now() + timedelta(minutes=1)).strftime("%I:%M")
-        _error_dict = {
-            'bad_request': "try fixing your parameters, or check if you're missing one!",
-            'not_authorized': 'Double check your secret keys, or that your auth token is valid',
-            'event_status': "Please wait for the market to open, or check that you're attempting to trade in an event \
-                            that is currently open",
-            'invalid_entry': 'Please join this event before attempting to trade!',
-            'not_found': '',
-            'rate_limit': 'You have placed too many requests since {}. Please wait until {}.'.format(
-                now, rate_limit_reset),
-            'request_failed': 'You have already entered the event or deleted your order',
-            'bad_gateway': 'Maxmimum attempts made to resource with no valid response.\
-                                 Check your network or try again later.',
-            'insufficient_funds': 'You have insufficient funds available for this order.',
-            'mixed_position': 'Close out your current position before placing this order.'
-        }
+    def __init__(self, response=None, body: Dict = None):
         self.code = ""
         self.message = 'unknown error'
         self.helper = ''
+        self.status_code = getattr(response, 'status_code', None)
+        self.body = body
+        if isinstance(response, str):
+            self.message = response
+        elif response is not None and body is None:
+            try:
+                self.body = response.json()
+            except ValueError:
+                self.message = response.content
+        if isinstance(self.body, dict) and 'error' in self.body:
+            log.debug('error response: %s', self.body)
+            self.code = self.body['error']
+            self.message = self.body.get('message', self.message)
+            self.helper = _HELPERS.get(self.code, '')
+        super().__init__(self.message)
+
+    @staticmethod
+    def from_response(response) -> 'JockAPIException':
+        """
+        decodes an error response once and builds the matching exception type
+
+        :rtype: JockAPIException
+        """
         try:
-            json_res = response.json()
+            body = response.json()
         except ValueError:
-            self.message = response.content
-        else:
-            print(json_res)
-            if 'error' in json_res:
-
-                self.code = json_res['error']
-                self.message = json_res['message']
-                self.helper = _error_dict[json_res['error']]
+            body = None
+        code = body.get('error') if isinstance(body, dict) else None
+        status_code = getattr(response, 'status_code', None)
+        exception_type = _BY_CODE.get(code) or _BY_STATUS.get(status_code)
+        if exception_type is None:
+            exception_type = ServerError if str(status_code).startswith('5') else JockAPIException
+        return exception_type(response, body=body)
 
     def __str__(self):
         return 'JockAPIException {}: {} \n{}'.format(self.code, self.message, self.helper)
 
+
+class RateLimited(JockAPIException):
+    """
+    the request exceeded a rate limit (429)
+
+    :ivar reset_at: when the limit resets, in epoch seconds: from the response's Retry-After or rate limit headers, or
+        else the start of the next clock minute, when Jock MKT's limits reset
+    """
+
+    def __init__(self, response=None, body: Dict = None):
+        super().__init__(response, body)
+        self.code = self.code or 'rate_limit'
+        self.reset_at = _reset_at(getattr(response, 'headers', None))
+        if self.reset_at is None:
+            self.reset_at = (time.time() // 60 + 1) * 60
+
+    @property
+    def retry_after(self) -> float:
+        """seconds until the limit resets"""
+        return max(0.0, self.reset_at - time.time())
+
+    def __str__(self):
+        return 'JockAPIException {}: {} \n{} Retry in {:.1f} seconds.'.format(self.code, self.message, self.helper,
+                                                                            self.retry_after)
+
+
+class AuthError(JockAPIException):
+    """the auth token or api keys were rejected (401)"""
+
+
+class InsufficientFunds(JockAPIException):
+    """the account cannot afford the order"""
+
+
+class EventStatus(JockAPIException):
+    """the event is not in a status that allows the request, or the user has not entered it"""
+
+
+class ServerError(JockAPIException):
+    """the api failed to handle the request (5xx)"""
+
+
+class RequestTimeout(JockAPIException):
+    """
+    a request did not complete within its connect or read timeout
+
+    :ivar phase:   'connect', 'read' or 'deadline'
+    :ivar timings: seconds spent and the limits applied: elapsed (the whole call), attempt (the timed out attempt),
+        attempts, total, connect and read
+    """
+
+    def __init__(self, message: str = 'request timed out', phase: str = 'read', timings: Dict = None):
+        super().__init__(message)
+        self.code = 'timeout'
+        self.phase = phase
+        self.timings = dict(timings or {})
+
+    def __str__(self):
+        return 'JockAPIException {}: {} \n{}'.format(self.code, self.message, self.timings)
+
+
+class DeadlineExceeded(RequestTimeout):
+    """the call's overall deadline passed; remaining attempts and retries were cancelled"""
+
+
+_BY_CODE = {
+    'rate_limit': RateLimited,
+    'not_authorized': AuthError,
+    'insufficient_funds': InsufficientFunds,
+    'event_status': EventStatus,
+    'invalid_entry': EventStatus,
+    'bad_gateway': ServerError,
+    'internal_error': ServerError,
+}
+_BY_STATUS = {
+    429: RateLimited,
+    401: AuthError,
+}
+
 # class JockInputException(Exception):
 #     _LEAGUES = []
 #     _LEN_API_KEY = 23
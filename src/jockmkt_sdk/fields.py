@@ -0,0 +1,115 @@
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Union
+
+# how nested objects are named in FieldSet.keep, by the response key that holds them
+_NESTED = {
+    'tradeables': 'tradeable',
+    'games': 'game',
+    'event': 'event',
+    'entity': 'entity',
+    'game': 'game',
+    'team': 'team',
+    'tradeable': 'tradeable',
+}
+
+# keys the object constructors need to be present
+_REQUIRED = {
+    'tradeable': ('id', 'league', 'rank'),
+    'entry': ('id', 'leaderboard'),
+    'entity': ('id', 'league'),
+}
+
+
+class FieldSet(object):
+    """
+    Selects which parts of a response are requested and turned into objects. Hot loops that only need prices can skip
+    downloading and building entity bios, news, games and stats.
+
+    - ``include`` maps the object a method returns ('event', 'events', 'entry' or 'game_log') to the includes to
+      request in place of the method's default (e.g. get_event's ['tradeables.entity', 'games', 'payouts']), trimming
+      the response on the wire. Methods without an entry keep their default.
+    - ``keep`` maps an object name ('event', 'tradeable', 'entry', 'game_log', 'game', 'entity', 'team') to the
+      response keys to keep before the object is built; everything else is dropped, and the corresponding attributes
+      are None (or empty). Objects without an entry are kept whole.
+
+    Pass a FieldSet or the name of a preset in :data:`PRESETS` as the ``fields`` argument of Client.get_event,
+    get_events, get_event_tradeables, get_entries, get_entry and get_game_logs.
+
+    :ivar include: includes to request per object name
+    :ivar keep:    response keys to keep per object name
+    """
+
+    def __init__(self, include: Dict[str, Iterable[str]] = None, keep: Dict[str, Iterable[str]] = None):
+        self.include = {name: list(includes) for name, includes in (include or {}).items()}
+        self.keep = {name: frozenset(keys) | frozenset(_REQUIRED.get(name, ()))
+                     for name, keys in (keep or {}).items()}
+
+    def params(self, name: str, default: List[str]) -> Dict:
+        """
+        the include parameter to request for a method returning ``name`` objects, in place of ``default``
+        """
+        include = self.include.get(name, default)
+        return {'include': str(include)} if include else {}
+
+    def trim(self, name: str, item: Dict) -> Dict:
+        """
+        drops the keys of a response item (and of its nested objects) that are not kept
+        """
+        keep = self.keep.get(name)
+        if keep is not None:
+            item = {key: value for key, value in item.items() if key in keep}
+        for key, nested_name in _NESTED.items():
+            value = item.get(key)
+            if key == name or nested_name not in self.keep or not value:
+                continue
+            if isinstance(value, list):
+                item[key] = [self.trim(nested_name, nested) for nested in value]
+            elif isinstance(value, dict):
+                item[key] = self.trim(nested_name, value)
+        return item
+
+    def builder(self, name: str, model: Callable) -> Callable:
+        """
+        a function building ``model`` from trimmed items, e.g. for a :class:`parsing.ParsePool`
+        """
+        if not self.keep:
+            return model
+        return partial(_build, self, name, model)
+
+    def __repr__(self):
+        return str(self.__dict__) + '\n'
+
+
+def _build(fields: FieldSet, name: str, model: Callable, item: Dict):
+    return model(fields.trim(name, item))
+
+
+_EVENT_SUMMARY = ('id', 'name', 'type', 'status', 'league', 'updated_at', 'ipo_open_at', 'live_at_estimated',
+                  'close_at_estimated', 'amount_completed')
+_TRADEABLE_PRICES = ('id', 'event_id', 'entity_id', 'league', 'updated_at', 'focus_game_id', 'points', 'rank',
+                     'price')
+
+PRESETS = {
+    'full': FieldSet(),
+    # prices, points and ranks of an event's tradeables, without entities, games, payouts or stats
+    'prices': FieldSet(include={'event': ['tradeables']},
+                       keep={'event': _EVENT_SUMMARY + ('tradeables',), 'tradeable': _TRADEABLE_PRICES}),
+    # event status and timing, and entry standings, without tradeables, games or payouts
+    'summary': FieldSet(include={'event': [], 'entry': []},
+                        keep={'event': _EVENT_SUMMARY, 'entry': ('event_id', 'updated_at')}),
+}
+
+
+def resolve(fields: Union[str, FieldSet, None]) -> FieldSet:
+    """
+    :returns: the FieldSet for a preset name, FieldSet or None (the 'full' preset)
+    :rtype: FieldSet
+    """
+    if fields is None:
+        return PRESETS['full']
+    if isinstance(fields, FieldSet):
+        return fields
+    try:
+        return PRESETS[fields]
+    except KeyError:
+        raise KeyError(f'unknown field preset {fields}, please choose from: {list(PRESETS)}')
@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Union
+
+from .objects import Game
+
+log = logging.getLogger(__name__)
+
+# where each league keeps the score (in home_info / away_info) and the period (in state)
+SCORE_KEYS = ('points', 'runs', 'score')
+PERIOD_KEYS = ('period', 'quarter', 'inning', 'last_inning', 'round', 'lap')
+FINAL_STATUSES = ('final', 'closed', 'complete', 'completed')
+TRANSITIONS = ('update', 'score', 'period_end', 'status', 'final')
+
+
+def _first(info: Dict, keys):
+    for key in keys:
+        value = info.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+class GameState(object):
+    """
+    The live state of one game, updated in place by :class:`GameStateEngine`. Updates are merged into ``state``,
+    ``home_info`` and ``away_info`` key by key, so a message carrying only some keys does not erase the rest.
+
+    :ivar game_id:          the game
+    :ivar league:           the game's league
+    :ivar status:           scheduled, in_progress, final, ...
+    :ivar period:           the current period, quarter, inning, round or lap, from ``state``
+    :ivar clock:            the game clock, from ``state``, if the league has one
+    :ivar home_score:       home points (or runs)
+    :ivar away_score:       away points (or runs)
+    :ivar amount_completed: fraction of the game completed
+    :ivar state:            the merged ``Game.state`` dict
+    :ivar home_info:        the merged ``Game.home_info`` dict
+    :ivar away_info:        the merged ``Game.away_info`` dict
+    :ivar history:          (timestamp, status, period, clock, home_score, away_score, amount_completed) after each
+                            change, oldest first, bounded by the engine's ``history``
+    :ivar updated:          time.time() of the last change
+    """
+
+    def __init__(self, game_id: str, league: str = None, history: int = 1000):
+        self.game_id = game_id
+        self.league = league
+        self.status = None
+        self.period = None
+        self.clock = None
+        self.home_score = None
+        self.away_score = None
+        self.amount_completed = None
+        self.state = {}
+        self.home_info = {}
+        self.away_info = {}
+        self.history = deque(maxlen=history)
+        self.updated = None
+
+    @property
+    def score(self):
+        """(home_score, away_score)"""
+        return self.home_score, self.away_score
+
+    @property
+    def final(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+    def __repr__(self):
+        return str(self.__dict__) + '\n'
+
+    def __str__(self):
+        return str(self.__dict__) + '\n'
+
+
+class GameStateEngine(object):
+    """
+    Keeps a :class:`GameState` per game_id from the 'games' websocket topic (or REST responses), applying each update
+    incrementally, and calls back on the transitions strategies react to, so they don't need to diff raw dicts:
+
+    - 'score': the score changed, called with (state, old (home, away), new (home, away))
+    - 'period_end': the period advanced, called with (state, the period that ended, the new period)
+    - 'status': the status changed, called with (state, old status, new status)
+    - 'final': the game became final, called with (state, old status, new status)
+    - 'update': anything tracked changed, called with (state, None, None)
+
+    Callbacks run synchronously on the thread that delivered the message, in registration order; keep them short.
+
+    .. code-block:: python
+
+        engine = GameStateEngine()
+        engine.on('score', lambda game, old, new: print(game.game_id, old, '->', new))
+        engine.attach(socket_manager)    # subscribed to the 'games' topic
+
+    :ivar history: how many changes to keep in each GameState.history, default: 1000
+    """
+
+    def __init__(self, history: int = 1000):
+        self.history = history
+        self._games = {}
+        self._callbacks = {transition: [] for transition in TRANSITIONS}
+        self._lock = threading.Lock()
+        self._managers = []
+
+    def on(self, transition: str, callback: Callable):
+        """
+        :param transition: one of 'update', 'score', 'period_end', 'status' or 'final'
+        :type transition: str, required
+        :param callback: called with (game state, old value, new value)
+        :type callback: callable, required
+        """
+        if transition not in self._callbacks:
+            raise ValueError(f'unknown transition {transition}, please choose from: {TRANSITIONS}')
+        if callback not in self._callbacks[transition]:
+            self._callbacks[transition].append(callback)
+
+    def off(self, transition: str, callback: Callable):
+        if callback in self._callbacks.get(transition, ()):
+            self._callbacks[transition].remove(callback)
+
+    def state(self, game_id: str) -> Union[GameState, None]:
+        """
+        :rtype: GameState
+        """
+        return self._games.get(game_id)
+
+    def states(self) -> List[GameState]:
+        """
+        :rtype: List[GameState]
+        """
+        return list(self._games.values())
+
+    @staticmethod
+    def _snapshot(game_state: GameState) -> tuple:
+        return (game_state.status, game_state.period, game_state.clock, game_state.home_score, game_state.away_score,
+                game_state.amount_completed)
+
+    def _fire(self, transition: str, game_state: GameState, old, new):
+        for callback in self._callbacks[transition]:
+            try:
+                callback(game_state, old, new)
+            except Exception as e:
+                log.warning('game state %s callback %s failed: %s', transition, callback, e)
+
+    def apply(self, game: Union[Game, Dict]) -> List[str]:
+        """
+        merges a game update into its state and fires callbacks
+
+        :param game: a Game, or a game dict from the api
+        :returns: the transitions that occurred, e.g. ['score', 'update']
+        :rtype: List[str]
+        """
+        if isinstance(game, dict):
+            game = Game(game)
+        with self._lock:
+            game_state = self._games.get(game.game_id)
+            if game_state is None:
+                game_state = self._games[game.game_id] = GameState(game.game_id, game.league, self.history)
+            if game.state:
+                game_state.state.update(game.state)
+            if game.home_info:
+                game_state.home_info.update(game.home_info)
+            if game.away_info:
+                game_state.away_info.update(game.away_info)
+
+            old = self._snapshot(game_state)
+            if game.status is not None:
+                game_state.status = game.status
+            if game.amount_completed is not None:
+                game_state.amount_completed = game.amount_completed
+            game_state.period = _first(game_state.state, PERIOD_KEYS)
+            game_state.clock = game_state.state.get('clock')
+            game_state.home_score = _first(game_state.home_info, SCORE_KEYS)
+            game_state.away_score = _first(game_state.away_info, SCORE_KEYS)
+            new = self._snapshot(game_state)
+
+            transitions = []
+            if new == old:
+                return transitions
+            old_status, old_period, _, old_home, old_away, _ = old
+            old_score = (old_home, old_away)
+            if game_state.score != old_score and old_score != (None, None):
+                transitions.append('score')
+            if old_period is not None and game_state.period != old_period:
+                transitions.append('period_end')
+            if old_status is not None and game_state.status != old_status:
+                transitions.append('status')
+                if game_state.final:
+                    transitions.append('final')
+            transitions.append('update')
+            game_state.updated = time.time()
+            game_state.history.append((game_state.updated,) + new)
+        olds = {'score': old_score, 'period_end': old_period, 'status': old_status, 'final': old_status}
+        news = {'score': game_state.score, 'period_end': game_state.period, 'status': game_state.status,
+                'final': game_state.status}
+        for transition in transitions:
+            self._fire(transition, game_state, olds.get(transition), news.get(transition))
+        return transitions
+
+    def on_message(self, message: dict):
+        """
+        socket listener: applies game messages
+        """
+        obj = message.get(message.get('object'))
+        if isinstance(obj, (Game, dict)) and message.get('object') == 'game':
+            self.apply(obj)
+
+    def attach(self, socket_manager):
+        """
+        keeps the engine up to date with a socket manager subscribed to the 'games' topic
+        """
+        socket_manager.add_listener(self.on_message)
+        self._managers.append(socket_manager)
+
+    def detach(self):
+        for manager in self._managers:
+            manager.remove_listener(self.on_message)
+        self._managers = []
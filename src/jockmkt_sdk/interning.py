@@ -0,0 +1,88 @@
+import json
+import threading
+
+# enum-like fields whose values repeat across responses, in addition to 'id' and every '*_id' field
+INTERN_FIELDS = frozenset({'object', 'league', 'status', 'type', 'side', 'phase', 'currency', 'position', 'topic'})
+
+
+class InternTable(object):
+    """
+    A bounded table of canonical strings. Identifiers (``evt_…``, ``en_…``, ``tdbl_…``) and enum-like values are
+    repeated in every response and websocket frame; decoding through :meth:`loads` makes every occurrence of a value
+    share one string object, so long-lived objects built from many frames don't each hold their own copy.
+
+    When the table reaches ``max_size`` it is cleared and starts over, which bounds its memory without any per-lookup
+    bookkeeping; strings already shared stay shared.
+
+    :ivar max_size: maximum number of strings held, default: 100,000
+    :ivar hits:     lookups that returned an existing string
+    :ivar misses:   lookups that added a new string
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._table = {}
+        self._lock = threading.Lock()
+
+    def intern(self, value: str) -> str:
+        """
+        :returns: the canonical copy of ``value``
+        :rtype: str
+        """
+        canonical = self._table.get(value)
+        if canonical is not None:
+            self.hits += 1
+            return canonical
+        with self._lock:
+            if len(self._table) >= self.max_size:
+                self._table.clear()
+            canonical = self._table.setdefault(value, value)
+        self.misses += 1
+        return canonical
+
+    def object_hook(self, obj: dict) -> dict:
+        """
+        a json ``object_hook`` interning the id and enum-like string values of each decoded dict
+        """
+        for key, value in obj.items():
+            if type(value) is str and (key in INTERN_FIELDS or key == 'id' or key.endswith('_id')):
+                obj[key] = self.intern(value)
+        return obj
+
+    def loads(self, s):
+        """
+        json.loads, interning ids and enum-like values
+        """
+        return json.loads(s, object_hook=self.object_hook)
+
+    def intern_tree(self, value):
+        """
+        interns the ids and enum-like values of already decoded json (e.g. received from another process), in place
+
+        :returns: value
+        """
+        if type(value) is dict:
+            for item in value.values():
+                if type(item) is dict or type(item) is list:
+                    self.intern_tree(item)
+            self.object_hook(value)
+        elif type(value) is list:
+            for item in value:
+                if type(item) is dict or type(item) is list:
+                    self.intern_tree(item)
+        return value
+
+    def __len__(self):
+        return len(self._table)
+
+
+STRINGS = InternTable()
+
+
+def loads(s):
+    """
+    decodes a JSON document with the shared :data:`STRINGS` table
+    """
+    return STRINGS.loads(s)
@@ -6,6 +6,8 @@ import sys
 # sys.path.insert(1, '..')
 # from objects import Game, Event, Tradeable, Entry, Order, Position, PublicOrder, Trade, Balance
 from ..objects import Game, Event, Tradeable, Entry, Order, Position, PublicOrder, Trade, Balance
+from .. import interning
+from .writer import SocketWriter, subscription_args
 import ssl
 import certifi
 import websockets as ws
@@ -35,6 +37,7 @@ class ReconnectWebsocket:
         self._client = client
         self._socket = None
         self._reconnect_attempts = 0
+        self._writer = SocketWriter()
         self.log = logging.getLogger(__name__)
         self.url = url
         self.ssl_context = ssl.create_default_context()
@@ -58,7 +61,7 @@ class ReconnectWebsocket:
         """
         instantiates a singular websocket task
         """
-        print("connecting")
+        self.log.debug('connecting to %s', self.url)
         self.conn = asyncio.ensure_future(self._run(), loop=self._loop)
 
     async def _run(self):
@@ -69,13 +72,14 @@ class ReconnectWebsocket:
             self._socket = socket
             self._reconnect_attempts = 0
             try:
-                await self.send_message(self.AUTH_DICT)
+                await socket.send(json.dumps(self.AUTH_DICT))
                 await self._socket.recv()
+                self._writer.attach(socket)
                 async for message in socket:
                     await self._coroutine(message)
 
             except ws.ConnectionClosedError as on_close:
-                self.log.debug(f'Connection terminated with an error: {on_close}')
+                self.log.debug('Connection terminated with an error: %s', on_close)
                 await self._error_handler(message, on_close)
 
             except asyncio.CancelledError:
@@ -83,9 +87,12 @@ class ReconnectWebsocket:
                 exit(0)
 
             except Exception as e:
-                self.log.debug(f'unknown ws exception: {e}')
+                self.log.debug('unknown ws exception: %s', e)
                 await self._error_handler(message, e)
 
+            finally:
+                self._writer.detach()
+
     async def reconnect(self):
         """
         An error handler is required, so this is a good option! it just attempts to reconnect upon failure
@@ -94,8 +101,8 @@ class ReconnectWebsocket:
         self._reconnect_attempts += 1
         if self._reconnect_attempts < self.MAX_RECONNECTS:
             wait = self._get_reconnect_wait(self._reconnect_attempts)
-            self.log.debug(f'websockets reconnecting. Attempting {self._reconnect_attempts} more times after waiting '
-                           f'{wait} seconds')
+            self.log.debug('websockets reconnecting. Attempting %s more times after waiting %s seconds',
+                           self._reconnect_attempts, wait)
             self._connect()
         else:
             self.log.error('websocket could not reconnect after 5 attempts.')
@@ -109,19 +116,16 @@ class ReconnectWebsocket:
     async def send_message(self, msg, retry_count=0):
         """
         send a message to the websocket (i.e. subscribe or unsubscribe). The user typically should not need to use this.
+        The message is queued and written as soon as the connection is authenticated, this returns immediately.
         """
-        if not self._socket:
-            if retry_count < 5:
-                await asyncio.sleep(1)
-                await self.send_message(msg, retry_count + 1)
-        else:
-            await self._socket.send(json.dumps(msg))
+        self._writer.send(msg)
 
     async def cancel(self):
         """
         cancels the instance of websocket connection
         """
         try:
+            self._writer.close()
             self.conn.cancel()
         except asyncio.CancelledError:
             pass
@@ -149,6 +153,8 @@ class JockmktSocketManager:
         self.messages = iterable
         self.balances = {}
         self._callback = None
+        self._listeners = []
+        self.log = logging.getLogger(__name__)
         self.conn = None
         self._loop = None
         self._client = None
@@ -165,7 +171,6 @@ class JockmktSocketManager:
         self._callback = callback
         self._error_handler = exception_handler
         self.conn = ReconnectWebsocket(loop, client, self._recv, self.exception_handler, ws_url)
-        # print(type(self.conn))
         return self
 
     async def reconnect(self):
@@ -237,16 +242,43 @@ class JockmktSocketManager:
         """
         handle incoming messages. The user should pass their event handling function in as an arg to callback
         """
-        if self.messages is not None:
-            messsage = json.loads(msg)
+        if self.messages is not None or self._listeners:
+            messsage = interning.loads(msg)
             type = messsage['object']
             obj = self._wsfeed_case_switcher(type, messsage)
             messsage[type] = obj
-            self.messages.append(messsage)
+            if self.messages is not None:
+                self.messages.append(messsage)
+            self._notify(messsage)
         if self._callback is not None:
 
             await self._callback(msg)
 
+    def add_listener(self, listener: typing.Callable):
+        """
+        Register a function that is called with every decoded message (the same dict that is appended to messages),
+        e.g. to record ticks. Listeners run in the websocket's loop, so they should be quick.
+
+        :param listener: a function accepting one message dict
+        :type listener:  callable, required
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: typing.Callable):
+        """
+        Stop calling a listener registered with add_listener
+        """
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, message: dict):
+        for listener in self._listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                self.log.debug('websocket listener %s failed: %s', listener, e)
+
     async def subscribe(self, topic: str, id: str = None, league: str = None):
         """
         Subscribe to a chosen topic or event.
@@ -261,7 +293,8 @@ class JockmktSocketManager:
         topics = self.PUBLIC_TOPICS.keys()
         if topic not in topics:
             raise KeyError(f'please choose from the following topics: {list(topics)}')
-        self._subscriptions.append((topic, id, league))
+        if (topic, id, league) not in self._subscriptions:
+            self._subscriptions.append((topic, id, league))
         msg = {"action": "subscribe",
                "subscription": {"type": str(topic),
                                 'event_id': id,
@@ -283,11 +316,40 @@ class JockmktSocketManager:
                "subscription": {"topic": topic,
                                 "event_id": str(id),
                                 "league": str(league)}}
+        if (topic, id, league) in self._subscriptions:
+            self._subscriptions.remove((topic, id, league))
         await self.conn.send_message(msg)
 
+    async def subscribe_many(self, subscriptions: typing.Iterable):
+        """
+        Subscribe to many topics at once. All subscriptions are validated, then queued together and written in a single
+        batch rather than one round trip each.
+
+        :param subscriptions: subscription dicts in the same format as ws_connect_new's subscriptions, or
+            (topic, id, league) tuples
+        :type subscriptions:  iterable, required
+        """
+        subscriptions = [subscription_args(sub) for sub in subscriptions]
+        topics = self.PUBLIC_TOPICS.keys()
+        for topic, _, _ in subscriptions:
+            if topic not in topics:
+                raise KeyError(f'please choose from the following topics: {list(topics)}')
+        for topic, id, league in subscriptions:
+            await self.subscribe(topic, id, league)
+
+    async def unsubscribe_many(self, subscriptions: typing.Iterable):
+        """
+        Unsubscribe from many topics at once, written in a single batch.
+
+        :param subscriptions: subscription dicts or (topic, id, league) tuples
+        :type subscriptions:  iterable, required
+        """
+        for sub in list(subscriptions):
+            topic, id, league = subscription_args(sub)
+            await self.unsubscribe(topic, id, league)
+
     async def unsubscribe_all(self):
         """
         unsubscribe all method
         """
-        for i in self._subscriptions:
-            await self.unsubscribe(topic=i[0], id=i[1], league=i[2])
+        await self.unsubscribe_many(list(self._subscriptions))
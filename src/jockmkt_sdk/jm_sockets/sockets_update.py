@@ -8,6 +8,8 @@ import sys
 # from exception import JockAPIException
 from ..objects import Game, Event, Tradeable, Entry, Order, Position, PublicOrder, Trade, Balance
 from ..exception import JockAPIException
+from .. import interning
+from .writer import SocketWriter, subscription_args
 import ssl
 import certifi
 import websockets as ws
@@ -30,6 +32,7 @@ class JockmktSocketManager:
         self.balances = {}
         self.close = False
         self._coro = None
+        self._listeners = []
         self._socket = None
         self.conn = None
         self._loop = None
@@ -41,6 +44,7 @@ class JockmktSocketManager:
         self.ssl_context = ssl.create_default_context()
         self.ssl_context.load_verify_locations(certifi.where())
         self._error_handler = None
+        self._writer = None
 
     @classmethod
     async def create(cls, loop, client, iterable, error_handler, subscriptions,  coro, ws_url):
@@ -50,7 +54,10 @@ class JockmktSocketManager:
         self._error_handler = error_handler
         self._coro = coro
         self._subscriptions = subscriptions
-        self.__build_auth_dict(client.ws_token_generator())
+        self._writer = SocketWriter()
+        # queued until the connection is authenticated
+        await self.subscribe_many(subscriptions or [])
+        self.__build_auth_dict(await client.token_manager.get_token_async())
         self.conn = asyncio.ensure_future(self._run(), loop=self._loop)
         return self
 
@@ -72,42 +79,37 @@ class JockmktSocketManager:
             self._socket = socket
             self._reconnect_attempts = 0
             try:
-                await self.send_message(self.AUTH_DICT)
+                await socket.send(json.dumps(self.AUTH_DICT))
                 auth_response = await self._socket.recv()
                 auth_response = json.loads(auth_response)
                 if auth_response['status'] != 'success':
                     raise JockAPIException('Unable to authorize the websocket connection')
                 else:
-                    if self._client.verbose:
-                        print('Successfully connected to websockets.')
-
-                for sub in self._subscriptions:
-                    endpoint = sub.get('endpoint')
-                    event_id = sub.get('event_id')
-                    league = sub.get('league')
-                    await self.subscribe(endpoint, event_id, league)
-                    if self._client.verbose:
-                        print('subscribed to {} {} {}'.format(endpoint,
-                                                          f'event_id={event_id}' if event_id is not None else "",
-                                                          f'league={league}' if league is not None else ""))
+                    self.log.info('Successfully connected to websockets.')
+
+                # re-subscribes to everything subscribed through the writer, including the initial subscriptions
+                self._writer.attach(socket)
 
                 async for message in socket:
                     await self._recv(message)
             except ws.ConnectionClosed as on_close:
-                self.log.debug(f'Connection closed: {on_close}')
+                self.log.debug('Connection closed: %s', on_close)
                 await self.cancel()
 
             except ws.ConnectionClosedError as on_close:
-                self.log.debug(f'Connection terminated with an error: {on_close}')
+                self.log.debug('Connection terminated with an error: %s', on_close)
                 await self._error_handler(message, on_close)
 
             except asyncio.CancelledError:
                 pass
 
             except Exception as e:
-                self.log.debug(f'Unkown ws exception: {e}')
+                self.log.debug('Unknown ws exception: %s', e)
                 await self._error_handler(message, e)
 
+            finally:
+                self._writer.detach()
+
             await self.cancel()
 
     async def reconnect(self):
@@ -118,8 +120,8 @@ class JockmktSocketManager:
         self._reconnect_attempts += 1
         if self._reconnect_attempts < self.MAX_RECONNECTS:
             wait = self._get_reconnect_wait(self._reconnect_attempts)
-            self.log.debug(f'websockets reconnecting. Attempting {self._reconnect_attempts} more times after waiting '
-                           f'{wait} seconds')
+            self.log.debug('websockets reconnecting. Attempting %s more times after waiting %s seconds',
+                           self._reconnect_attempts, wait)
             self.conn = asyncio.ensure_future(self._run(), loop=self._loop)
         else:
             self.log.error('websocket could not reconnect after 5 attempts.')
@@ -133,25 +135,21 @@ class JockmktSocketManager:
     async def send_message(self, msg, retry_count=0):
         """
         send a message to the websocket (i.e. subscribe or unsubscribe). The user typically should not need to use this.
+        The message is queued and written as soon as the connection is authenticated, this returns immediately.
         """
-        if not self._socket:
-            if retry_count < 5:
-                await asyncio.sleep(1)
-                await self.send_message(msg, retry_count + 1)
-        else:
-            await self._socket.send(json.dumps(msg))
+        self._writer.send(msg)
 
     async def cancel(self):
         """
         cancels the instance of websocket connection
         """
         try:
+            self._writer.close()
             self.conn.cancel()
             cancelled = self.conn.cancelled()
             while not cancelled:
                 cancelled = self.conn.cancelled()
-                if self._client.verbose:
-                    print('Waiting for websocket connection cancellation')
+                self.log.debug('Waiting for websocket connection cancellation')
                 await asyncio.sleep(1)
         except asyncio.CancelledError:
             pass
@@ -190,16 +188,43 @@ class JockmktSocketManager:
         """
         handle incoming messages. The user should pass their event handling function in as an arg to callback
         """
-        if self.messages is not None:
-            messsage = json.loads(msg)
+        if self.messages is not None or self._listeners:
+            messsage = interning.loads(msg)
             type = messsage['object']
             obj = self._wsfeed_case_switcher(type, messsage)
             messsage[type] = obj
-            self.messages.append(messsage)
+            if self.messages is not None:
+                self.messages.append(messsage)
+            self._notify(messsage)
 
         if self._coro is not None:
             await self._coro(msg)
 
+    def add_listener(self, listener: typing.Callable):
+        """
+        Register a function that is called with every decoded message (the same dict that is appended to messages),
+        e.g. to record ticks. Listeners run in the websocket's loop, so they should be quick.
+
+        :param listener: a function accepting one message dict
+        :type listener:  callable, required
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: typing.Callable):
+        """
+        Stop calling a listener registered with add_listener
+        """
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, message: dict):
+        for listener in self._listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                self.log.debug('websocket listener %s failed: %s', listener, e)
+
     async def subscribe(self, topic: str, id: str = None, league: str = None):
         """
         Subscribe to a chosen topic or event.
@@ -214,7 +239,8 @@ class JockmktSocketManager:
         topics = self.PUBLIC_TOPICS.keys()
         if topic not in topics:
             raise KeyError(f'please choose from the following topics: {list(topics)}')
-        self._subscribed.append((topic, id, league))
+        if (topic, id, league) not in self._subscribed:
+            self._subscribed.append((topic, id, league))
         msg = {"action": "subscribe",
                "subscription": {"type": str(topic),
                                 'event_id': id,
@@ -232,15 +258,44 @@ class JockmktSocketManager:
         :param league: the league for which the user wants game data, required for 'games' subscription
         :type league:  str, optional
         """
+        if (topic, id, league) in self._subscribed:
+            self._subscribed.remove((topic, id, league))
         msg = {"action": "unsubscribe",
                "subscription": {"topic": topic,
                                 "event_id": str(id),
                                 "league": str(league)}}
         await self.send_message(msg)
 
+    async def subscribe_many(self, subscriptions: typing.Iterable):
+        """
+        Subscribe to many topics at once. All subscriptions are validated, then queued together and written in a single
+        batch rather than one round trip each.
+
+        :param subscriptions: subscription dicts in the same format as ws_connect_new's subscriptions, or
+            (topic, id, league) tuples
+        :type subscriptions:  iterable, required
+        """
+        subscriptions = [subscription_args(sub) for sub in subscriptions]
+        topics = self.PUBLIC_TOPICS.keys()
+        for topic, _, _ in subscriptions:
+            if topic not in topics:
+                raise KeyError(f'please choose from the following topics: {list(topics)}')
+        for topic, id, league in subscriptions:
+            await self.subscribe(topic, id, league)
+
+    async def unsubscribe_many(self, subscriptions: typing.Iterable):
+        """
+        Unsubscribe from many topics at once, written in a single batch.
+
+        :param subscriptions: subscription dicts or (topic, id, league) tuples
+        :type subscriptions:  iterable, required
+        """
+        for sub in list(subscriptions):
+            topic, id, league = subscription_args(sub)
+            await self.unsubscribe(topic, id, league)
+
     async def unsubscribe_all(self):
         """
         unsubscribe all method
         """
-        for i in self._subscriptions:
-            await self.unsubscribe(topic=i[0], id=i[1], league=i[2])
\ No newline at end of file
+        await self.unsubscribe_many(list(self._subscribed))
\ No newline at end of file
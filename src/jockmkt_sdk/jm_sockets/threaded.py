@@ -0,0 +1,385 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+import typing
+
+from ..exception import RequestTimeout
+from . import sockets_update
+
+log = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
+
+_STOPPED = object()
+
+
+class ThreadedSocketManager(object):
+    """
+    Runs a :class:`sockets_update.JockmktSocketManager` on its own thread, with its own asyncio loop, so the socket's
+    frame reads, pings and reconnects never wait on the user's code. Parsed messages (the same dicts the socket manager
+    appends to its queue) are handed over without blocking the socket's loop:
+
+    - by default, to a thread-safe :class:`queue.Queue` read with :meth:`get` from any thread
+    - with ``callback`` and ``loop``, to the user's asyncio loop via ``loop.call_soon_threadsafe``. Coroutine callbacks
+      are scheduled as tasks on that loop.
+    - with ``callback`` alone, to a dispatcher thread that calls it for each message
+
+    Delivery is bounded by ``maxsize`` messages. A consumer that falls further behind loses messages (the oldest queued
+    by default) rather than stalling the socket; ``dropped`` counts them.
+
+    .. code-block:: python
+
+        socket = client.ws_connect_threaded([{'endpoint': 'account'}, {'endpoint': 'games', 'league': 'nba'}])
+        while True:
+            message = socket.get(timeout=30)
+            ...
+        socket.stop()
+
+    :ivar subscriptions: subscriptions made on every (re)connection, in the same format as ws_connect_new
+    :ivar messages:      the queue of undelivered messages
+    :ivar maxsize:       messages waiting for the consumer before messages are dropped, default: 10,000
+    :ivar overflow:      'drop_oldest' or 'drop_newest', default: 'drop_oldest'
+    :ivar dropped:       messages dropped because the consumer was behind
+    :ivar manager:       the socket manager, once started
+    :ivar loop:          the socket thread's asyncio loop, once started
+    """
+
+    def __init__(self, client, subscriptions: typing.List[typing.Dict] = None, callback: typing.Callable = None,
+                 loop: asyncio.AbstractEventLoop = None, maxsize: int = 10000, overflow: str = 'drop_oldest',
+                 error_handler: typing.Callable = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f'unknown overflow policy {overflow}, please choose from: {OVERFLOW_POLICIES}')
+        if loop is not None and callback is None:
+            raise ValueError('a callback is required to deliver messages to a loop')
+        self.subscriptions = list(subscriptions or [])
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.messages = queue.Queue(maxsize)
+        self.dropped = 0
+        self.manager = None
+        self.loop = None
+        self._client = client
+        self._callback = callback
+        self._target_loop = loop
+        self._error_handler = error_handler
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._thread = None
+        self._dispatcher = None
+        self._started = threading.Event()
+        self._error = None
+
+    def start(self, timeout: float = 30):
+        """
+        starts the socket thread and waits until the socket manager has been created (and the auth token fetched)
+
+        :param timeout: seconds to wait, default: 30
+        :type timeout: float, optional
+        """
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name='jockmkt-socket', daemon=True)
+        self._thread.start()
+        if not self._started.wait(timeout):
+            self.stop()
+            raise RequestTimeout(f'websocket thread did not start within {timeout}s', phase='connect',
+                                 timings={'connect': timeout})
+        if self._error is not None:
+            self._thread = None
+            raise self._error
+        if self._callback is not None and self._target_loop is None:
+            self._dispatcher = threading.Thread(target=self._dispatch_forever, name='jockmkt-socket-dispatch',
+                                                daemon=True)
+            self._dispatcher.start()
+        return self
+
+    def _run(self):
+        loop = self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._connect())
+        except Exception as e:
+            self._error = e
+            self._started.set()
+            loop.close()
+            return
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    async def _connect(self):
+        # the listener is added before the loop runs again, so no message is missed
+        self.manager = await sockets_update.JockmktSocketManager.create(
+            self.loop, self._client, None, self._error_handler or self._reconnect, self.subscriptions, None,
+            ws_url=self._client.WS_BASE_URL)
+        self.manager.add_listener(self._on_message)
+
+    async def _reconnect(self, *args):
+        await self.manager.reconnect()
+
+    def _on_message(self, message: dict):
+        for listener in self._listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                log.debug('websocket listener %s failed: %s', listener, e)
+        if self._target_loop is not None:
+            with self._lock:
+                if self._pending >= self.maxsize:
+                    self._drop()
+                    return
+                self._pending += 1
+            self._target_loop.call_soon_threadsafe(self._deliver, message)
+            return
+        try:
+            self.messages.put_nowait(message)
+            return
+        except queue.Full:
+            pass
+        self._drop()
+        if self.overflow == 'drop_oldest':
+            try:
+                self.messages.get_nowait()
+                self.messages.put_nowait(message)
+            except (queue.Empty, queue.Full):
+                pass
+
+    def _drop(self):
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            log.warning('websocket consumer is behind, %s messages dropped', self.dropped)
+
+    def _deliver(self, message: dict):
+        """runs on the user's loop"""
+        with self._lock:
+            self._pending -= 1
+        try:
+            result = self._callback(message)
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result)
+        except Exception as e:
+            log.warning('websocket callback %s failed: %s', self._callback, e)
+
+    def _dispatch_forever(self):
+        while True:
+            message = self.get()
+            if message is None:
+                return
+            try:
+                self._callback(message)
+            except Exception as e:
+                log.warning('websocket callback %s failed: %s', self._callback, e)
+
+    def get(self, block: bool = True, timeout: float = None) -> typing.Union[dict, None]:
+        """
+        the next message, from any thread
+
+        :param timeout: seconds to wait for a message, default: forever
+        :type timeout: float, optional
+        :returns: the message, or None once the socket has been stopped
+        :rtype: dict
+        :raises queue.Empty: if no message arrived within the timeout
+        """
+        message = self.messages.get(block, timeout)
+        if message is _STOPPED:
+            # leave the marker for any other consumer
+            self._put_stopped()
+            return None
+        return message
+
+    def get_batch(self, max_items: int = 100, timeout: float = None) -> typing.Union[typing.List[dict], None]:
+        """
+        waits for the next message, then takes every message already queued with it, up to max_items
+
+        :param timeout: seconds to wait for the first message, default: forever
+        :type timeout: float, optional
+        :returns: the messages, oldest first; an empty list if none arrived within the timeout, or None once the socket
+            has been stopped
+        :rtype: List[dict]
+        """
+        try:
+            first = self.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < max_items:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if message is _STOPPED:
+                self._put_stopped()
+                break
+            batch.append(message)
+        return batch
+
+    def _put_stopped(self):
+        while True:
+            try:
+                self.messages.put_nowait(_STOPPED)
+                return
+            except queue.Full:
+                try:
+                    self.messages.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _call(self, coro, timeout: float = None):
+        if self.loop is None or not self.loop.is_running():
+            coro.close()
+            raise RuntimeError('the websocket thread is not running, call start() first')
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def subscribe(self, topic: str, id: str = None, league: str = None, timeout: float = 10):
+        """
+        :meth:`sockets_update.JockmktSocketManager.subscribe`, from any thread
+        """
+        self._call(self.manager.subscribe(topic, id, league), timeout)
+
+    def unsubscribe(self, topic: str, id: str = None, league: str = None, timeout: float = 10):
+        """
+        :meth:`sockets_update.JockmktSocketManager.unsubscribe`, from any thread
+        """
+        self._call(self.manager.unsubscribe(topic, id, league), timeout)
+
+    def subscribe_many(self, subscriptions: typing.Iterable, timeout: float = 10):
+        self._call(self.manager.subscribe_many(list(subscriptions)), timeout)
+
+    def unsubscribe_many(self, subscriptions: typing.Iterable, timeout: float = 10):
+        self._call(self.manager.unsubscribe_many(list(subscriptions)), timeout)
+
+    def add_listener(self, listener: typing.Callable):
+        """
+        Register a function that is called with every message on the socket thread, before it is handed over. Like the
+        socket manager's listeners, it should be quick (e.g. :class:`bars.TradeAggregator`).
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: typing.Callable):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @property
+    def balances(self) -> dict:
+        return self.manager.balances if self.manager is not None else {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    async def _shutdown(self):
+        self.manager.close = True
+        self.manager._writer.close()
+        if self.manager.conn is not None:
+            self.manager.conn.cancel()
+            await asyncio.wait([self.manager.conn], timeout=5)
+
+    def stop(self, timeout: float = 10):
+        """
+        closes the connection and stops the socket thread. Consumers waiting in :meth:`get` receive None.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        if self.loop is not None and self.loop.is_running():
+            if self.manager is not None:
+                try:
+                    asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+                except Exception as e:
+                    log.debug('websocket shutdown failed: %s', e)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        thread.join(timeout)
+        self._put_stopped()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout)
+            self._dispatcher = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class MessageStream(object):
+    """
+    A blocking iterator over a :class:`ThreadedSocketManager`'s messages, for synchronous code. Created by
+    :meth:`client.Client.stream`; the socket is stopped when iteration ends or the stream is closed.
+
+    Messages are taken from the socket's queue in batches (every message waiting, up to ``batch_size``), and yielded one
+    by one, or as lists if ``batch_size`` is given.
+
+    .. code-block:: python
+
+        with client.stream(subscriptions, timeout=60) as stream:
+            for message in stream:
+                ...
+
+    :ivar socket:     the :class:`ThreadedSocketManager`, e.g. to change subscriptions
+    :ivar batch_size: yield lists of at most this many messages, default: yield single messages
+    :ivar timeout:    seconds to wait for a message before raising :class:`exception.RequestTimeout`, default: forever
+    :ivar duration:   seconds after which iteration ends, default: never
+    """
+
+    BATCH = 500
+
+    def __init__(self, socket: ThreadedSocketManager, batch_size: int = None, timeout: float = None,
+                 duration: float = None):
+        self.socket = socket
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.duration = duration
+        self._ends = time.monotonic() + duration if duration is not None else None
+
+    def batches(self) -> typing.Iterator[typing.List[dict]]:
+        """
+        yields lists of messages, whatever ``batch_size`` is
+        """
+        try:
+            while True:
+                wait = self.timeout
+                if self._ends is not None:
+                    remaining = self._ends - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    wait = remaining if wait is None else min(wait, remaining)
+                batch = self.socket.get_batch(self.batch_size or self.BATCH, wait)
+                if batch is None:
+                    return
+                if not batch:
+                    if self._ends is not None and time.monotonic() >= self._ends:
+                        return
+                    raise RequestTimeout(f'no websocket message within {self.timeout}s', phase='read',
+                                         timings={'read': self.timeout})
+                yield batch
+        finally:
+            self.close()
+
+    def __iter__(self):
+        if self.batch_size is not None:
+            return self.batches()
+        return (message for batch in self.batches() for message in batch)
+
+    def close(self):
+        """
+        stops the socket
+        """
+        self.socket.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
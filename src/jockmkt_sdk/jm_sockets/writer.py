@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import typing
+
+log = logging.getLogger(__name__)
+
+_SUBSCRIPTION_ACTIONS = ('subscribe', 'unsubscribe')
+
+
+def _subscription_key(msg: dict) -> tuple:
+    """
+    identifies the subscription a subscribe/unsubscribe frame refers to. Unsubscribe frames carry 'topic' and
+    stringified ids, subscribe frames carry 'type', so both are normalized.
+    """
+    sub = msg.get('subscription', {})
+    event_id = sub.get('event_id')
+    league = sub.get('league')
+    return (sub.get('type', sub.get('topic')),
+            None if event_id in (None, 'None') else event_id,
+            None if league in (None, 'None') else league)
+
+
+def subscription_args(subscription: typing.Union[dict, tuple]) -> tuple:
+    """
+    accepts either a subscription dict ({'endpoint': ..., 'event_id': ..., 'league': ...}, as in ws_connect_new's
+    subscriptions) or a (topic, id, league) tuple, whose id and league may be left out
+
+    :returns: (topic, id, league)
+    :rtype: tuple
+    """
+    if isinstance(subscription, dict):
+        return (subscription.get('endpoint', subscription.get('topic')), subscription.get('event_id'),
+                subscription.get('league'))
+    return tuple(subscription) + (None,) * (3 - len(subscription))
+
+
+class SocketWriter(object):
+    """
+    The single writer of a websocket connection. Messages are queued with :meth:`send` and written by one task, which
+    waits for the connection to be authenticated instead of sleep-polling.
+
+    Everything queued while the writer is busy (or while the socket is reconnecting) is written as one batch, in which
+    subscribe and unsubscribe frames are coalesced: for each subscription only the last requested action is kept, and it
+    is dropped entirely if it would not change what the connection is already subscribed to. Frames that fail to write
+    (e.g. because the connection dropped) are kept and written after the next :meth:`attach`, and every subscription
+    requested through the writer (and not unsubscribed since) is made again on the new connection.
+
+    The writer's queue and task are created by the first call from the socket's running loop, so it can be constructed
+    anywhere. Call its methods from that loop.
+
+    :ivar subscribed:    subscription keys (topic, event_id, league) currently active on the connection
+    :ivar subscriptions: the last subscribe frame of every subscription requested and not unsubscribed, by key. They are
+                         queued again on every :meth:`attach`.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._ready = None
+        self._unsent = []
+        self._socket = None
+        self._task = None
+        self.subscribed = set()
+        self.subscriptions = {}
+
+    def _init(self):
+        # asyncio primitives bind to the loop that is current when they are created before python 3.10
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._ready = asyncio.Event()
+
+    def attach(self, socket):
+        """
+        starts writing to an authenticated socket, subscribing to :attr:`subscriptions` again. Called by the socket
+        manager after every (re)connection.
+        """
+        self._init()
+        self._socket = socket
+        self.subscribed = set()
+        # queued after anything sent while disconnected, which is already reflected in self.subscriptions
+        for msg in self.subscriptions.values():
+            self._queue.put_nowait(msg)
+        self._ready.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def detach(self):
+        """
+        pauses writing until the next :meth:`attach`. Queued messages are kept.
+        """
+        if self._ready is not None:
+            self._ready.clear()
+        self._socket = None
+
+    def send(self, msg: dict):
+        """
+        queues a message for the connection; returns immediately
+        """
+        self._init()
+        if msg.get('action') == 'subscribe':
+            self.subscriptions[_subscription_key(msg)] = msg
+        elif msg.get('action') == 'unsubscribe':
+            self.subscriptions.pop(_subscription_key(msg), None)
+        self._queue.put_nowait(msg)
+
+    async def flush(self):
+        """
+        waits until every queued message has been written
+        """
+        self._init()
+        await self._queue.join()
+
+    def close(self):
+        """
+        stops the writer task
+        """
+        self.detach()
+        if self._task is not None:
+            self._task.cancel()
+
+    def _coalesce(self, batch: list) -> list:
+        frames = []
+        subscriptions = {}
+        for msg in batch:
+            if msg.get('action') in _SUBSCRIPTION_ACTIONS:
+                key = _subscription_key(msg)
+                subscriptions.pop(key, None)
+                subscriptions[key] = msg
+            else:
+                frames.append(msg)
+        for key, msg in subscriptions.items():
+            if (msg['action'] == 'subscribe') == (key in self.subscribed):
+                continue
+            frames.append(msg)
+        return frames
+
+    async def _run(self):
+        while True:
+            # frames that failed to write last time go first
+            if not self._unsent:
+                self._unsent.append(await self._queue.get())
+            while not self._queue.empty():
+                self._unsent.append(self._queue.get_nowait())
+            await self._ready.wait()
+            batch, self._unsent = self._unsent, []
+            frames = self._coalesce(batch)
+            if len(frames) != len(batch):
+                log.debug('coalesced %s queued websocket messages into %s frames', len(batch), len(frames))
+            written = 0
+            try:
+                for msg in frames:
+                    try:
+                        frame = json.dumps(msg)
+                    except (TypeError, ValueError) as e:
+                        log.warning('dropped a websocket message that is not json serializable: %s', e)
+                    else:
+                        await self._socket.send(frame)
+                        if msg.get('action') == 'subscribe':
+                            key = _subscription_key(msg)
+                            self.subscribed.add(key)
+                            log.info('subscribed to %s event_id=%s league=%s', *key,
+                                     extra={'topic': key[0], 'event_id': key[1]})
+                        elif msg.get('action') == 'unsubscribe':
+                            key = _subscription_key(msg)
+                            self.subscribed.discard(key)
+                            log.info('unsubscribed from %s event_id=%s league=%s', *key,
+                                     extra={'topic': key[0], 'event_id': key[1]})
+                    written += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._unsent = frames[written:]
+                log.warning('failed to write %s websocket messages, they will be sent after reconnecting: %s',
+                            len(self._unsent), e)
+                # wait for the socket manager to attach the next connection
+                self._ready.clear()
+            finally:
+                for _ in range(len(batch) - len(self._unsent)):
+                    self._queue.task_done()
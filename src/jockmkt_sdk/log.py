@@ -0,0 +1,88 @@
+import itertools
+import json
+import logging
+import sys
+
+LOGGER_NAME = 'jockmkt_sdk'
+
+# nothing is written anywhere until the user attaches a handler (or calls enable_logging)
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+_REQUEST_IDS = itertools.count(1)
+
+# fields passed via ``extra=`` that are copied into JSON log lines when present
+_STRUCTURED_FIELDS = ('request_id', 'method', 'path', 'status_code', 'latency_ms', 'attempt', 'topic', 'event_id')
+
+
+def next_request_id() -> str:
+    """
+    returns a process-unique id used to correlate the log lines of a single REST request
+    """
+    return 'req_{}'.format(next(_REQUEST_IDS))
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats each record as a single line of JSON. Structured fields passed through ``extra`` (request_id, latency_ms,
+    path, etc.) are included as top level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {'time': round(record.created * 1000),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage()}
+        for field in _STRUCTURED_FIELDS:
+            value = record.__dict__.get(field)
+            if value is not None:
+                line[field] = value
+        if record.exc_info:
+            line['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+def enable_logging(level: int = logging.INFO, json_format: bool = False, stream=None,
+                   subsystem: str = None) -> logging.Handler:
+    """
+    Attach a stream handler to the SDK's loggers. By default the SDK emits nothing.
+
+    :param level:       minimum level to emit, e.g. logging.DEBUG to see every request with its latency
+    :type level:        int, optional
+    :param json_format: emit one JSON object per line, including request ids and latencies
+    :type json_format:  bool, optional
+    :param stream:      where to write the logs, default: sys.stdout
+    :type stream:       file-like, optional
+    :param subsystem:   only enable one subsystem, one of: 'client', 'exception', 'jm_sockets'
+    :type subsystem:    str, optional
+
+    :returns: the handler that was attached, so the user can remove it later
+    :rtype: logging.Handler
+    """
+    name = LOGGER_NAME if subsystem is None else '{}.{}'.format(LOGGER_NAME, subsystem)
+    logger = logging.getLogger(name)
+    handler = next((h for h in logger.handlers if getattr(h, '_jockmkt_sdk_handler', False)), None)
+    if handler is None:
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler._jockmkt_sdk_handler = True
+        logger.addHandler(handler)
+    if json_format:
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s: %(message)s'))
+    logger.setLevel(level)
+    return handler
+
+
+def enable_verbose_logging() -> logging.Handler:
+    """
+    What ``Client(verbose=True)`` does: :func:`enable_logging` at logging.INFO, unless the SDK's logger already has a
+    level or handler set, by the user or by an earlier verbose client. Calling it again changes nothing, so the host
+    application's logging setup is never overridden and output is never duplicated.
+
+    :returns: the handler that was attached, or None if logging was already configured
+    :rtype: logging.Handler
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.level != logging.NOTSET or any(not isinstance(h, logging.NullHandler) for h in logger.handlers):
+        return None
+    return enable_logging(logging.INFO)
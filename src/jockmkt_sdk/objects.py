@@ -521,7 +521,7 @@ class Tradeable(object):
         self.bid = price.get('bid')
         self.ask = price.get('ask')
         self.final = price.get('final')
-        ranks = tradeable.get('rank')
+        ranks = tradeable.get('rank', {})
         self.rank_proj_pregame = ranks.get('projected')
         self.rank_proj_live = ranks.get('projected_live')
         self.rank_scored = ranks.get('scored')
@@ -568,11 +568,11 @@ class Entry(object):
     def __init__(self, entry: dict):
         self.entry_id = entry.get('id')
         self.event_id = entry.get('event_id')
-        leaderboard = entry.get('leaderboard')
+        leaderboard = entry.get('leaderboard', {})
         self.leaderboard_pos = leaderboard.get('position')
         self.profit = leaderboard.get('amount')
         self.updated_at = entry.get('updated_at')
-        self.favorites = entry.get('favorites', [])  # interact this with tradeable lookup
+        self.favorites = entry.get('favorites', [])  # see registry.Registry.favorites
         event = entry.get('event', {})
         self.event = Event(event)
         self.payouts = entry.get('payouts')
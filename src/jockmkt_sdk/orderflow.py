@@ -0,0 +1,239 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Tuple, Union
+
+from .objects import PublicOrder
+
+log = logging.getLogger(__name__)
+
+MARKET_MAKER_TAGS = ('market_maker', 'marketmaker', 'mm')
+
+
+class CountMinSketch(object):
+    """
+    Approximate counts of any number of keys in fixed memory: ``depth`` rows of ``width`` counters. Estimates never
+    undercount, and overcount by at most 2 / width of the total count with probability 1 - 0.5 ** depth.
+
+    :ivar width: counters per row, default: 2048
+    :ivar depth: rows, each with its own hash, default: 4
+    :ivar total: sum of all counts added
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: Hashable):
+        return [hash((seed, key)) % self.width for seed in range(self.depth)]
+
+    def add(self, key: Hashable, count: int = 1) -> int:
+        """
+        :returns: the key's new estimated count
+        :rtype: int
+        """
+        self.total += count
+        estimate = None
+        for row, index in zip(self._rows, self._indexes(key)):
+            row[index] += count
+            estimate = row[index] if estimate is None else min(estimate, row[index])
+        return estimate
+
+    def estimate(self, key: Hashable) -> int:
+        """
+        :returns: the key's estimated count, never less than its true count
+        :rtype: int
+        """
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+
+class TopK(object):
+    """
+    The ``k`` most frequent keys of a stream in O(k) memory (the Space-Saving algorithm): a key not yet tracked
+    replaces the least frequent one and inherits its count, so counts may overestimate by up to that inherited error.
+
+    :ivar k: keys tracked, default: 100
+    """
+
+    def __init__(self, k: int = 100):
+        self.k = k
+        self._counts = {}
+        self._errors = {}
+
+    def add(self, key: Hashable, count: int = 1):
+        if key in self._counts:
+            self._counts[key] += count
+        elif len(self._counts) < self.k:
+            self._counts[key] = count
+            self._errors[key] = 0
+        else:
+            evicted = min(self._counts, key=self._counts.get)
+            floor = self._counts.pop(evicted)
+            self._errors.pop(evicted)
+            self._counts[key] = floor + count
+            self._errors[key] = floor
+
+    def top(self, n: int = None) -> List[Tuple[Hashable, int]]:
+        """
+        :returns: (key, count) of the most frequent keys, most frequent first
+        :rtype: List[tuple]
+        """
+        ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+    def error(self, key: Hashable) -> int:
+        """the most the key's count may be overestimated by"""
+        return self._errors.get(key, 0)
+
+    def __contains__(self, key):
+        return key in self._counts
+
+
+class OrderFlowMonitor(object):
+    """
+    Streaming analytics over public orders (the 'event_activity' topic) in bounded memory, so flow across every event
+    can be monitored for a whole season:
+
+    - order-flow imbalance per tradeable: (buys - sells) / (buys + sells) of exponentially decayed order counts, with
+      and without market makers. At most ``max_tradeables`` tradeables are tracked; the least recently active are
+      dropped first.
+    - per-user activity: every user's order count estimated by a :class:`CountMinSketch`, and the most active users
+      tracked by a :class:`TopK`
+    - market makers: users whose ``user_tags`` contain one of ``market_maker_tags``
+
+    .. code-block:: python
+
+        monitor = OrderFlowMonitor(half_life=120)
+        monitor.attach(socket_manager)
+        print(monitor.imbalance('tdbl_xxx', exclude_market_makers=True), monitor.top_users(10))
+
+    :ivar half_life:         seconds for an order's weight in the imbalance to halve, default: 300
+    :ivar max_tradeables:    tradeables tracked, default: 10,000
+    :ivar market_maker_tags: user tags marking market makers
+    :ivar users:             :class:`CountMinSketch` of orders per user_id
+    :ivar top:               :class:`TopK` most active user_ids
+    """
+
+    def __init__(self, half_life: float = 300, max_tradeables: int = 10000, width: int = 2048, depth: int = 4,
+                 top_k: int = 100, max_market_makers: int = 1000, market_maker_tags=MARKET_MAKER_TAGS):
+        self.half_life = half_life
+        self.max_tradeables = max_tradeables
+        self.max_market_makers = max_market_makers
+        self.market_maker_tags = frozenset(market_maker_tags)
+        self.users = CountMinSketch(width, depth)
+        self.top = TopK(top_k)
+        self._decay = math.log(2) / half_life
+        # tradeable_id: [buys, sells, non market maker buys, non market maker sells, last update in seconds]
+        self._flow = OrderedDict()
+        self._market_makers = OrderedDict()
+        self._lock = threading.Lock()
+        self._managers = []
+
+    def _decayed(self, flow: list, now: float) -> list:
+        factor = math.exp(-self._decay * max(0.0, now - flow[4]))
+        return [flow[0] * factor, flow[1] * factor, flow[2] * factor, flow[3] * factor, max(now, flow[4])]
+
+    def _is_market_maker_order(self, order: PublicOrder) -> bool:
+        tags = order.user_tags or ()
+        if isinstance(tags, str):
+            tags = (tags,)
+        return any(tag in self.market_maker_tags for tag in tags)
+
+    def add_order(self, order: PublicOrder):
+        """
+        counts a public order
+        """
+        now = order.created_at / 1000 if order.created_at else time.time()
+        market_maker = self._is_market_maker_order(order)
+        buy = order.side == 'buy'
+        with self._lock:
+            if order.user_id is not None:
+                self.users.add(order.user_id)
+                self.top.add(order.user_id)
+                if market_maker:
+                    self._market_makers[order.user_id] = order.username
+                    self._market_makers.move_to_end(order.user_id)
+                    if len(self._market_makers) > self.max_market_makers:
+                        self._market_makers.popitem(last=False)
+            if order.tradeable_id is None:
+                return
+            flow = self._flow.pop(order.tradeable_id, None)
+            flow = self._decayed(flow, now) if flow is not None else [0.0, 0.0, 0.0, 0.0, now]
+            flow[0 if buy else 1] += 1
+            if not market_maker:
+                flow[2 if buy else 3] += 1
+            self._flow[order.tradeable_id] = flow
+            if len(self._flow) > self.max_tradeables:
+                self._flow.popitem(last=False)
+
+    def flow(self, tradeable_id: str, exclude_market_makers: bool = False, now: float = None) -> Tuple[float, float]:
+        """
+        :param now: time in seconds to decay the counts to, default: the latest order's time
+        :returns: the decayed (buy, sell) order counts of a tradeable
+        :rtype: tuple
+        """
+        with self._lock:
+            flow = self._flow.get(tradeable_id)
+            if flow is None:
+                return 0.0, 0.0
+            flow = self._decayed(flow, flow[4] if now is None else now)
+        return (flow[2], flow[3]) if exclude_market_makers else (flow[0], flow[1])
+
+    def imbalance(self, tradeable_id: str, exclude_market_makers: bool = False,
+                  now: float = None) -> Union[float, None]:
+        """
+        :returns: (buys - sells) / (buys + sells) of a tradeable's decayed order flow, from -1 (only sells) to 1 (only
+            buys), or None without orders
+        :rtype: float
+        """
+        buys, sells = self.flow(tradeable_id, exclude_market_makers, now)
+        if buys + sells == 0:
+            return None
+        return (buys - sells) / (buys + sells)
+
+    def user_orders(self, user_id: str) -> int:
+        """
+        :returns: the user's estimated order count
+        :rtype: int
+        """
+        return self.users.estimate(user_id)
+
+    def top_users(self, n: int = None) -> List[Tuple[str, int]]:
+        """
+        :returns: (user_id, orders) of the most active users
+        :rtype: List[tuple]
+        """
+        with self._lock:
+            return self.top.top(n)
+
+    def is_market_maker(self, user_id: str) -> bool:
+        return user_id in self._market_makers
+
+    @property
+    def market_makers(self) -> dict:
+        """username by user_id of the market makers seen, most recently active last"""
+        return dict(self._market_makers)
+
+    def on_message(self, message: dict):
+        """
+        socket listener: counts public orders
+        """
+        obj = message.get(message.get('object'))
+        if isinstance(obj, PublicOrder):
+            self.add_order(obj)
+
+    def attach(self, socket_manager):
+        """
+        monitors a socket manager's public orders. Subscribe the manager to the 'event_activity' topic of each event.
+        """
+        socket_manager.add_listener(self.on_message)
+        self._managers.append(socket_manager)
+
+    def detach(self):
+        for manager in self._managers:
+            manager.remove_listener(self.on_message)
+        self._managers = []
@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+from .interning import STRINGS
+
+log = logging.getLogger(__name__)
+
+PARSE_THRESHOLD = 256 * 1024
+
+
+def _parse_page(content: Union[bytes, str], key: str, model: Callable) -> Tuple[List, Dict]:
+    """
+    decodes a list response, interning ids and enum-like values, and builds ``model`` objects from ``response[key]``
+
+    :returns: (the objects, the rest of the response)
+    """
+    res = json.loads(content, object_hook=STRINGS.object_hook)
+    items = res.pop(key, [])
+    return [model(item) for item in items], res
+
+
+def _decode_page(content: Union[bytes, str], key: str) -> Tuple[List[Dict], Dict]:
+    """
+    decodes a list response in a worker process. Nothing is interned or built here: strings are copied back to the
+    caller's process anyway, where they are interned and the objects built, once.
+
+    :returns: (the raw items, the rest of the response)
+    """
+    res = json.loads(content)
+    return res.pop(key, []), res
+
+
+class ParsePool(object):
+    """
+    Decodes large REST responses in worker processes, so decoding pages of thousands of nested objects (e.g. game logs
+    including games, teams and entities, which is especially heavy for golf) doesn't hold the calling thread. Workers
+    send back plain dicts; the objects are built, and their ids interned, once in the caller's process, off the calling
+    thread. Responses smaller than ``threshold`` bytes are parsed inline, where the round trip to a worker would cost
+    more than it saves.
+
+    :meth:`submit` returns a future immediately and :meth:`parse_many` decodes many pages at once, yielding them in
+    order, so the caller can keep fetching while pages are parsed. The pool is started on first use and shared by every
+    client it is passed to.
+
+    .. code-block:: python
+
+        pool = ParsePool(workers=4)
+        client = Client(secret, api_key, parse_pool=pool)
+        logs = client.get_game_logs(include_game=True, include_team=True)
+
+    :ivar workers:   number of worker processes, default: os.cpu_count()
+    :ivar threshold: response size in bytes from which parsing is offloaded, default: 256KB
+    """
+
+    def __init__(self, workers: int = None, threshold: int = PARSE_THRESHOLD):
+        self.workers = workers
+        self.threshold = threshold
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, content: Union[bytes, str, Dict], key: str, model: Callable) -> Future:
+        """
+        starts parsing a response without waiting for it
+
+        :param content: the raw response body. An already decoded response is accepted and parsed inline.
+        :param key: the response key holding the list of objects, e.g. 'game_logs'
+        :param model: the object class (or factory) to build from each item, e.g. objects.GameLog
+
+        :returns: a future of (list of objects, the rest of the response)
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        if isinstance(content, dict) or len(content) < self.threshold:
+            try:
+                if isinstance(content, dict):
+                    res = dict(content)
+                    future.set_result(([model(item) for item in res.pop(key, [])], res))
+                else:
+                    future.set_result(_parse_page(content, key, model))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        log.debug('decoding %s byte %s response in a worker process', len(content), key)
+        decoded = self._pool().submit(_decode_page, content, key)
+        decoded.add_done_callback(lambda done: self._build(done, future, model))
+        return future
+
+    @staticmethod
+    def _build(decoded: Future, future: Future, model: Callable):
+        """
+        interns and builds a decoded page; runs on the pool's result thread
+        """
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            items, res = decoded.result()
+            STRINGS.intern_tree(items)
+            STRINGS.intern_tree(res)
+            future.set_result(([model(item) for item in items], res))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def parse(self, content: Union[bytes, str, Dict], key: str, model: Callable) -> Tuple[List, Dict]:
+        """
+        parses a response, decoding it in a worker process if it is at least ``threshold`` bytes
+
+        :returns: (list of objects, the rest of the response)
+        """
+        return self.submit(content, key, model).result()
+
+    def parse_many(self, contents: Iterable[Union[bytes, str, Dict]], key: str,
+                   model: Callable) -> Iterator[Tuple[List, Dict]]:
+        """
+        starts parsing every response, then yields them in order as they are ready
+
+        :returns: an iterator of (list of objects, the rest of the response)
+        """
+        futures = [self.submit(content, key, model) for content in contents]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        """
+        shuts down the worker processes
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
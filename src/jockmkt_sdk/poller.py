@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, List
+
+from . import timeouts
+from .exception import DeadlineExceeded
+from .objects import Event, Tradeable
+from .ratelimit import RateLimiter
+
+log = logging.getLogger(__name__)
+
+
+class SingleFlight(object):
+    """
+    Collapses concurrent calls that share a key into one: the first caller runs the function, callers arriving while it
+    is in flight wait for and receive the same result (or exception). Waiters wait no longer than their current
+    :class:`timeouts.Deadline` allows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn: Callable, *args, **kwargs):
+        """
+        runs ``fn(*args, **kwargs)`` unless a call with the same key is in flight, in which case its result is returned
+
+        :returns: (result, whether this call shared another caller's request)
+        :rtype: tuple
+        :raises DeadlineExceeded: if the current deadline passes while waiting for another caller's request
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            running = timeouts.current()
+            remaining = running.remaining() if running is not None else None
+            try:
+                return future.result(None if remaining is None else max(0.0, remaining)), True
+            except FutureTimeout:
+                raise DeadlineExceeded(f'deadline of {running.total}s exceeded waiting for a shared request',
+                                       phase='deadline', timings=running.timings())
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class EventPoller(object):
+    """
+    Polls an event's tradeable prices for events without a websocket feed, spending as little of the rate budget as
+    possible for the freshness it gets:
+
+    - the base interval depends on the event's status (fast while live or in the ipo, slow otherwise) and polling stops
+      once the event is finished
+    - the interval grows by ``backoff`` after every poll in which nothing changed, and resets on the first change
+    - it tightens ahead of the ipo ending and the event closing, when prices move most
+    - one poller exists per client keys and event (see :meth:`for_event`), and concurrent polls of the same event are
+      collapsed into one request
+
+    Each poll is a single ``get_event(event_id, fields='prices')`` request. Subscribers are called from the poller's
+    thread with the event and the tradeables that changed since the previous poll.
+
+    .. code-block:: python
+
+        def on_prices(event, changed):
+            ...
+
+        poller = EventPoller.for_event(client, event_id)
+        poller.subscribe(on_prices)
+        poller.start()
+
+    :ivar client:       the :class:`client.Client` used to poll
+    :ivar event_id:     the polled event
+    :ivar event:        the latest :class:`objects.Event`, or None before the first poll
+    :ivar interval:     seconds until the next poll
+    :ivar min_interval: shortest interval, default: 2
+    :ivar max_interval: longest interval, default: 300
+    :ivar backoff:      interval multiplier after a poll without changes, default: 1.5
+    :ivar budget:       optional maximum polls per minute shared by every poller of the same keys
+    """
+    INTERVALS = {
+        'scheduled': 120,
+        'ipo': 10,
+        'ipo_closed': 30,
+        'live': 5,
+        'halted': 30,
+        'live_closed': 60,
+    }
+    FINISHED_STATUSES = ('payouts_completed', 'prizes_paid', 'contests_paid', 'cancelled')
+    _POLLERS = {}
+    _POLLERS_LOCK = threading.Lock()
+    _FLIGHTS = SingleFlight()
+
+    def __init__(self, client, event_id: str, min_interval: float = 2, max_interval: float = 300,
+                 backoff: float = 1.5, budget: int = None):
+        self.client = client
+        self.event_id = event_id
+        self.event = None
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.budget = budget
+        self.interval = min_interval
+        self._limiter = None if budget is None else RateLimiter.shared(f'poll:{client.api_key}', budget)
+        self._subscribers = []
+        self._versions = {}
+        self._idle_polls = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def for_event(cls, client, event_id: str, **kwargs) -> 'EventPoller':
+        """
+        returns the poller of ``event_id`` for the client's api key, creating it if necessary, so every subscriber of
+        an event shares one poll loop
+
+        :param kwargs: the poller's settings (min_interval, max_interval, backoff, budget), used if it is created
+        :raises ValueError: if the existing poller has different settings than those given
+        """
+        key = (client.api_key, event_id)
+        with cls._POLLERS_LOCK:
+            poller = cls._POLLERS.get(key)
+            if poller is None:
+                poller = cls._POLLERS[key] = cls(client, event_id, **kwargs)
+                return poller
+        differ = {name: getattr(poller, name) for name, value in kwargs.items() if getattr(poller, name) != value}
+        if differ:
+            raise ValueError(f'the poller of {event_id} already exists with {differ}, not {kwargs}')
+        return poller
+
+    def subscribe(self, callback: Callable):
+        """
+        :param callback: called with (event, changed tradeables) after every poll that changed something
+        :type callback: callable, required
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _fetch(self) -> Event:
+        if self._limiter is not None:
+            self._limiter.acquire()
+        return self.client.get_event(self.event_id, fields='prices')
+
+    def poll(self) -> List[Tradeable]:
+        """
+        polls the event once (sharing any poll of the same event already in flight), notifies subscribers and
+        computes the next interval
+
+        :returns: the tradeables that changed since the previous poll
+        :rtype: List[objects.Tradeable]
+        """
+        event, _ = self._FLIGHTS.do((self.client.api_key, self.event_id), self._fetch)
+        changed = []
+        for tradeable in event.tradeables:
+            if self._versions.get(tradeable.tradeable_id) != tradeable.updated_at:
+                self._versions[tradeable.tradeable_id] = tradeable.updated_at
+                changed.append(tradeable)
+        self.event = event
+        self._idle_polls = 0 if changed else self._idle_polls + 1
+        self.interval = self.next_interval()
+        log.debug('polled %s: status=%s changed=%s next poll in %.1fs', self.event_id, event.status, len(changed),
+                  self.interval, extra={'event_id': self.event_id})
+        if changed:
+            for callback in list(self._subscribers):
+                try:
+                    callback(event, changed)
+                except Exception as e:
+                    log.warning('event poller subscriber %s failed: %s', callback, e)
+        return changed
+
+    def next_interval(self, now: float = None) -> float:
+        """
+        the interval after the latest poll: the status' base interval, backed off for consecutive polls without
+        changes, and shortened ahead of the next deadline (ipo end while in the ipo, close while live)
+
+        :rtype: float
+        """
+        event = self.event
+        if event is None:
+            return self.min_interval
+        now = time.time() if now is None else now
+        interval = self.INTERVALS.get(event.status, self.max_interval) * self.backoff ** self._idle_polls
+        deadline = {'scheduled': event.ipo_start, 'ipo': event.ipo_end, 'live': event.est_close}.get(event.status)
+        if deadline:
+            remaining = deadline / 1000 - now
+            if remaining > 0:
+                interval = min(interval, remaining / 4)
+            else:
+                # past the estimated deadline, the status change is imminent
+                interval = min(interval, self.INTERVALS.get(event.status, self.min_interval))
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    @property
+    def finished(self) -> bool:
+        """whether the event is finished, after which polling stops"""
+        return self.event is not None and self.event.status in self.FINISHED_STATUSES
+
+    def _run(self):
+        while not self._stop.is_set() and not self.finished:
+            try:
+                self.poll()
+            except Exception as e:
+                log.warning('polling %s failed: %s', self.event_id, e)
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+            self._stop.wait(self.interval)
+        log.debug('stopped polling %s', self.event_id)
+
+    def start(self):
+        """
+        starts polling in a daemon thread
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'jockmkt-poll-{self.event_id}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        stops polling and unregisters the poller
+        """
+        self._stop.set()
+        with self._POLLERS_LOCK:
+            if self._POLLERS.get((self.client.api_key, self.event_id)) is self:
+                del self._POLLERS[(self.client.api_key, self.event_id)]
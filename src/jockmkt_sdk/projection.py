@@ -0,0 +1,336 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Union
+
+from .client import Client
+from .objects import Game, GameLog, Tradeable
+
+log = logging.getLogger(__name__)
+
+# stat keys for scoring keys that aren't simply the key or its plural in the game log stats
+STAT_ALIASES = {
+    'mlb': {'at_bat': 'hitting.at_bats', 'single': 'hitting.singles', 'double': 'hitting.doubles',
+            'triple': 'hitting.triples', 'home_run': 'hitting.home_runs', 'walk': 'hitting.walks', 'run': 'hitting.runs',
+            'rbi': 'hitting.rbi', 'stolen_base': 'hitting.stolen_bases', 'strikeout': 'hitting.total_strikeouts'},
+    'nba': {'3pm': 'three_points_made'},
+}
+
+
+def _missed_fg(stats: Dict[str, float]) -> float:
+    return stats['field_goals_att'] - stats['field_goals_made']
+
+
+def _ten_point_bonus(stats: Dict[str, float]) -> float:
+    return stats['points'] // 10
+
+
+# scoring keys computed from several stats, by league. Each function receives the flattened stats and raises KeyError
+# if a stat it needs is missing.
+DERIVED_STATS = {
+    'nba': {'missed_fg': _missed_fg, '10_pt_bonus': _ten_point_bonus},
+}
+
+# threshold bonuses in Client's scoring tables that cannot be derived from the stats, and are left out
+BONUS_KEYS = {
+    'nfl': ('100_yd_passing_bonus', '100_yd_rushing_bonus', '100_yd_receiving_bonus'),
+    'nhl': ('hat_trick', '3_plus_blocks', '3_plus_pts', '35_plus_saves', 'shutout'),
+    'nascar': ('start_bonus',),
+}
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError('live projections require numpy: pip install numpy')
+    return np
+
+
+def _flatten(stats: Dict) -> Dict[str, float]:
+    """numeric stats by key, with nested groups (e.g. mlb's 'hitting') as 'group.key' and, if unambiguous, 'key'"""
+    flat = {}
+    for key, value in (stats or {}).items():
+        if isinstance(value, dict):
+            for nested_key, nested_value in value.items():
+                if isinstance(nested_value, (int, float)) and not isinstance(nested_value, bool):
+                    flat[f'{key}.{nested_key}'] = nested_value
+                    flat.setdefault(nested_key, nested_value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[key] = value
+    return flat
+
+
+class LiveProjector(object):
+    """
+    Our own live fantasy point projections for an event's tradeables, from each player's game log (projected and
+    actual stats) and their game's ``amount_completed``:
+
+        live stats = actual stats + projected stats * (1 - amount_completed)
+
+        projection = live stats . scoring weights
+
+    Inputs are held in numpy arrays with one row per tradeable. Applying a game log or game only marks the rows whose
+    inputs actually changed, and :meth:`recompute` projects just those rows, in one vectorized step, so a stream of
+    updates costs O(changed rows).
+
+    Scoring uses the league's table in :class:`client.Client` (e.g. Client.NBA_SCORING). Scoring keys are matched to
+    stats through ``stat_map``, :data:`STAT_ALIASES`, the key itself or its plural, or computed by
+    :data:`DERIVED_STATS` (e.g. nba's missed_fg and 10_pt_bonus). Derived stats are computed separately for actual and
+    projected stats, so a threshold bonus is exact once the game is final. Threshold bonuses that cannot be derived
+    (:data:`BONUS_KEYS`, such as 'hat_trick') are left out. A scoring key that matches no stat in a game log counts as 0
+    points and is logged as a warning, once per key; map it with ``stat_map``.
+
+    .. code-block:: python
+
+        projector = LiveProjector('mlb')
+        projector.add_tradeables(client.get_event(event_id).tradeables)
+        projector.update_game_logs(client.get_game_logs(limit=500))
+        projector.attach(socket_manager)       # games topic: amount_completed
+        projector.subscribe(lambda changed: print(changed))
+
+    :ivar league:   the event's league
+    :ivar scoring:  points per stat, default: the league's table in Client
+    :ivar stat_map: stat key by scoring key, overriding :data:`STAT_ALIASES`, e.g. {'3pm': 'three_points_made'}
+    :ivar stats:    counts of inputs applied and rows recomputed, and seconds spent applying and recomputing them
+    """
+
+    def __init__(self, league: str, scoring: Dict[str, float] = None, stat_map: Dict[str, str] = None,
+                 capacity: int = 64):
+        np = _numpy()
+        self.league = league
+        if scoring is None:
+            scoring = getattr(Client, f'{league.upper()}_SCORING')
+        self.scoring = dict(scoring)
+        self.stat_map = dict(STAT_ALIASES.get(league, {}), **(stat_map or {}))
+        self._derived = DERIVED_STATS.get(league, {})
+        bonuses = BONUS_KEYS.get(league, ())
+        self._keys = [key for key in self.scoring if key not in bonuses]
+        self._unmatched = set()
+        self._weights = np.array([self.scoring[key] for key in self._keys], dtype=np.float64)
+        self._actual = np.zeros((capacity, len(self._keys)))
+        self._projected = np.zeros((capacity, len(self._keys)))
+        self._completed = np.zeros(capacity)
+        self._points = np.full(capacity, np.nan)
+        self._dirty = np.zeros(capacity, dtype=bool)
+        self._rows = {}
+        self._tradeable_ids = []
+        self._by_entity = {}
+        self._by_game = {}
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._managers = []
+        self.stats = {'inputs': 0, 'recomputed': 0, 'seconds': 0.0}
+
+    @property
+    def updates_per_second(self) -> float:
+        """inputs (game logs and games) processed per second spent applying and recomputing them"""
+        return self.stats['inputs'] / self.stats['seconds'] if self.stats['seconds'] else 0.0
+
+    def _grow(self, size: int):
+        np = _numpy()
+        capacity = len(self._completed)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        pad = capacity - len(self._completed)
+        self._actual = np.vstack([self._actual, np.zeros((pad, len(self._keys)))])
+        self._projected = np.vstack([self._projected, np.zeros((pad, len(self._keys)))])
+        self._completed = np.concatenate([self._completed, np.zeros(pad)])
+        self._points = np.concatenate([self._points, np.full(pad, np.nan)])
+        self._dirty = np.concatenate([self._dirty, np.zeros(pad, dtype=bool)])
+
+    def _vector(self, stats: Dict):
+        np = _numpy()
+        flat = _flatten(stats)
+        values = []
+        for key in self._keys:
+            value = None
+            if key in self._derived and key not in self.stat_map:
+                try:
+                    value = self._derived[key](flat)
+                except KeyError:
+                    pass
+            else:
+                for candidate in (self.stat_map.get(key), key, key + 's'):
+                    if candidate is not None and candidate in flat:
+                        value = flat[candidate]
+                        break
+            if value is None and flat and key not in self._unmatched:
+                self._unmatched.add(key)
+                log.warning('%s scoring key %s matches no game log stat and counts as 0, map it with stat_map',
+                            self.league, key)
+            values.append(value or 0.0)
+        return np.array(values, dtype=np.float64)
+
+    def add_tradeables(self, tradeables: Iterable[Tradeable]):
+        """
+        adds rows for tradeables, joined to game logs by entity_id and to games by focus_game_id
+        """
+        tradeables = list(tradeables)
+        with self._lock:
+            self._grow(len(self._rows) + len(tradeables))
+            for tradeable in tradeables:
+                if tradeable.tradeable_id in self._rows:
+                    continue
+                row = self._rows[tradeable.tradeable_id] = len(self._tradeable_ids)
+                self._tradeable_ids.append(tradeable.tradeable_id)
+                self._by_entity.setdefault(tradeable.entity_id, []).append(row)
+                if tradeable.game_id:
+                    self._by_game.setdefault(tradeable.game_id, []).append(row)
+                self._dirty[row] = True
+
+    def update_game_log(self, game_log: GameLog) -> bool:
+        """
+        applies a game log's projected and actual stats to its entity's tradeables
+
+        :returns: whether any input changed
+        :rtype: bool
+        """
+        np = _numpy()
+        started = time.perf_counter()
+        rows = self._by_entity.get(game_log.entity_id)
+        if not rows:
+            return False
+        actual = self._vector(game_log.actual_stats)
+        projected = self._vector(game_log.projected_stats)
+        changed = False
+        with self._lock:
+            self.stats['inputs'] += 1
+            for row in rows:
+                if not (np.array_equal(self._actual[row], actual) and np.array_equal(self._projected[row], projected)):
+                    self._actual[row] = actual
+                    self._projected[row] = projected
+                    self._dirty[row] = True
+                    changed = True
+                if game_log.game_id and row not in self._by_game.get(game_log.game_id, ()):
+                    self._by_game.setdefault(game_log.game_id, []).append(row)
+            completed = game_log.game.amount_completed if game_log.game is not None else None
+        if completed is not None:
+            changed = self._set_completed(rows, completed) or changed
+        self._spent(started)
+        return changed
+
+    def _spent(self, started: float):
+        with self._lock:
+            self.stats['seconds'] += time.perf_counter() - started
+
+    def update_game_logs(self, game_logs: Iterable[GameLog]) -> Dict[str, float]:
+        """
+        applies many game logs, then recomputes
+
+        :returns: the projections that changed, by tradeable_id
+        :rtype: Dict[str, float]
+        """
+        for game_log in game_logs:
+            self.update_game_log(game_log)
+        return self.recompute()
+
+    def _set_completed(self, rows: List[int], completed: float) -> bool:
+        changed = False
+        with self._lock:
+            for row in rows:
+                if self._completed[row] != completed:
+                    self._completed[row] = completed
+                    self._dirty[row] = True
+                    changed = True
+        return changed
+
+    def update_game(self, game: Game) -> bool:
+        """
+        applies a game's amount_completed to the tradeables playing in it
+
+        :returns: whether any input changed
+        :rtype: bool
+        """
+        if game.amount_completed is None:
+            return False
+        started = time.perf_counter()
+        with self._lock:
+            self.stats['inputs'] += 1
+        changed = self._set_completed(self._by_game.get(game.game_id, []), game.amount_completed)
+        self._spent(started)
+        return changed
+
+    def recompute(self) -> Dict[str, float]:
+        """
+        projects the rows whose inputs changed since the last recompute
+
+        :returns: the projections that changed, by tradeable_id
+        :rtype: Dict[str, float]
+        """
+        np = _numpy()
+        started = time.perf_counter()
+        with self._lock:
+            rows = np.flatnonzero(self._dirty)
+            if not len(rows):
+                return {}
+            remaining = 1.0 - np.clip(self._completed[rows], 0.0, 1.0)
+            live = self._actual[rows] + self._projected[rows] * remaining[:, None]
+            points = live @ self._weights
+            old = self._points[rows]
+            self._points[rows] = points
+            self._dirty[rows] = False
+            changed = {self._tradeable_ids[row]: float(value) for row, value, previous in zip(rows, points, old)
+                       if value != previous}
+            self.stats['recomputed'] += len(rows)
+            self.stats['seconds'] += time.perf_counter() - started
+        if changed:
+            for callback in list(self._subscribers):
+                try:
+                    callback(changed)
+                except Exception as e:
+                    log.warning('projection subscriber %s failed: %s', callback, e)
+        return changed
+
+    def projection(self, tradeable_id: str) -> Union[float, None]:
+        """
+        :returns: the tradeable's projected fantasy points as of the last recompute
+        :rtype: float
+        """
+        row = self._rows.get(tradeable_id)
+        if row is None or self._points[row] != self._points[row]:
+            return None
+        return float(self._points[row])
+
+    def projections(self) -> Dict[str, float]:
+        """
+        :returns: every projected tradeable's points by tradeable_id
+        :rtype: Dict[str, float]
+        """
+        return {tradeable_id: float(self._points[row]) for tradeable_id, row in self._rows.items()
+                if self._points[row] == self._points[row]}
+
+    def subscribe(self, callback: Callable):
+        """
+        :param callback: called with {tradeable_id: points} after every recompute that changed a projection
+        :type callback: callable, required
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def on_message(self, message: dict):
+        """
+        socket listener: applies game messages and recomputes
+        """
+        obj = message.get(message.get('object'))
+        if isinstance(obj, Game) and self.update_game(obj):
+            self.recompute()
+
+    def attach(self, socket_manager):
+        """
+        keeps games' amount_completed up to date from a socket manager subscribed to the 'games' topic. Game logs have
+        no topic; apply them with :meth:`update_game_logs`.
+        """
+        socket_manager.add_listener(self.on_message)
+        self._managers.append(socket_manager)
+
+    def detach(self):
+        for manager in self._managers:
+            manager.remove_listener(self.on_message)
+        self._managers = []
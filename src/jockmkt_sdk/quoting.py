@@ -0,0 +1,170 @@
+import logging
+from collections import namedtuple
+from typing import Iterable
+
+from .objects import Order
+
+log = logging.getLogger(__name__)
+
+Quote = namedtuple('Quote', ['tradeable_id', 'side', 'price', 'qty'])
+Quote.__doc__ = """a desired resting order: (tradeable_id, side, price, qty). A qty of 0 means no order on that side."""
+
+
+class QuoteUpdate(object):
+    """
+    The result of :meth:`QuoteEngine.sync` (or the plan returned by :meth:`QuoteEngine.plan`).
+
+    :ivar cancels:  :class:`objects.Order` objects that were (or should be) cancelled
+    :ivar places:   :class:`Quote` objects that were (or should be) placed
+    :ivar kept:     open orders left untouched because they are within tolerance of their target
+    :ivar deferred: :class:`Quote` targets not acted on because the order budget ran out, most useful first
+    :ivar errors:   a list of (order id or Quote, exception) for requests that failed
+    """
+
+    def __init__(self, cancels=None, places=None, kept=None, deferred=None):
+        self.cancels = cancels or []
+        self.places = places or []
+        self.kept = kept or []
+        self.deferred = deferred or []
+        self.errors = []
+
+    @property
+    def actions(self) -> int:
+        """number of order requests (cancels + placements) this update uses from the order budget"""
+        return len(self.cancels) + len(self.places)
+
+    def __repr__(self):
+        return str(self.__dict__) + '\n'
+
+    def __str__(self):
+        return str(self.__dict__) + '\n'
+
+
+class QuoteEngine(object):
+    """
+    Keeps a set of resting orders in line with a target set of quotes while using as few orders as possible from the
+    10 orders per minute budget. Every tick the user passes the quotes they want; the engine compares them with the
+    user's open orders and only cancels and re-places what is actually different.
+
+    An open order is kept if its price is within ``price_tolerance`` and its remaining quantity within
+    ``qty_tolerance`` of the target. When ``max_actions`` limits the update, the largest changes go first: orders
+    with no target and brand new quotes, then re-quotes ordered by how far the price moved.
+
+    :ivar client:          the :class:`client.Client` used to fetch, place and cancel orders
+    :ivar price_tolerance: price difference (in dollars) below which an open order is not re-quoted, default: 0
+    :ivar qty_tolerance:   remaining quantity difference below which an open order is not re-quoted, default: 0
+    :ivar phase:           phase in which new orders are placed, 'live' or 'ipo'. Note ipo orders cannot be cancelled.
+    """
+
+    def __init__(self, client, price_tolerance: float = 0.0, qty_tolerance: int = 0, phase: str = 'live'):
+        self.client = client
+        self.price_tolerance = price_tolerance
+        self.qty_tolerance = qty_tolerance
+        self.phase = phase
+
+    def _normalize(self, target) -> Quote:
+        quote = Quote(*target)
+        if quote.qty <= 0:
+            return quote._replace(qty=0)
+        order = self.client._build_order(quote.tradeable_id, quote.price, quote.qty, quote.side, self.phase)
+        return quote._replace(price=float(order['limit_price']), qty=int(order['quantity']))
+
+    @staticmethod
+    def _remaining(order: Order) -> int:
+        return int(order.quantity or 0) - int(order.filled_quantity or 0)
+
+    def _within_tolerance(self, order: Order, quote: Quote) -> bool:
+        return abs(float(order.limit_price) - quote.price) <= self.price_tolerance + 1e-9 and \
+            abs(self._remaining(order) - quote.qty) <= self.qty_tolerance
+
+    def plan(self, targets: Iterable, open_orders: Iterable[Order], max_actions: int = None) -> QuoteUpdate:
+        """
+        Computes the minimal set of cancels and new orders that turns ``open_orders`` into ``targets``, without
+        sending anything.
+
+        :param targets: the desired quotes, as :class:`Quote` or (tradeable_id, side, price, qty) tuples. Only one quote
+            per tradeable and side is supported.
+        :type targets: iterable, required
+        :param open_orders: the user's active :class:`objects.Order` objects, e.g. from get_orders(active=True)
+        :type open_orders: iterable, required
+        :param max_actions: maximum number of order requests to use, default: no limit
+        :type max_actions: int, optional
+
+        :returns: the planned update
+        :rtype: QuoteUpdate
+        """
+        wanted = {}
+        for target in targets:
+            quote = self._normalize(target)
+            wanted[(quote.tradeable_id, quote.side)] = quote
+
+        resting = {}
+        for order in open_orders:
+            resting.setdefault((order.tradeable_id, order.side), []).append(order)
+
+        # each change is (priority, cancels, quote to place or None)
+        changes = []
+        kept = []
+        for key, orders in resting.items():
+            quote = wanted.get(key)
+            if quote is None or quote.qty == 0:
+                changes.append((float('inf'), orders, None))
+                continue
+            keep = next((order for order in orders if self._within_tolerance(order, quote)), None)
+            if keep is not None:
+                kept.append(keep)
+                extra = [order for order in orders if order is not keep]
+                if extra:
+                    changes.append((float('inf'), extra, None))
+                continue
+            moved = min(abs(float(order.limit_price) - quote.price) for order in orders)
+            changes.append((moved, orders, quote))
+        for key, quote in wanted.items():
+            if key not in resting and quote.qty > 0:
+                changes.append((float('inf'), [], quote))
+
+        changes.sort(key=lambda change: change[0], reverse=True)
+        update = QuoteUpdate(kept=kept)
+        budget = float('inf') if max_actions is None else max_actions
+        for _, cancels, quote in changes:
+            cost = len(cancels) + (quote is not None)
+            if cost > budget:
+                if quote is not None:
+                    update.deferred.append(quote)
+                continue
+            budget -= cost
+            update.cancels.extend(cancels)
+            if quote is not None:
+                update.places.append(quote)
+        return update
+
+    def sync(self, targets: Iterable, event_id: str, max_actions: int = None) -> QuoteUpdate:
+        """
+        Fetches the user's active orders in the event, then cancels and places orders so they match ``targets``.
+        Cancels are sent before placements. Requests that fail are recorded in QuoteUpdate.errors.
+
+        :param targets: the desired quotes, as :class:`Quote` or (tradeable_id, side, price, qty) tuples
+        :type targets: iterable, required
+        :param event_id: the event being quoted
+        :type event_id: str, required
+        :param max_actions: maximum number of order requests to use on this update, default: no limit
+        :type max_actions: int, optional
+
+        :returns: what was done
+        :rtype: QuoteUpdate
+        """
+        update = self.plan(targets, self.client._get_active_orders(event_id), max_actions)
+        log.debug('quote update for %s: %s cancels, %s placements, %s kept, %s deferred', event_id,
+                  len(update.cancels), len(update.places), len(update.kept), len(update.deferred))
+        if update.cancels:
+            for order_id, result in self.client.cancel_orders([order.order_id for order in update.cancels]):
+                if isinstance(result, Exception):
+                    update.errors.append((order_id, result))
+        if update.places:
+            new_orders = [{'id': quote.tradeable_id, 'price': quote.price, 'qty': quote.qty, 'side': quote.side,
+                         'phase': self.phase} for quote in update.places]
+            by_tradeable = {(quote.tradeable_id, quote.side): quote for quote in update.places}
+            for request, result in self.client.place_orders(new_orders):
+                if isinstance(result, Exception):
+                    update.errors.append((by_tradeable[(request['tradeable_id'], request['side'])], result))
+        return update
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+from . import timeouts
+from .exception import DeadlineExceeded
+
+log = logging.getLogger(__name__)
+
+
+class RateLimiter(object):
+    """
+    Client-side mirror of Jock MKT's rate limits: at most ``limit`` requests per clock minute, with the budget
+    resetting at the start of every new minute (e.g. 12:00:00, 12:01:00). Callers block in :meth:`acquire` until the
+    request fits in the budget, instead of sending it and receiving a 429.
+
+    :ivar limit:  number of requests allowed per period
+    :ivar period: length of a rate limit window in seconds, default: 60
+    """
+    _SHARED = {}
+    _SHARED_LOCK = threading.Lock()
+
+    def __init__(self, limit: int, period: float = 60):
+        self.limit = limit
+        self.period = period
+        self._lock = threading.Lock()
+        self._window = None
+        self._used = 0
+        self._blocked_until = 0.0
+
+    @classmethod
+    def shared(cls, name: str, limit: int, period: float = 60) -> 'RateLimiter':
+        """
+        returns the limiter registered under ``name`` (e.g. 'orders:<api_key>'), creating it if necessary, so that every
+        client using the same account draws from the same budget. If it is requested again with a different budget,
+        the stricter one (fewer requests per second) is kept, and a warning is logged.
+        """
+        with cls._SHARED_LOCK:
+            limiter = cls._SHARED.get(name)
+            if limiter is None:
+                limiter = cls._SHARED[name] = cls(limit, period)
+            elif (limiter.limit, limiter.period) != (limit, period):
+                with limiter._lock:
+                    if limit / period < limiter.limit / limiter.period:
+                        limiter.limit, limiter.period = limit, period
+                log.warning('rate limiter %s was requested with %s per %ss, sharing the stricter %s per %ss', name,
+                            limit, period, limiter.limit, limiter.period)
+            return limiter
+
+    def _current_window(self, now: float) -> int:
+        return int(now // self.period)
+
+    def try_acquire(self) -> bool:
+        """
+        takes a slot from the current window if one is available
+
+        :returns: whether a slot was taken
+        :rtype: bool
+        """
+        now = time.time()
+        with self._lock:
+            if now < self._blocked_until:
+                return False
+            window = self._current_window(now)
+            if window != self._window:
+                self._window = window
+                self._used = 0
+            if self._used < self.limit:
+                self._used += 1
+                return True
+            return False
+
+    def acquire(self) -> float:
+        """
+        blocks until a slot is available in the current window and takes it. Under a :class:`timeouts.Deadline`, a wait
+        that would outlast it raises instead of sleeping.
+
+        :returns: the number of seconds spent waiting
+        :rtype: float
+        :raises DeadlineExceeded: if the budget does not reset before the current deadline
+        """
+        waited = 0.0
+        while not self.try_acquire():
+            wait = self.reset_in()
+            running = timeouts.current()
+            remaining = running.remaining() if running is not None else None
+            if remaining is not None and wait >= remaining:
+                raise DeadlineExceeded(f'rate limit budget of {self.limit} per {self.period}s resets in {wait:.2f}s, '
+                                       f'after the deadline of {running.total}s', phase='deadline',
+                                       timings=running.timings(rate_limit_wait=round(wait, 4)))
+            log.info('rate limit budget of %s per %ss used, waiting %.2f seconds', self.limit, self.period, wait)
+            time.sleep(wait)
+            waited += wait
+        return waited
+
+    def exhaust(self, until: float = None):
+        """
+        marks the budget as used up until ``until`` (epoch seconds), e.g. the reset time of a 429 response, so callers
+        wait for the server's reset instead of guessing. Default: until the end of the current window.
+        """
+        now = time.time()
+        with self._lock:
+            self._window = self._current_window(now)
+            self._used = self.limit
+            self._blocked_until = until or 0.0
+
+    def reset_in(self) -> float:
+        """
+        :returns: seconds until the budget resets
+        :rtype: float
+        """
+        now = time.time()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        return (self._current_window(now) + 1) * self.period - now
+
+    @property
+    def remaining(self) -> int:
+        """
+        number of requests still available in the current window
+        """
+        with self._lock:
+            now = time.time()
+            if now < self._blocked_until:
+                return 0
+            if self._window != self._current_window(now):
+                return self.limit
+            return self.limit - self._used
@@ -0,0 +1,283 @@
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from .objects import Entity, Entry, Event, GameLog, Order, Team, Tradeable
+
+log = logging.getLogger(__name__)
+
+# attributes where None is a real update (e.g. the last bid was cancelled) rather than a field missing from a response
+_NULLABLE = {
+    Tradeable: ('high', 'low', 'last', 'estimated', 'bid', 'ask', 'final'),
+}
+
+
+class Registry(object):
+    """
+    Interns :class:`objects.Entity`, :class:`objects.Team` and :class:`objects.Tradeable` objects across responses, so
+    there is one object per id no matter how many responses it appears in, and lookups are dict lookups instead of
+    scans over ``event.tradeables``.
+
+    Objects passed to :meth:`add` are merged into the registered copy (newer ``updated_at`` wins, fields missing from
+    the new response are kept) and the registered copy is returned, so references held by strategies see REST and
+    websocket updates in place. Nested objects are interned too: every tradeable of an entity shares one Entity, and
+    every entity of a team one Team.
+
+    .. code-block:: python
+
+        registry = Registry()
+        client = Client(secret, api_key, registry=registry)
+        event = client.get_event(event_id)
+        registry.attach(socket_manager)
+
+        tradeable = registry.tradeable('tdbl_xxx')
+        tradeable = registry.tradeable_for(event_id, entity_id)
+
+    :ivar tradeables: registered tradeables by tradeable_id
+    :ivar entities:   registered entities by entity_id
+    :ivar teams:      registered teams by team_id
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.tradeables = {}
+        self.entities = {}
+        self.teams = {}
+        self._by_event = {}
+        self._by_entity = {}
+        self._by_league = {}
+        self._tradeables_by_league = {}
+        self._by_team = {}
+        self._managers = []
+
+    # --- interning ---
+
+    @staticmethod
+    def _merge(existing, new) -> bool:
+        """
+        copies ``new`` into ``existing`` unless it is older
+
+        :returns: whether anything was copied
+        """
+        if new is existing:
+            return False
+        if existing.updated_at is not None and new.updated_at is not None and new.updated_at < existing.updated_at:
+            return False
+        nullable = _NULLABLE.get(type(new), ())
+        for key, value in new.__dict__.items():
+            if value is not None or key in nullable:
+                existing.__dict__[key] = value
+        return True
+
+    @staticmethod
+    def _index(index: Dict, key, obj_id, obj):
+        if key is not None:
+            index.setdefault(key, {})[obj_id] = obj
+
+    @staticmethod
+    def _unindex(index: Dict, key, obj_id):
+        if key is not None and key in index:
+            index[key].pop(obj_id, None)
+
+    def add_team(self, team: Team) -> Team:
+        """
+        registers a team, or merges it into the registered team with the same id
+
+        :returns: the registered team
+        :rtype: objects.Team
+        """
+        if team is None or team.team_id is None:
+            return team
+        with self._lock:
+            existing = self.teams.get(team.team_id)
+            if existing is None:
+                self.teams[team.team_id] = team
+                return team
+            for key, value in team.__dict__.items():
+                if value is not None:
+                    existing.__dict__[key] = value
+            return existing
+
+    def add_entity(self, entity: Entity) -> Entity:
+        """
+        registers an entity and its team, or merges them into the registered copies
+
+        :returns: the registered entity
+        :rtype: objects.Entity
+        """
+        if entity is None or entity.entity_id is None:
+            return entity
+        with self._lock:
+            team = self.add_team(getattr(entity, 'team', None))
+            existing = self.entities.get(entity.entity_id)
+            if existing is None:
+                existing = self.entities[entity.entity_id] = entity
+            else:
+                self._unindex(self._by_team, getattr(existing, 'team_id', None), existing.entity_id)
+                previous_team = getattr(existing, 'team', None)
+                self._merge(existing, entity)
+                if team is None or team.team_id is None:
+                    team = previous_team
+            if team is not None:
+                existing.team = team
+            self._index(self._by_league, existing.league, existing.entity_id, existing)
+            self._index(self._by_team, getattr(existing, 'team_id', None), existing.entity_id, existing)
+            return existing
+
+    def add_tradeable(self, tradeable: Tradeable) -> Tradeable:
+        """
+        registers a tradeable and its entity, or merges them into the registered copies. Older updates are ignored.
+
+        :returns: the registered tradeable
+        :rtype: objects.Tradeable
+        """
+        if tradeable is None or tradeable.tradeable_id is None:
+            return tradeable
+        with self._lock:
+            entity = self.add_entity(tradeable.entity)
+            existing = self.tradeables.get(tradeable.tradeable_id)
+            if existing is None:
+                existing = self.tradeables[tradeable.tradeable_id] = tradeable
+            else:
+                self._unindex(self._tradeables_by_league, existing.league, existing.tradeable_id)
+                previous_entity = existing.entity
+                self._merge(existing, tradeable)
+                if entity is None or entity.entity_id is None:
+                    entity = previous_entity
+            existing.entity = entity
+            if entity is not None and entity.entity_id is not None:
+                existing.name = entity.name
+                existing.image = entity.image_url
+            self._index(self._by_event, existing.event_id, existing.tradeable_id, existing)
+            self._index(self._by_entity, existing.entity_id, existing.tradeable_id, existing)
+            self._index(self._tradeables_by_league, existing.league, existing.tradeable_id, existing)
+            return existing
+
+    def add(self, obj):
+        """
+        registers the entities, teams and tradeables in any response object (or list of them) and points the object
+        at the registered copies
+
+        :param obj: a Team, Entity, Tradeable, Event, GameLog, Order or Entry, or a list of them
+        :returns: the registered copy for Teams, Entities and Tradeables, otherwise ``obj`` itself
+        """
+        if isinstance(obj, list):
+            return [self.add(item) for item in obj]
+        if isinstance(obj, Tradeable):
+            return self.add_tradeable(obj)
+        if isinstance(obj, Entity):
+            return self.add_entity(obj)
+        if isinstance(obj, Team):
+            return self.add_team(obj)
+        if isinstance(obj, Event):
+            obj.tradeables = [self.add_tradeable(tradeable) for tradeable in obj.tradeables]
+        elif isinstance(obj, GameLog):
+            obj.entity = self.add_entity(obj.entity)
+            obj.team = self.add_team(obj.team)
+        elif isinstance(obj, Order):
+            if getattr(obj, 'tradeable', None) is not None:
+                obj.tradeable = self.add_tradeable(obj.tradeable)
+            if getattr(obj, 'entity', None) is not None:
+                obj.entity = self.add_entity(obj.entity)
+            if getattr(obj, 'event', None) is not None:
+                self.add(obj.event)
+        elif isinstance(obj, Entry):
+            self.add(obj.event)
+        return obj
+
+    # --- websockets ---
+
+    def on_message(self, message: dict):
+        """
+        socket listener: merges tradeable and event updates
+        """
+        obj = message.get(message.get('object'))
+        if isinstance(obj, (Tradeable, Event)):
+            self.add(obj)
+
+    def attach(self, socket_manager):
+        """
+        keeps the registry up to date with a socket manager's tradeable and event messages
+        """
+        socket_manager.add_listener(self.on_message)
+        self._managers.append(socket_manager)
+
+    def detach(self):
+        for manager in self._managers:
+            manager.remove_listener(self.on_message)
+        self._managers = []
+
+    # --- lookups ---
+
+    def tradeable(self, tradeable_id: str) -> Optional[Tradeable]:
+        """
+        :rtype: objects.Tradeable
+        """
+        return self.tradeables.get(tradeable_id)
+
+    def entity(self, entity_id: str) -> Optional[Entity]:
+        """
+        :rtype: objects.Entity
+        """
+        return self.entities.get(entity_id)
+
+    def team(self, team_id: str) -> Optional[Team]:
+        """
+        :rtype: objects.Team
+        """
+        return self.teams.get(team_id)
+
+    def tradeable_for(self, event_id: str, entity_id: str) -> Optional[Tradeable]:
+        """
+        a player's tradeable in an event
+
+        :rtype: objects.Tradeable
+        """
+        for tradeable in self._by_entity.get(entity_id, {}).values():
+            if tradeable.event_id == event_id:
+                return tradeable
+        return None
+
+    def event_tradeables(self, event_id: str) -> List[Tradeable]:
+        """
+        :rtype: List[objects.Tradeable]
+        """
+        return list(self._by_event.get(event_id, {}).values())
+
+    def entity_tradeables(self, entity_id: str) -> List[Tradeable]:
+        """
+        a player's tradeables across events
+
+        :rtype: List[objects.Tradeable]
+        """
+        return list(self._by_entity.get(entity_id, {}).values())
+
+    def league_tradeables(self, league: str) -> List[Tradeable]:
+        """
+        the registered tradeables of a league, across events
+
+        :rtype: List[objects.Tradeable]
+        """
+        return list(self._tradeables_by_league.get(league, {}).values())
+
+    def league_entities(self, league: str) -> List[Entity]:
+        """
+        :rtype: List[objects.Entity]
+        """
+        return list(self._by_league.get(league, {}).values())
+
+    def team_entities(self, team_id: str) -> List[Entity]:
+        """
+        :rtype: List[objects.Entity]
+        """
+        return list(self._by_team.get(team_id, {}).values())
+
+    def favorites(self, entry: Entry) -> List[Tradeable]:
+        """
+        the registered tradeables an entry has favorited
+
+        :rtype: List[objects.Tradeable]
+        """
+        tradeable_ids = [favorite if isinstance(favorite, str) else favorite.get('tradeable_id', favorite.get('id'))
+                         for favorite in entry.favorites or []]
+        return [self.tradeables[tradeable_id] for tradeable_id in tradeable_ids if tradeable_id in self.tradeables]
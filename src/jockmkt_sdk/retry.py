@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+import requests
+
+from . import timeouts
+from .exception import DeadlineExceeded, JockAPIException, RateLimited, RequestTimeout
+from .ratelimit import RateLimiter
+
+log = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = ('get', 'delete')
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class RetryPolicy(object):
+    """
+    Decides whether and when a failed request is retried, and runs requests under that policy.
+
+    - Idempotent requests (GET, DELETE) are retried after a 5xx response, a dropped connection or a read timeout.
+    - POSTs (orders, entries) may have been processed when they fail that way, so they are never retried blindly:
+      only when the request certainly was not processed, i.e. it was rate limited (429) or the connection was never
+      established.
+    - Backoff is exponential with full jitter: a random delay between 0 and ``min(cap, base * 2 ** attempt)``, so
+      clients that failed together don't retry together. Rate limited requests wait until the limit resets instead,
+      if that is within ``max_wait``.
+    - Each endpoint (the first segment of the path, e.g. 'events') has a budget of retries per minute, so an outage
+      costs at most ``budget`` extra requests a minute rather than multiplying the load on the api.
+    - With ``hedge_after`` set, a GET that has not completed after that many seconds is sent a second time and the
+      first response wins, trimming tail latency. Hedges draw from the same budget.
+    - A retry that would not start before the call's :class:`timeouts.Deadline` passes is cancelled, raising
+      :class:`exception.DeadlineExceeded`.
+
+    .. code-block:: python
+
+        policy = RetryPolicy(max_retries=5, budgets={'orders': 5}, hedge_after=0.5)
+        client = Client(secret, api_key, retry_policy=policy)
+
+    :ivar max_retries: retries after the first attempt, default: 3
+    :ivar base:        backoff base in seconds, default: 0.5
+    :ivar cap:         longest backoff in seconds, default: 30
+    :ivar jitter:      randomize backoffs, default: True
+    :ivar max_wait:    longest wait for a rate limit to reset before giving up, default: 60
+    :ivar budget:      retries (and hedges) per minute per endpoint, default: 20
+    :ivar budgets:     budget overrides by endpoint, e.g. {'orders': 5}
+    :ivar hedge_after: seconds after which a GET is hedged, default: None (never)
+    :ivar statuses:    status codes retried for idempotent requests, default: 500, 502, 503 and 504
+    """
+
+    def __init__(self, max_retries: int = 3, base: float = 0.5, cap: float = 30, jitter: bool = True,
+                 max_wait: float = 60, budget: int = 20, budgets: Dict[str, int] = None, hedge_after: float = None,
+                 statuses=RETRY_STATUSES):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+        self.max_wait = max_wait
+        self.budget = budget
+        self.budgets = dict(budgets or {})
+        self.hedge_after = hedge_after
+        self.statuses = tuple(statuses)
+        self._limiters = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @staticmethod
+    def endpoint(path: str) -> str:
+        """the endpoint a path belongs to, e.g. 'events' for 'events/evt_xxx/tradeables'"""
+        return path.strip('/').split('/', 1)[0]
+
+    def _limiter(self, path: str) -> RateLimiter:
+        endpoint = self.endpoint(path)
+        with self._lock:
+            limiter = self._limiters.get(endpoint)
+            if limiter is None:
+                limiter = self._limiters[endpoint] = RateLimiter(self.budgets.get(endpoint, self.budget))
+            return limiter
+
+    def backoff(self, attempt: int) -> float:
+        """
+        :param attempt: the number of the attempt that failed, starting at 0
+        :returns: seconds to wait before the next attempt
+        :rtype: float
+        """
+        delay = min(self.cap, self.base * 2 ** attempt)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def retryable(self, method: str, error: Exception) -> bool:
+        """
+        whether a request that failed with ``error`` may be sent again
+        """
+        if isinstance(error, DeadlineExceeded):
+            return False
+        if isinstance(error, (RateLimited, requests.exceptions.ConnectTimeout)):
+            return True
+        if isinstance(error, RequestTimeout) and error.phase == 'connect':
+            return True
+        if method not in IDEMPOTENT_METHODS:
+            return False
+        if isinstance(error, (RequestTimeout, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        return isinstance(error, JockAPIException) and error.status_code in self.statuses
+
+    def retry_delay(self, method: str, path: str, error: Exception, attempt: int) -> Optional[float]:
+        """
+        :returns: seconds to wait before retrying, or None if the request should not be retried
+        :rtype: float
+        :raises DeadlineExceeded: if the retry could not start before the current deadline passes
+        """
+        if attempt >= self.max_retries or not self.retryable(method, error):
+            return None
+        if isinstance(error, RateLimited):
+            if error.retry_after > self.max_wait:
+                return None
+            delay = error.retry_after
+        else:
+            delay = self.backoff(attempt)
+        running = timeouts.current()
+        remaining = running.remaining() if running is not None else None
+        if remaining is not None and remaining <= delay:
+            raise DeadlineExceeded(f'deadline of {running.total}s leaves no time to retry {method.upper()} {path}',
+                                   phase='deadline', timings=running.timings(retry_in=round(delay, 4))) from error
+        if not self._limiter(path).try_acquire():
+            log.warning('retry budget of %s exhausted, not retrying %s %s', self.endpoint(path), method.upper(), path)
+            return None
+        log.warning('%s %s failed (%s), retry %s/%s in %.2f seconds', method.upper(), path, error, attempt + 1,
+                    self.max_retries, delay)
+        return delay
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix='jockmkt-hedge')
+            return self._executor
+
+    def _hedged(self, path: str, send: Callable, attempt: int):
+        first = self._pool().submit(contextvars.copy_context().run, send, attempt)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done or not self._limiter(path).try_acquire():
+            return first.result()
+        log.debug('GET %s took over %ss, hedging', path, self.hedge_after)
+        second = self._pool().submit(contextvars.copy_context().run, send, attempt)
+        done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        if winner.exception() is not None and pending:
+            return pending.pop().result()
+        return winner.result()
+
+    def call(self, method: str, path: str, send: Callable[[int], object]):
+        """
+        runs ``send(attempt)`` until it succeeds or the policy gives up, sleeping between attempts
+
+        :param send: sends the request once; called with the attempt number, starting at 0
+        :returns: the result of the successful attempt
+        :raises: the error of the last attempt
+        """
+        attempt = 0
+        while True:
+            try:
+                if self.hedge_after is not None and method == 'get':
+                    return self._hedged(path, send, attempt)
+                return send(attempt)
+            except Exception as e:
+                delay = self.retry_delay(method, path, e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def _hedged_async(self, loop, path: str, send: Callable, attempt: int):
+        first = loop.run_in_executor(None, contextvars.copy_context().run, send, attempt)
+        done, _ = await asyncio.wait([first], timeout=self.hedge_after)
+        if done or not self._limiter(path).try_acquire():
+            return await first
+        log.debug('GET %s took over %ss, hedging', path, self.hedge_after)
+        second = loop.run_in_executor(None, contextvars.copy_context().run, send, attempt)
+        done, pending = await asyncio.wait([first, second], return_when=asyncio.FIRST_COMPLETED)
+        winner = done.pop()
+        if winner.exception() is not None and pending:
+            return await pending.pop()
+        return winner.result()
+
+    async def call_async(self, method: str, path: str, send: Callable[[int], object], loop=None):
+        """
+        :meth:`call` for asyncio: each attempt runs in the loop's default executor and backoffs are awaited, so the
+        event loop is never blocked
+        """
+        loop = loop or asyncio.get_event_loop()
+        attempt = 0
+        while True:
+            try:
+                if self.hedge_after is not None and method == 'get':
+                    return await self._hedged_async(loop, path, send, attempt)
+                return await loop.run_in_executor(None, contextvars.copy_context().run, send, attempt)
+            except Exception as e:
+                delay = self.retry_delay(method, path, e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
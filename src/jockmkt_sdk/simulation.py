@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Union
+
+from .objects import Tradeable
+
+log = logging.getLogger(__name__)
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError('simulations require numpy: pip install numpy')
+    return np
+
+
+def _simulate_chunk(means, stdevs, floors, tiers, n_sims: int, seed, chunk_size: int):
+    """
+    runs ``n_sims`` simulations in batches of ``chunk_size``. Module level so it can run in a worker process.
+
+    :returns: (sum of payouts per tradeable, sum of ranks per tradeable)
+    """
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    n_players = len(means)
+    payout_sum = np.zeros(n_players)
+    rank_sum = np.zeros(n_players)
+    ranks = np.arange(1, n_players + 1, dtype=np.float64)
+    done = 0
+    while done < n_sims:
+        size = min(chunk_size, n_sims - done)
+        points = np.maximum(rng.normal(means, stdevs, size=(size, n_players)), floors)
+        # order[i, k] is the index of the tradeable finishing in position k + 1 of simulation i
+        order = np.argsort(-points, axis=1, kind='stable')
+        payouts = np.empty_like(points)
+        np.put_along_axis(payouts, order, np.broadcast_to(tiers, points.shape), axis=1)
+        finish = np.empty_like(points)
+        np.put_along_axis(finish, order, np.broadcast_to(ranks, points.shape), axis=1)
+        payout_sum += payouts.sum(axis=0)
+        rank_sum += finish.sum(axis=0)
+        done += size
+    return payout_sum, rank_sum
+
+
+class SimulationResult(object):
+    """
+    Expected outcomes per tradeable from :meth:`PayoutSimulator.run`
+
+    :ivar tradeable_ids:   the simulated tradeables, in the order of the arrays below
+    :ivar expected_payout: numpy array of the expected payout per share, i.e. the fair value of a share
+    :ivar expected_rank:   numpy array of the expected final rank
+    :ivar n_sims:          number of simulations run
+    :ivar elapsed:         seconds taken
+    """
+
+    def __init__(self, tradeable_ids: List[str], expected_payout, expected_rank, n_sims: int, elapsed: float):
+        self.tradeable_ids = tradeable_ids
+        self.expected_payout = expected_payout
+        self.expected_rank = expected_rank
+        self.n_sims = n_sims
+        self.elapsed = elapsed
+
+    def fair_values(self) -> Dict[str, float]:
+        """
+        :returns: expected payout per share by tradeable_id
+        :rtype: Dict[str, float]
+        """
+        return {tradeable_id: float(value) for tradeable_id, value in zip(self.tradeable_ids, self.expected_payout)}
+
+    def __repr__(self):
+        return str(self.__dict__) + '\n'
+
+    def __str__(self):
+        return str(self.__dict__) + '\n'
+
+
+class PayoutSimulator(object):
+    """
+    Monte Carlo simulation of an event's final standings. Each simulation samples every tradeable's final fantasy
+    points, ranks the field and pays each rank from the event's payout tiers; averaging gives the expected payout
+    per share, a fair value for the tradeable.
+
+    Final points are sampled as normal around ``fpts_proj_live`` (or the pregame projection), with a standard deviation
+    of ``cv`` times the points still to be scored (at least ``min_stdev`` while any remain), and never below the points
+    already scored. All simulations are vectorized with numpy; with ``workers`` > 1 they are split across processes,
+    which pays off for large fields (e.g. PGA) and large ``n_sims``. The process pool is started on the first run that
+    uses it and kept for later runs, until :meth:`close`.
+
+    .. code-block:: python
+
+        event = client.get_event(event_id)
+        with PayoutSimulator(event.payouts, workers=4) as simulator:
+            fair_values = simulator.run(event.tradeables, n_sims=20000).fair_values()
+
+    :ivar payouts:    payout tiers: a list of {'position': rank, 'amount': payout per share}, or the response of
+                      Client.get_event_payouts
+    :ivar cv:         standard deviation of final points as a fraction of the points remaining, default: 0.35
+    :ivar min_stdev:  minimum standard deviation for tradeables with points remaining, default: 1.0
+    :ivar workers:    number of processes to run simulations in, default: 1 (in process)
+    :ivar chunk_size: simulations per vectorized batch, bounding memory to chunk_size * tradeables floats,
+                      default: 2,000
+    """
+
+    def __init__(self, payouts: Union[List[Dict], Dict], cv: float = 0.35, min_stdev: float = 1.0, workers: int = 1,
+                 chunk_size: int = 2000):
+        if isinstance(payouts, dict):
+            payouts = payouts.get('payouts', [])
+        self.payouts = {tier['position']: float(tier['amount']) for tier in payouts}
+        self.cv = cv
+        self.min_stdev = min_stdev
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _inputs(self, tradeables: List[Tradeable]):
+        np = _numpy()
+        means, floors = [], []
+        for tradeable in tradeables:
+            projected = tradeable.fpts_proj_live
+            if projected is None:
+                projected = tradeable.fpts_proj_pregame
+            scored = tradeable.fpts_scored or 0.0
+            floors.append(scored)
+            means.append(max(projected or 0.0, scored))
+        means = np.asarray(means, dtype=np.float64)
+        floors = np.asarray(floors, dtype=np.float64)
+        remaining = means - floors
+        stdevs = np.where(remaining > 0, np.maximum(self.cv * remaining, self.min_stdev), 0.0)
+        tiers = np.array([self.payouts.get(rank, 0.0) for rank in range(1, len(tradeables) + 1)])
+        return means, stdevs, floors, tiers
+
+    def run(self, tradeables: List[Tradeable], n_sims: int = 10000, seed: int = None) -> SimulationResult:
+        """
+        simulates the event's final standings
+
+        :param tradeables: the event's tradeables, e.g. Event.tradeables. All of the field should be included, since
+            they compete for the same ranks.
+        :type tradeables: List[objects.Tradeable], required
+        :param n_sims: number of simulations, default: 10,000
+        :type n_sims: int, optional
+        :param seed: seed for reproducible results
+        :type seed: int, optional
+
+        :rtype: SimulationResult
+        :raises ValueError: if n_sims is less than 1
+        """
+        if n_sims < 1:
+            raise ValueError(f'n_sims must be at least 1, got {n_sims}')
+        np = _numpy()
+        started = time.perf_counter()
+        means, stdevs, floors, tiers = self._inputs(tradeables)
+        workers = max(1, min(self.workers, n_sims // self.chunk_size or 1))
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        counts = [n_sims // workers + (i < n_sims % workers) for i in range(workers)]
+        if workers == 1:
+            results = [_simulate_chunk(means, stdevs, floors, tiers, n_sims, seeds[0], self.chunk_size)]
+        else:
+            results = list(self._pool().map(_simulate_chunk, [means] * workers, [stdevs] * workers,
+                                            [floors] * workers, [tiers] * workers, counts, seeds,
+                                            [self.chunk_size] * workers))
+        payout_sum = sum(result[0] for result in results)
+        rank_sum = sum(result[1] for result in results)
+        elapsed = time.perf_counter() - started
+        log.debug('simulated %s tradeables %s times in %.3fs on %s workers', len(tradeables), n_sims, elapsed,
+                  workers)
+        return SimulationResult([tradeable.tradeable_id for tradeable in tradeables], payout_sum / n_sims,
+                                rank_sum / n_sims, n_sims, elapsed)
+
+    def close(self):
+        """
+        shuts down the worker processes
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,297 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .objects import Event, GameLog, Tradeable
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY, league TEXT, status TEXT, ipo_open_at INTEGER, updated_at INTEGER, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS events_league ON events (league, ipo_open_at);
+
+CREATE TABLE IF NOT EXISTS tradeables (
+    id TEXT PRIMARY KEY, event_id TEXT, entity_id TEXT, game_id TEXT, updated_at INTEGER, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS tradeables_event_id ON tradeables (event_id);
+CREATE INDEX IF NOT EXISTS tradeables_entity_id ON tradeables (entity_id);
+
+CREATE TABLE IF NOT EXISTS game_logs (
+    id TEXT PRIMARY KEY, entity_id TEXT, game_id TEXT, team_id TEXT, league TEXT, scheduled_start INTEGER,
+    updated_at INTEGER, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS game_logs_entity_id ON game_logs (entity_id, scheduled_start);
+CREATE INDEX IF NOT EXISTS game_logs_game_id ON game_logs (game_id);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    window TEXT PRIMARY KEY, watermark INTEGER, complete INTEGER NOT NULL DEFAULT 0, synced_at INTEGER);
+'''
+
+
+class LocalStore(object):
+    """
+    An on-disk SQLite store of historical events, tradeables and game logs, so research runs can be served locally
+    instead of re-downloading whole seasons.
+
+    The ``sync_*`` methods fetch through a :class:`client.Client`:
+
+    - the api has no updated_after filter for these lists, but lists newest first: each window remembers the newest
+      updated_at it has stored (its watermark), and paging stops at the first page that reaches rows no newer than
+      it. ``full=True`` walks every page instead, e.g. to pick up corrections to old rows.
+    - only rows that are new or have a newer updated_at than the stored copy are written
+    - a window that can no longer change (a finished event, the logs of a final game) is marked complete and never
+      requested again
+
+    :ivar path: path of the SQLite database, or ':memory:'
+    """
+    FINISHED_EVENT_STATUSES = ('cancelled', 'payouts_completed', 'prizes_paid', 'contests_paid')
+    FINISHED_GAME_STATUSES = ('final', 'closed', 'complete', 'cancelled')
+
+    def __init__(self, path: str = 'jockmkt.sqlite'):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    # --- sync state ---
+
+    def _window(self, window: str) -> Dict:
+        row = self._conn.execute('SELECT watermark, complete FROM sync_state WHERE window = ?', (window,)).fetchone()
+        if row is None:
+            return {'watermark': None, 'complete': False}
+        return {'watermark': row[0], 'complete': bool(row[1])}
+
+    def _mark(self, window: str, watermark: Optional[int], complete: bool):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO sync_state (window, watermark, complete, synced_at) '
+                               'VALUES (?, ?, ?, ?)', (window, watermark, int(complete), round(time.time() * 1000)))
+
+    def is_complete(self, window: str) -> bool:
+        """
+        whether a sync window (e.g. 'event:evt_xxx' or 'game_logs:game=game_xxx:entity=None') is final and will not be
+        requested again
+        """
+        return self._window(window)['complete']
+
+    # --- writes ---
+
+    def _stored(self, table: str, ids: List[str]) -> Dict[str, Dict]:
+        """the stored data of rows by id"""
+        stored = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            query = 'SELECT id, data FROM {} WHERE id IN ({})'.format(table, ','.join('?' * len(chunk)))
+            stored.update((row_id, json.loads(data)) for row_id, data in self._conn.execute(query, chunk))
+        return stored
+
+    def _upsert(self, table: str, rows: List[tuple], replace: bool = False) -> int:
+        """
+        writes rows whose updated_at is newer than the stored copy (or every row, if replace). rows are
+        (id, ..., updated_at, data) tuples in table column order.
+
+        :returns: how many rows were new or changed
+        """
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            ids = [row[0] for row in rows]
+            stored = {}
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                query = 'SELECT id, updated_at FROM {} WHERE id IN ({})'.format(table, ','.join('?' * len(chunk)))
+                stored.update(self._conn.execute(query, chunk).fetchall())
+            changed = [row for row in rows
+                       if replace or row[0] not in stored or (row[-2] or 0) > (stored[row[0]] or 0)]
+            if changed:
+                query = 'INSERT OR REPLACE INTO {} VALUES ({})'.format(table, ','.join('?' * len(rows[0])))
+                self._conn.executemany(query, changed)
+        return len(changed)
+
+    def add_events(self, events: List[Dict], replace: bool = False) -> int:
+        """
+        stores raw event dicts, as returned by the api. Included tradeables are stored too. An event is merged into its
+        stored copy, so a list row without tradeables, games or payouts keeps those of a full event stored earlier.
+        """
+        tradeables = []
+        for event in events:
+            tradeables.extend(event.get('tradeables', []))
+        self.add_tradeables(tradeables)
+        stored = self._stored('events', [event['id'] for event in events])
+        events = [dict(stored[event['id']], **event) if event['id'] in stored else event for event in events]
+        return self._upsert('events', [(event['id'], event.get('league'), event.get('status'), event.get('ipo_open_at'),
+                                        event.get('updated_at'), json.dumps(event)) for event in events], replace)
+
+    def add_tradeables(self, tradeables: List[Dict]) -> int:
+        """stores raw tradeable dicts, as returned by the api"""
+        return self._upsert('tradeables', [(tdbl['id'], tdbl.get('event_id'), tdbl.get('entity_id'),
+                                            tdbl.get('focus_game_id'), tdbl.get('updated_at'), json.dumps(tdbl))
+                                           for tdbl in tradeables])
+
+    def add_game_logs(self, game_logs: List[Dict]) -> int:
+        """stores raw game log dicts, as returned by the api"""
+        rows = []
+        for game_log in game_logs:
+            league = game_log.get('stats', {}).get('league', game_log.get('projected_stats', {}).get('league'))
+            rows.append((game_log['id'], game_log.get('entity_id'), game_log.get('game_id'), game_log.get('team_id'),
+                         league, game_log.get('scheduled_start'), game_log.get('updated_at'), json.dumps(game_log)))
+        return self._upsert('game_logs', rows)
+
+    # --- sync ---
+
+    def _sync_pages(self, client, window: str, path: str, key: str, params: Dict, add, page_size: int,
+                    max_pages: int = None, full: bool = False):
+        """
+        requests pages until one is short, only repeats rows already seen in this walk, or (unless full) reaches rows
+        no newer than the window's watermark. The watermark only advances once a walk has reached one of these ends.
+
+        :returns: (rows added or changed, the last page's rows)
+        """
+        state = self._window(window)
+        watermark = None if full else state['watermark']
+        fetched = 0
+        page = 0
+        rows = []
+        newest = state['watermark'] or 0
+        seen = set()
+        ended = False
+        while max_pages is None or page < max_pages:
+            rows = client._get(path, params=dict(params, start=page * page_size, limit=page_size))[key]
+            ids = {row.get('id') for row in rows}
+            if rows and ids <= seen:
+                ended = True
+                break
+            seen.update(ids)
+            fetched += add(rows)
+            updated = [row.get('updated_at') or 0 for row in rows]
+            newest = max(updated + [newest])
+            page += 1
+            if len(rows) < page_size or (watermark is not None and min(updated) <= watermark):
+                ended = True
+                break
+        self._mark(window, (newest or None) if ended else state['watermark'], False)
+        return fetched, rows
+
+    def sync_events(self, client, league: str = None, page_size: int = 25, max_pages: int = None,
+                    full: bool = False) -> int:
+        """
+        fetches the pages of events (without tradeables) updated since the last sync and stores those that are new or
+        updated
+
+        :param client: the client used to make requests
+        :type client: client.Client, required
+        :param league: only sync one league
+        :type league: str, optional
+        :param full: walk every page, not just those updated since the last sync, default: False
+        :type full: bool, optional
+
+        :returns: the number of events added or updated
+        :rtype: int
+        """
+        params = {} if league is None else {'league': league}
+        changed, _ = self._sync_pages(client, f'events:league={league}', 'events', 'events', params, self.add_events,
+                                      page_size, max_pages, full)
+        log.debug('synced %s events for league=%s', changed, league)
+        return changed
+
+    def sync_event(self, client, event_id: str) -> bool:
+        """
+        fetches an event with its tradeables and games, unless it already finished when it was last synced
+
+        :returns: whether a request was made
+        :rtype: bool
+        """
+        window = f'event:{event_id}'
+        if self.is_complete(window):
+            return False
+        event = client._get(f'events/{event_id}', params={'include': str(['tradeables', 'games', 'payouts'])})['event']
+        self.add_events([event], replace=True)
+        self._mark(window, event.get('updated_at'), event.get('status') in self.FINISHED_EVENT_STATUSES)
+        return True
+
+    def sync_game_logs(self, client, game_id: str = None, entity_id: str = None, page_size: int = 100,
+                       max_pages: int = None, full: bool = False) -> int:
+        """
+        fetches the pages of game logs updated since the last sync, for a game, a player, or all game logs, and stores
+        those that are new or updated. A game's logs are requested with their game; once the game is final the window
+        is complete and is not requested again.
+
+        :param client: the client used to make requests
+        :type client: client.Client, required
+        :param game_id: only sync the logs of this game
+        :type game_id: str, optional
+        :param entity_id: only sync the logs of this player
+        :type entity_id: str, optional
+        :param full: walk every page, not just those updated since the last sync, default: False
+        :type full: bool, optional
+
+        :returns: the number of game logs added or updated
+        :rtype: int
+        """
+        window = f'game_logs:game={game_id}:entity={entity_id}'
+        if self.is_complete(window):
+            return 0
+        params = {}
+        if game_id is not None:
+            params['game_id'] = game_id
+            params['include'] = str(['game'])
+        if entity_id is not None:
+            params['entity_id'] = entity_id
+        changed, last = self._sync_pages(client, window, 'game_logs', 'game_logs', params, self.add_game_logs,
+                                         page_size, max_pages, full)
+        if game_id is not None and last and \
+                all(log_.get('game', {}).get('status') in self.FINISHED_GAME_STATUSES for log_ in last):
+            self._mark(window, self._window(window)['watermark'], True)
+        log.debug('synced %s game logs for %s', changed, window)
+        return changed
+
+    # --- queries ---
+
+    def _select(self, table: str, filters: Dict, order_by: str = None) -> List[Dict]:
+        clauses = [f'{column} = ?' for column, value in filters.items() if value is not None]
+        values = [value for value in filters.values() if value is not None]
+        query = f'SELECT data FROM {table}'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        if order_by:
+            query += f' ORDER BY {order_by}'
+        return [json.loads(row[0]) for row in self._conn.execute(query, values)]
+
+    def game_logs(self, entity_id: str = None, game_id: str = None, league: str = None) -> List[GameLog]:
+        """
+        stored game logs, filtered by player, game or league
+
+        :rtype: List[objects.GameLog]
+        """
+        return [GameLog(row) for row in self._select('game_logs', {'entity_id': entity_id, 'game_id': game_id,
+                                                                   'league': league}, 'scheduled_start')]
+
+    def events(self, league: str = None, status: str = None) -> List[Event]:
+        """
+        stored events, filtered by league or status
+
+        :rtype: List[objects.Event]
+        """
+        return [Event(row) for row in self._select('events', {'league': league, 'status': status}, 'ipo_open_at')]
+
+    def event(self, event_id: str) -> Optional[Event]:
+        """
+        a stored event, including its tradeables and games if it was stored with :meth:`sync_event`
+
+        :rtype: objects.Event
+        """
+        rows = self._select('events', {'id': event_id})
+        return Event(rows[0]) if rows else None
+
+    def tradeables(self, event_id: str = None, entity_id: str = None) -> List[Tradeable]:
+        """
+        stored tradeables, filtered by event or player
+
+        :rtype: List[objects.Tradeable]
+        """
+        return [Tradeable(row) for row in self._select('tradeables', {'event_id': event_id, 'entity_id': entity_id})]
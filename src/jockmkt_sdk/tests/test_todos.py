@@ -1,11 +1,23 @@
 import unittest.mock
 from unittest import mock, main, TestCase
 import pytest
+import asyncio
+import io
+import logging
+import os
 import sys
 import json
+import queue
+import tempfile
+import threading
+import time
 from datetime import datetime
 
-from jockmkt_sdk import client, objects
+from jockmkt_sdk import client, objects, log, auth, ratelimit, quoting, store, ticks, registry, interning, valuation, simulation, parsing, fields, poller, exception, retry, timeouts, accounts, gamestate, projection, bars, orderflow
+from jockmkt_sdk.exception import JockAPIException
+from jockmkt_sdk.jm_sockets import writer as writer_module
+from jockmkt_sdk.jm_sockets import sockets, sockets_update
+from jockmkt_sdk.jm_sockets import threaded
 
 
 authorization_res = json.load(open('./test_resources/authorization.json'))
@@ -45,14 +57,12 @@ class TestClient(TestCase):
         mock_auth_response.json.return_value = authorization_res
         get_auth_token_mock.return_value = mock_auth_response
 
-        mock_key_map = f'{_test_api_key}:{_test_secret_key}'
         mock_auth_request = self.mock_init._get_auth_token()
 
         mock_auth_dict = {'token': mock_auth_response.json()['token']['access_token'],
                           'expired_at': mock_auth_response.json()['token']['expired_at']}
         self.assertEqual(mock_auth_request, _test_auth_token)
-        self.assertIn(mock_key_map, self.mock_init._AUTH_TOKEN_MAP)
-        self.assertEqual(self.mock_init._AUTH_TOKEN_MAP[mock_key_map], mock_auth_dict)
+        self.assertEqual(self.mock_init.token_manager.token, mock_auth_dict)
 
     @mock.patch("jockmkt_sdk.client.requests.post")
     def test_place_order(self, place_order_mock):
@@ -73,6 +83,27 @@ class TestClient(TestCase):
                                                       is_test=True)
         self.assertEqual(mock_order_place, 'successfully rerouted an order that would have failed.')
 
+    def test_typed_exceptions(self):
+        limited = mock.Mock(status_code=429, headers={'Retry-After': '12'})
+        limited.json.return_value = order_limit_res
+        error = JockAPIException.from_response(limited)
+        self.assertIsInstance(error, exception.RateLimited)
+        self.assertEqual(error.code, 'rate_limit')
+        self.assertAlmostEqual(error.retry_after, 12, delta=1)
+        self.assertEqual(limited.json.call_count, 1)
+
+        unauthorized = mock.Mock(status_code=401)
+        unauthorized.json.side_effect = ValueError
+        self.assertIsInstance(JockAPIException.from_response(unauthorized), exception.AuthError)
+        self.assertEqual(JockAPIException('no token').message, 'no token')
+
+    def test_rate_limiter_exhaust(self):
+        limiter = ratelimit.RateLimiter(10, period=10 ** 9)
+        limiter.exhaust(time.time() + 30)
+        self.assertFalse(limiter.try_acquire())
+        self.assertEqual(limiter.remaining, 0)
+        self.assertAlmostEqual(limiter.reset_in(), 30, delta=1)
+
     @mock.patch('jockmkt_sdk.client.requests.get')
     def test_get_events(self, get_events_mock):
         mock_events_response = mock.Mock(status_code=200)
@@ -187,3 +218,1207 @@ class TestClient(TestCase):
         self.assertIsInstance(mock_aact_request[0].order.tradeable, objects.Tradeable)
         self.assertIsInstance(mock_aact_request[0].order.entity, objects.Entity)
         self.assertIsInstance(mock_aact_request[0].order.event, objects.Event)
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_json_request_logging(self, get_positions_mock):
+        mock_positions_response = mock.Mock(status_code=200)
+        mock_positions_response.json.return_value = position_res
+        get_positions_mock.return_value = mock_positions_response
+        self.mock_init.auth = _test_auth_dict
+
+        stream = io.StringIO()
+        handler = log.enable_logging(logging.DEBUG, json_format=True, stream=stream, subsystem='client')
+        try:
+            self.mock_init.get_positions()
+        finally:
+            logging.getLogger('jockmkt_sdk.client').removeHandler(handler)
+            logging.getLogger('jockmkt_sdk.client').setLevel(logging.NOTSET)
+
+        request_line = json.loads(stream.getvalue().splitlines()[0])
+        self.assertEqual(request_line['path'], '/v1/positions')
+        self.assertEqual(request_line['status_code'], 200)
+        self.assertTrue(request_line['request_id'].startswith('req_'))
+        self.assertIn('latency_ms', request_line)
+
+    def test_verbose_logging_is_idempotent(self):
+        logger = logging.getLogger('jockmkt_sdk')
+        self.addCleanup(logger.setLevel, logging.NOTSET)
+        try:
+            client.Client('secret', 'key', verbose=True)
+            client.Client('secret', 'key', verbose=True)
+            handlers = [h for h in logger.handlers if not isinstance(h, logging.NullHandler)]
+            self.assertEqual(len(handlers), 1)
+            self.assertEqual(logger.level, logging.INFO)
+        finally:
+            for handler in [h for h in logger.handlers if not isinstance(h, logging.NullHandler)]:
+                logger.removeHandler(handler)
+
+        # a level set by the application is left alone
+        logger.setLevel(logging.WARNING)
+        client.Client('secret', 'key', verbose=True)
+        self.assertEqual(logger.level, logging.WARNING)
+        self.assertEqual([h for h in logger.handlers if not isinstance(h, logging.NullHandler)], [])
+
+    @mock.patch('jockmkt_sdk.client.requests.post')
+    def test_place_orders(self, place_order_mock):
+        mock_place_order_response = mock.Mock(status_code=200)
+        mock_place_order_response.json.return_value = place_order_res
+        place_order_mock.return_value = mock_place_order_response
+        self.mock_init.auth = _test_auth_dict
+        self.mock_init.order_limiter = ratelimit.RateLimiter(10, period=10 ** 9)
+
+        orders = [{'id': 'tdbl_1', 'price': 10.019, 'qty': 2},
+                  {'id': 'tdbl_2', 'price': 30, 'side': 'sell', 'phase': 'live'},
+                  {'id': 'tdbl_3', 'price': 5, 'order_size': 52}]
+        results = list(self.mock_init.place_orders(orders))
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(isinstance(res, objects.Order) for _, res in results))
+        sent = {req['tradeable_id']: req for req, _ in results}
+        self.assertEqual(sent['tdbl_1']['limit_price'], '10.01')
+        self.assertEqual(sent['tdbl_2']['limit_price'], '25.00')
+        self.assertEqual(sent['tdbl_3']['quantity'], '10')
+        self.assertEqual(self.mock_init.order_limiter.remaining, 7)
+
+    def test_run_batch_threads_exit_without_consuming(self):
+        before = set(threading.enumerate())
+        done = []
+        self.mock_init._run_batch(done.append, list(range(6)), max_workers=3)
+        for _ in range(100):
+            if len(done) == 6 and not [t for t in set(threading.enumerate()) - before if t.is_alive()]:
+                break
+            time.sleep(0.01)
+        self.assertEqual(sorted(done), list(range(6)))
+        self.assertEqual([t for t in set(threading.enumerate()) - before if t.is_alive()], [])
+
+    def test_retry_order_keeps_the_callers_arguments(self):
+        limited = mock.Mock(status_code=429, headers={})
+        limited.json.return_value = order_limit_res
+        order = {'tradeable_id': 'tdbl_xxx', 'limit_price': '10.00'}
+        with mock.patch.object(self.mock_init, '_post', return_value={'order': {}}) as post, \
+                mock.patch.object(self.mock_init, 'order_limiter'):
+            self.mock_init._handle_response(limited, 'post', 'orders', 0,
+                                            payload={'data': order, 'params': {}, 'payload': order, 'is_test': False})
+        post.assert_called_once_with('orders', data=order, params={}, is_test=False)
+
+    @mock.patch('jockmkt_sdk.client.requests.post')
+    def test_place_orders_validates_before_sending(self, place_order_mock):
+        self.mock_init.auth = _test_auth_dict
+        with self.assertRaises(ValueError):
+            self.mock_init.place_orders([{'id': 'tdbl_1', 'price': 10}, {'id': 'tdbl_2', 'price': 10, 'side': 'hold'}])
+        place_order_mock.assert_not_called()
+
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_concurrent_identical_gets_share_one_request(self, get_positions_mock):
+        def slow_get(*args, **kwargs):
+            time.sleep(0.05)
+            mock_positions_response = mock.Mock(status_code=200)
+            mock_positions_response.json.return_value = position_res
+            return mock_positions_response
+        get_positions_mock.side_effect = slow_get
+        mock_client = client.Client(_test_secret_key, _test_api_key)
+        mock_client.auth = _test_auth_dict
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(mock_client.get_positions())) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(get_positions_mock.call_count, 1)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(mock_client.request_stats, {'sent': 1, 'coalesced': 5, 'cached': 0})
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_fresh_responses_are_reused(self, get_balance_mock):
+        mock_balance_response = mock.Mock(status_code=200)
+        mock_balance_response.json.return_value = {'status': 'success', 'balances': [{'currency': 'usd'}]}
+        get_balance_mock.return_value = mock_balance_response
+        mock_client = client.Client(_test_secret_key, _test_api_key, freshness={'balances': 60})
+        mock_client.auth = _test_auth_dict
+
+        mock_client.get_account_bal()
+        mock_client.get_account_bal()
+
+        self.assertEqual(get_balance_mock.call_count, 1)
+        self.assertEqual(mock_client.requests_saved, 1)
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_fresh_responses_after_writes_and_mutation(self, get_balance_mock):
+        mock_client = client.Client(_test_secret_key, _test_api_key, freshness={'balances': 60})
+        mock_client.auth = _test_auth_dict
+        mock_client.FRESH_ENTRIES = 2
+
+        def respond(*args, **kwargs):
+            if get_balance_mock.call_count == 1:
+                # an order is placed while the first GET is in flight
+                mock_client._invalidate()
+            response = mock.Mock(status_code=200)
+            response.json.return_value = {'status': 'success', 'balances': [{'n': get_balance_mock.call_count}]}
+            return response
+        get_balance_mock.side_effect = respond
+
+        self.assertEqual(mock_client._get('balances')['balances'], [{'n': 1}])
+        # the pre-write response was not kept
+        fresh = mock_client._get('balances')
+        self.assertEqual(fresh['balances'], [{'n': 2}])
+        fresh['balances'].clear()
+        self.assertEqual(mock_client._get('balances')['balances'], [{'n': 2}])
+        self.assertEqual(get_balance_mock.call_count, 2)
+
+        for page in range(3):
+            mock_client._get('balances', params={'start': page})
+        self.assertEqual(len(mock_client._fresh), 2)
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_get_after_a_write_does_not_join_an_earlier_flight(self, get_balance_mock):
+        mock_client = client.Client(_test_secret_key, _test_api_key)
+        mock_client.auth = _test_auth_dict
+        started, release = threading.Event(), threading.Event()
+
+        def respond(*args, **kwargs):
+            n = get_balance_mock.call_count
+            if n == 1:
+                started.set()
+                release.wait(5)
+            response = mock.Mock(status_code=200)
+            response.json.return_value = {'status': 'success', 'balances': [{'n': n}]}
+            return response
+        get_balance_mock.side_effect = respond
+
+        results = []
+        before = threading.Thread(target=lambda: results.append(mock_client._get('balances')))
+        before.start()
+        started.wait(5)
+        mock_client._invalidate()
+        after = mock_client._get('balances')
+        release.set()
+        before.join()
+
+        self.assertEqual(after['balances'], [{'n': 2}])
+        self.assertEqual(results[0]['balances'], [{'n': 1}])
+        self.assertEqual(get_balance_mock.call_count, 2)
+
+
+class TestQuoteEngine(TestCase):
+
+    @staticmethod
+    def _order(order_id, tradeable_id, side, price, quantity, filled=0):
+        return objects.Order({'id': order_id, 'tradeable_id': tradeable_id, 'side': side, 'limit_price': price,
+                              'quantity': quantity, 'filled_quantity': filled, 'status': 'accepted'})
+
+    def test_plan_minimal_changes(self):
+        engine = quoting.QuoteEngine(TestClient.mock_init, price_tolerance=0.05)
+        open_orders = [self._order('ord_keep', 'tdbl_1', 'buy', 5.00, 10),
+                       self._order('ord_move', 'tdbl_2', 'buy', 3.00, 10),
+                       self._order('ord_stale', 'tdbl_3', 'sell', 8.00, 4)]
+        targets = [('tdbl_1', 'buy', 5.03, 10), ('tdbl_2', 'buy', 3.50, 10), ('tdbl_4', 'sell', 9.999, 2)]
+
+        update = engine.plan(targets, open_orders)
+
+        self.assertEqual([order.order_id for order in update.kept], ['ord_keep'])
+        self.assertEqual(sorted(order.order_id for order in update.cancels), ['ord_move', 'ord_stale'])
+        self.assertEqual(sorted(update.places), [quoting.Quote('tdbl_2', 'buy', 3.5, 10),
+                                                 quoting.Quote('tdbl_4', 'sell', 9.99, 2)])
+
+    def test_plan_respects_budget(self):
+        engine = quoting.QuoteEngine(TestClient.mock_init)
+        open_orders = [self._order('ord_small', 'tdbl_1', 'buy', 5.00, 10),
+                       self._order('ord_big', 'tdbl_2', 'buy', 3.00, 10)]
+        targets = [('tdbl_1', 'buy', 5.01, 10), ('tdbl_2', 'buy', 4.00, 10)]
+
+        update = engine.plan(targets, open_orders, max_actions=2)
+
+        self.assertEqual([order.order_id for order in update.cancels], ['ord_big'])
+        self.assertEqual(update.places, [quoting.Quote('tdbl_2', 'buy', 4.0, 10)])
+        self.assertEqual(update.deferred, [quoting.Quote('tdbl_1', 'buy', 5.01, 10)])
+
+
+class TestSocketWriter(TestCase):
+
+    @staticmethod
+    def _frame(action, topic, event_id=None):
+        return {'action': action, 'subscription': {'type': topic, 'event_id': event_id, 'league': None}}
+
+    def test_queued_subscriptions_are_coalesced(self):
+        sent = []
+
+        class FakeSocket:
+            async def send(self, frame):
+                sent.append(json.loads(frame))
+
+        async def run():
+            writer = writer_module.SocketWriter()
+            # queued before the connection is ready: written in one batch once attached
+            writer.send(self._frame('subscribe', 'event', 'evt_1'))
+            writer.send(self._frame('subscribe', 'event', 'evt_2'))
+            writer.send(self._frame('subscribe', 'event', 'evt_1'))
+            writer.send({'action': 'unsubscribe', 'subscription': {'topic': 'event', 'event_id': 'evt_2',
+                                                                   'league': 'None'}})
+            writer.attach(FakeSocket())
+            await writer.flush()
+            # already subscribed, nothing to write
+            writer.send(self._frame('subscribe', 'event', 'evt_1'))
+            await writer.flush()
+            writer.close()
+            return writer.subscribed
+
+        subscribed = asyncio.run(run())
+
+        self.assertEqual(sent, [self._frame('subscribe', 'event', 'evt_1')])
+        self.assertEqual(subscribed, {('event', 'evt_1', None)})
+
+    def test_failed_frames_are_resent_after_reconnect(self):
+        sent = []
+
+        class DroppedSocket:
+            async def send(self, frame):
+                raise ConnectionError('connection dropped')
+
+        class FakeSocket:
+            async def send(self, frame):
+                sent.append(json.loads(frame))
+
+        # built outside any running loop, as the socket managers do
+        writer = writer_module.SocketWriter()
+
+        async def run():
+            writer.send(self._frame('subscribe', 'event', 'evt_1'))
+            writer.attach(DroppedSocket())
+            await asyncio.sleep(0.01)
+            writer.detach()
+            writer.attach(FakeSocket())
+            await asyncio.wait_for(writer.flush(), 1)
+            writer.close()
+
+        with self.assertLogs('jockmkt_sdk.jm_sockets.writer', logging.WARNING):
+            asyncio.run(run())
+        self.assertEqual(sent, [self._frame('subscribe', 'event', 'evt_1')])
+
+    def test_known_subscriptions_are_made_again_after_reconnect(self):
+        sent = []
+
+        class FakeSocket:
+            async def send(self, frame):
+                sent.append(json.loads(frame))
+
+        async def run():
+            writer = writer_module.SocketWriter()
+            writer.send(self._frame('subscribe', 'account'))
+            writer.attach(FakeSocket())
+            await writer.flush()
+            # made after connecting, and one of them dropped again
+            writer.send(self._frame('subscribe', 'event', 'evt_1'))
+            writer.send(self._frame('subscribe', 'event', 'evt_2'))
+            await writer.flush()
+            writer.send({'action': 'unsubscribe', 'subscription': {'topic': 'event', 'event_id': 'evt_2',
+                                                                   'league': 'None'}})
+            await writer.flush()
+            writer.detach()
+            sent.clear()
+            writer.attach(FakeSocket())
+            await writer.flush()
+            writer.close()
+
+        with self.assertLogs('jockmkt_sdk.jm_sockets.writer', logging.INFO) as logs:
+            asyncio.run(run())
+        self.assertEqual(sent, [self._frame('subscribe', 'account'), self._frame('subscribe', 'event', 'evt_1')])
+        # logged once written, for each connection
+        self.assertEqual(len([line for line in logs.output if 'subscribed to event event_id=evt_1' in line]), 2)
+
+    def test_both_socket_managers_accept_dicts_and_tuples(self):
+        frames = []
+
+        class FakeConnection:
+            async def send_message(self, msg):
+                frames.append(msg)
+
+        manager = sockets.JockmktSocketManager([])
+        manager.conn = FakeConnection()
+        asyncio.run(manager.subscribe_many([{'endpoint': 'games', 'league': 'nba'}, ('event', 'evt_1')]))
+        self.assertEqual(manager._subscriptions, [('games', None, 'nba'), ('event', 'evt_1', None)])
+        asyncio.run(manager.unsubscribe_many([{'endpoint': 'games', 'league': 'nba'}]))
+        self.assertEqual(manager._subscriptions, [('event', 'evt_1', None)])
+        self.assertEqual(len(frames), 3)
+
+
+class TestTokenManager(TestCase):
+
+    def test_concurrent_refresh_is_single_flight(self):
+        calls = []
+
+        def slow_fetch(api_key, secret):
+            calls.append(api_key)
+            time.sleep(0.05)
+            return dict(_test_auth_dict)
+
+        manager = auth.TokenManager('jm_key_single_flight', _test_secret_key, slow_fetch, background_refresh=False)
+        threads = [threading.Thread(target=manager.get_token) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(manager.get_token(), _test_auth_token)
+
+    def test_refresh_waiters_respect_the_deadline(self):
+        release = threading.Event()
+
+        def hung_fetch(api_key, secret):
+            release.wait(5)
+            return dict(_test_auth_dict)
+
+        manager = auth.TokenManager('jm_key_hung', _test_secret_key, hung_fetch, background_refresh=False)
+        owner = threading.Thread(target=manager.get_token)
+        owner.start()
+        time.sleep(0.02)
+        try:
+            with timeouts.deadline(0.05):
+                self.assertRaises(exception.DeadlineExceeded, manager.get_token)
+        finally:
+            release.set()
+            owner.join()
+
+    def test_token_cache_skips_oauth_after_restart(self):
+        fetch = mock.Mock(return_value=dict(_test_auth_dict))
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'tokens.json')
+            first = auth.TokenManager('jm_key_cached', _test_secret_key, fetch, cache_path=cache_path,
+                                      background_refresh=False)
+            first.get_token()
+            restarted = auth.TokenManager('jm_key_cached', _test_secret_key, fetch, cache_path=cache_path,
+                                          background_refresh=False)
+
+            self.assertEqual(restarted.get_token(), _test_auth_token)
+            self.assertEqual(fetch.call_count, 1)
+
+
+class TestLocalStore(TestCase):
+    mock_init = client.Client(_test_secret_key, _test_api_key)
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_sync_game_logs_only_writes_new_rows(self, get_game_logs_mock):
+        mock_game_log_response = mock.Mock(status_code=200)
+        mock_game_log_response.json.return_value = game_logs_res
+        self.mock_init.auth = _test_auth_dict
+        get_game_logs_mock.return_value = mock_game_log_response
+        local = store.LocalStore(':memory:')
+
+        self.assertEqual(local.sync_game_logs(self.mock_init), 100)
+        # the mock repeats the same page, which ends the first walk
+        self.assertEqual(get_game_logs_mock.call_count, 2)
+        self.assertEqual(local.sync_game_logs(self.mock_init), 0)
+        # nothing on the first page is newer than the watermark
+        self.assertEqual(get_game_logs_mock.call_count, 3)
+
+        entity_id = game_logs_res['game_logs'][0]['entity_id']
+        stored = local.game_logs(entity_id=entity_id)
+        self.assertEqual(len(stored), 4)
+        self.assertIsInstance(stored[0], objects.GameLog)
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_second_sync_only_requests_new_pages(self, get_events_mock):
+        rows = [{'id': f'evt_{n}', 'league': 'nba', 'updated_at': 1000 + n} for n in range(10)]
+
+        def respond(url, params=None, **kwargs):
+            newest_first = sorted(rows, key=lambda row: row['updated_at'], reverse=True)
+            start, limit = int(params['start']), int(params['limit'])
+            response = mock.Mock(status_code=200)
+            response.json.return_value = {'status': 'success', 'events': newest_first[start:start + limit]}
+            return response
+        get_events_mock.side_effect = respond
+        self.mock_init.auth = _test_auth_dict
+        local = store.LocalStore(':memory:')
+
+        self.assertEqual(local.sync_events(self.mock_init, page_size=4), 10)
+        self.assertEqual(get_events_mock.call_count, 3)
+
+        # two new events and an updated one fill less than one page
+        rows.extend({'id': f'evt_{n}', 'league': 'nba', 'updated_at': 2000 + n} for n in range(10, 12))
+        rows[9]['updated_at'] = 2100
+        get_events_mock.reset_mock()
+        self.assertEqual(local.sync_events(self.mock_init, page_size=4), 3)
+        self.assertEqual(get_events_mock.call_count, 1)
+
+        get_events_mock.reset_mock()
+        self.assertEqual(local.sync_events(self.mock_init, page_size=4), 0)
+        self.assertEqual(get_events_mock.call_count, 1)
+        self.assertEqual(local.sync_events(self.mock_init, page_size=4, full=True), 0)
+        self.assertEqual(get_events_mock.call_count, 5)
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_finished_event_is_not_requested_again(self, get_event_mock):
+        mock_event_response = mock.Mock(status_code=200)
+        mock_event_response.json.return_value = event_res
+        self.mock_init.auth = _test_auth_dict
+        get_event_mock.return_value = mock_event_response
+        local = store.LocalStore(':memory:')
+        event_id = event_res['event']['id']
+
+        self.assertTrue(local.sync_event(self.mock_init, event_id))
+        self.assertFalse(local.sync_event(self.mock_init, event_id))
+        self.assertEqual(get_event_mock.call_count, 1)
+        self.assertEqual(len(local.event(event_id).tradeables), 81)
+        self.assertEqual(len(local.tradeables(event_id=event_id)), 81)
+
+    def test_list_rows_do_not_erase_a_full_event(self):
+        local = store.LocalStore(':memory:')
+        event = event_res['event']
+        local.add_events([event], replace=True)
+        list_row = {key: value for key, value in event.items() if key not in ('tradeables', 'games', 'payouts')}
+        list_row['updated_at'] = (event.get('updated_at') or 0) + 1000
+        list_row['status'] = 'live'
+
+        self.assertEqual(local.add_events([list_row]), 1)
+        stored = local.event(event['id'])
+        self.assertEqual(stored.status, 'live')
+        self.assertEqual(len(stored.tradeables), 81)
+
+
+class TestTicks(TestCase):
+
+    def test_socket_ticks_are_memory_mapped(self):
+        tradeables = event_res['event']['tradeables']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'event.ticks')
+            manager = sockets_update.JockmktSocketManager(None)
+            writer = ticks.TickWriter(path)
+            writer.attach(manager)
+            for tradeable in tradeables + tradeables[:5]:
+                msg = json.dumps({'object': 'tradeable', 'tradeable': tradeable})
+                asyncio.run(manager._recv(msg))
+            writer.close()
+
+            reader = ticks.TickReader(path)
+            self.assertEqual(len(reader), len(tradeables))
+            history = reader.tradeable(tradeables[0]['id'])
+            self.assertEqual(history['timestamp'][0], tradeables[0]['updated_at'])
+            self.assertEqual(history['estimated'][0], tradeables[0]['price']['estimated'])
+            self.assertEqual(len(reader.tradeable_ids()), len(tradeables))
+
+
+class TestRegistry(TestCase):
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_tradeables_are_interned_and_updated_in_place(self, get_event_mock):
+        mock_event_response = mock.Mock(status_code=200)
+        mock_event_response.json.return_value = event_res
+        get_event_mock.return_value = mock_event_response
+        tradeables = registry.Registry()
+        mock_client = client.Client(_test_secret_key, _test_api_key, registry=tradeables)
+        mock_client.auth = _test_auth_dict
+
+        event_id = event_res['event']['id']
+        first = mock_client.get_event(event_id)
+        second = mock_client.get_event(event_id)
+        tdbl = event_res['event']['tradeables'][0]
+        self.assertIs(first.tradeables[0], second.tradeables[0])
+        self.assertIs(tradeables.tradeable(tdbl['id']), first.tradeables[0])
+        self.assertIs(tradeables.tradeable_for(event_id, tdbl['entity_id']), first.tradeables[0])
+        self.assertEqual(len(tradeables.event_tradeables(event_id)), 81)
+        self.assertEqual(len(tradeables.league_tradeables('nba')), 81)
+        self.assertEqual(tradeables.league_tradeables('nhl'), [])
+
+        update = json.loads(json.dumps(tdbl))
+        update['updated_at'] += 1000
+        update['price']['bid'] = None
+        tradeables.on_message({'object': 'tradeable', 'tradeable': objects.Tradeable(update)})
+        self.assertIsNone(first.tradeables[0].bid)
+
+        stale = json.loads(json.dumps(tdbl))
+        stale['price']['bid'] = 1.23
+        tradeables.add(objects.Tradeable(stale))
+        self.assertIsNone(first.tradeables[0].bid)
+
+
+class TestInterning(TestCase):
+
+    def test_repeated_ids_share_one_string(self):
+        table = interning.InternTable(max_size=1000)
+        frame = json.dumps({'object': 'tradeable', 'tradeable': event_res['event']['tradeables'][0]})
+        first = objects.Tradeable(table.loads(frame)['tradeable'])
+        second = objects.Tradeable(table.loads(frame)['tradeable'])
+
+        self.assertIsNot(first, second)
+        self.assertIs(first.tradeable_id, second.tradeable_id)
+        self.assertIs(first.event_id, second.event_id)
+        self.assertIs(first.league, second.league)
+
+    def test_table_is_bounded(self):
+        table = interning.InternTable(max_size=10)
+        for i in range(25):
+            table.intern(f'tdbl_{i}')
+        self.assertLessEqual(len(table), 10)
+
+
+class TestValuationEngine(TestCase):
+
+    def test_incremental_valuation(self):
+        event_id = event_res['event']['id']
+        tdbl = dict(event_res['event']['tradeables'][0], event_id=event_id)
+        engine = valuation.ValuationEngine(mark='bid')
+        engine.set_payouts(event_id, [{'position': 1, 'amount': 25}, {'position': 2, 'amount': 15},
+                                      {'position': 3, 'amount': 10}])
+        engine.update_position(objects.Position({'tradeable_id': tdbl['id'], 'event_id': event_id, 'quantity': 5,
+                                                 'cost_basis': 80, 'cost_basis_all_time': 100,
+                                                 'proceeds_all_time': 30}))
+
+        live = json.loads(json.dumps(tdbl))
+        live['price']['final'] = None
+        engine.on_message({'object': 'tradeable', 'tradeable': objects.Tradeable(live)})
+        portfolio = engine.portfolio(event_id)
+        self.assertAlmostEqual(portfolio.market_value, 5 * live['price']['bid'])
+        self.assertAlmostEqual(portfolio.estimated_payout, 5 * 10)
+        self.assertAlmostEqual(portfolio.realized_pnl, 10)
+
+        engine.update_tradeable(objects.Tradeable(tdbl))
+        self.assertAlmostEqual(portfolio.market_value, 5 * tdbl['price']['final'])
+        self.assertAlmostEqual(portfolio.pnl, 10 + 5 * tdbl['price']['final'] - 80)
+
+
+class TestPayoutSimulator(TestCase):
+    tiers = [{'position': rank, 'amount': amount} for rank, amount in enumerate([25, 15, 10, 5, 5], 1)]
+
+    def live_tradeables(self):
+        tradeables = []
+        for tdbl in event_res['event']['tradeables']:
+            tdbl = json.loads(json.dumps(tdbl))
+            tdbl['points']['scored'] = 0
+            tradeables.append(objects.Tradeable(tdbl))
+        return tradeables
+
+    def test_expected_payouts_sum_to_tiers(self):
+        tradeables = self.live_tradeables()
+        result = simulation.PayoutSimulator(self.tiers).run(tradeables, n_sims=4000, seed=7)
+
+        self.assertAlmostEqual(float(result.expected_payout.sum()), 60)
+        fair_values = result.fair_values()
+        best = max(tradeables, key=lambda tradeable: tradeable.fpts_proj_live)
+        self.assertEqual(max(fair_values, key=fair_values.get), best.tradeable_id)
+
+    def test_process_pool_matches_single_process(self):
+        tradeables = self.live_tradeables()
+        single = simulation.PayoutSimulator(self.tiers).run(tradeables, n_sims=4000, seed=7)
+        with simulation.PayoutSimulator(self.tiers, workers=2, chunk_size=1000) as simulator:
+            pooled = simulator.run(tradeables, n_sims=4000, seed=7)
+            pool = simulator._executor
+            again = simulator.run(tradeables, n_sims=4000, seed=7)
+            # the pool is kept between runs
+            self.assertIs(simulator._executor, pool)
+        self.assertIsNone(simulator._executor)
+        self.assertAlmostEqual(float(pooled.expected_payout.sum()), 60)
+        self.assertLess(abs(pooled.expected_payout - single.expected_payout).max(), 1.5)
+        self.assertLess(abs(again.expected_payout - pooled.expected_payout).max(), 1e-9)
+
+    def test_n_sims_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            simulation.PayoutSimulator(self.tiers).run(self.live_tradeables(), n_sims=0)
+
+
+class TestParsePool(TestCase):
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_large_pages_are_parsed_in_workers(self, get_game_logs_mock):
+        mock_game_log_response = mock.Mock(status_code=200)
+        mock_game_log_response.content = json.dumps(game_logs_res).encode()
+        get_game_logs_mock.return_value = mock_game_log_response
+
+        with parsing.ParsePool(workers=1, threshold=1024) as pool:
+            mock_client = client.Client(_test_secret_key, _test_api_key, parse_pool=pool)
+            mock_client.auth = _test_auth_dict
+            game_logs, count = mock_client.get_game_logs(include_game=True, include_team=True, include_count=True)
+            self.assertIsNotNone(pool._executor)
+
+        self.assertEqual(count, game_logs_res['count'])
+        self.assertEqual(len(game_logs), 100)
+        self.assertIsInstance(game_logs[15].entity, objects.Entity)
+        self.assertIsInstance(game_logs[15].game, objects.Game)
+
+    def test_pool_takes_parsing_off_the_calling_thread(self):
+        pages = [json.dumps(dict(game_logs_res, start=page)).encode() for page in range(6)]
+        inline = parsing.ParsePool(threshold=10 ** 9)
+        started = time.thread_time()
+        expected = list(inline.parse_many(pages, 'game_logs', objects.GameLog))
+        inline_time = time.thread_time() - started
+
+        with parsing.ParsePool(workers=1, threshold=1024) as pool:
+            # start the worker before timing
+            pool.parse(pages[0], 'game_logs', objects.GameLog)
+            started = time.thread_time()
+            parsed = list(pool.parse_many(pages, 'game_logs', objects.GameLog))
+            pooled_time = time.thread_time() - started
+
+        # the calling thread only submits pages and waits for them
+        self.assertLess(pooled_time, inline_time)
+        self.assertEqual([res['start'] for _, res in parsed], list(range(6)))
+        self.assertEqual([len(objs) for objs, _ in parsed], [len(objs) for objs, _ in expected])
+        # ids are interned once, in this process
+        self.assertIs(parsed[0][0][0].entity_id, parsed[5][0][0].entity_id)
+        self.assertIs(parsed[0][0][0].entity_id, expected[0][0][0].entity_id)
+
+    def test_small_responses_are_parsed_inline(self):
+        pool = parsing.ParsePool(threshold=10 ** 9)
+        orders, res = pool.parse(json.dumps(orders_res).encode(), 'orders', objects.Order)
+
+        self.assertIsNone(pool._executor)
+        self.assertEqual(len(orders), len(orders_res['orders']))
+        self.assertEqual(res['count'], orders_res['count'])
+
+
+class TestFieldSets(TestCase):
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_prices_preset(self, get_event_mock):
+        mock_event_response = mock.Mock(status_code=200)
+        mock_event_response.json.return_value = event_res
+        get_event_mock.return_value = mock_event_response
+        mock_client = client.Client(_test_secret_key, _test_api_key)
+        mock_client.auth = _test_auth_dict
+
+        event = mock_client.get_event(event_res['event']['id'], fields='prices')
+
+        self.assertEqual(get_event_mock.call_args[1]['params'], {'include': "['tradeables']"})
+        self.assertEqual(event.games, [])
+        self.assertEqual(len(event.tradeables), 81)
+        tradeable = event.tradeables[0]
+        self.assertEqual(tradeable.bid, event_res['event']['tradeables'][0]['price']['bid'])
+        self.assertIsNone(tradeable.name)
+        self.assertEqual(tradeable.stats, {})
+
+    def test_unknown_preset(self):
+        with self.assertRaises(KeyError):
+            fields.resolve('bios')
+
+
+class TestEventPoller(TestCase):
+
+    def live_event(self, **changes):
+        event = json.loads(json.dumps(event_res['event']))
+        event.update(status='live', close_at_estimated=round((time.time() + 3600) * 1000))
+        event.update(changes)
+        return objects.Event(event)
+
+    def test_interval_adapts_to_changes_and_deadlines(self):
+        mock_client = mock.Mock(api_key='jm_key_poller')
+        mock_client.get_event.return_value = self.live_event()
+        event_poller = poller.EventPoller(mock_client, 'evt_poller')
+        received = []
+        event_poller.subscribe(lambda event, changed: received.append(len(changed)))
+
+        event_poller.poll()
+        self.assertEqual(received, [81])
+        self.assertEqual(event_poller.interval, 5)
+        event_poller.poll()
+        event_poller.poll()
+        self.assertEqual(received, [81])
+        self.assertAlmostEqual(event_poller.interval, 5 * 1.5 ** 2)
+        mock_client.get_event.assert_called_with('evt_poller', fields='prices')
+
+        closing = round((time.time() + 20) * 1000)
+        mock_client.get_event.return_value = self.live_event(close_at_estimated=closing)
+        event_poller.poll()
+        self.assertLessEqual(event_poller.interval, 5)
+
+    def test_for_event_rejects_different_settings(self):
+        mock_client = mock.Mock(api_key='jm_key_for_event')
+        first = poller.EventPoller.for_event(mock_client, 'evt_shared', min_interval=5, budget=20)
+        try:
+            self.assertIs(poller.EventPoller.for_event(mock_client, 'evt_shared'), first)
+            self.assertIs(poller.EventPoller.for_event(mock_client, 'evt_shared', budget=20), first)
+            with self.assertRaises(ValueError):
+                poller.EventPoller.for_event(mock_client, 'evt_shared', min_interval=1)
+        finally:
+            poller.EventPoller._POLLERS.pop(('jm_key_for_event', 'evt_shared'), None)
+
+    def test_single_flight_shares_in_flight_calls(self):
+        flights = poller.SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return 'prices'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flights.do('evt', fetch)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flights.do('evt', fetch))) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('prices', False)] + [('prices', True)] * 4)
+
+    def test_single_flight_waiters_respect_the_deadline(self):
+        flights = poller.SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def fetch():
+            started.set()
+            release.wait(5)
+            return 'prices'
+
+        leader = threading.Thread(target=lambda: flights.do('evt', fetch))
+        leader.start()
+        started.wait(5)
+        try:
+            with timeouts.deadline(0.05):
+                with self.assertRaises(exception.DeadlineExceeded):
+                    flights.do('evt', fetch)
+        finally:
+            release.set()
+            leader.join()
+
+
+class TestRetryPolicy(TestCase):
+
+    @staticmethod
+    def _unavailable():
+        error = exception.ServerError('unavailable')
+        error.status_code = 503
+        return error
+
+    @staticmethod
+    def _response(status_code, body):
+        response = mock.Mock(status_code=status_code, headers={})
+        response.json.return_value = body
+        return response
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_get_retried_with_params(self, get_mock):
+        get_mock.side_effect = [self._response(502, {'status': 'error', 'error': 'bad_gateway'}),
+                                self._response(200, events_res)]
+        mock_client = client.Client(_test_secret_key, _test_api_key, retry_policy=retry.RetryPolicy(base=0))
+        mock_client.auth = _test_auth_dict
+
+        events = mock_client.get_events(league='nba')
+
+        self.assertEqual(len(events), len(events_res['events']))
+        self.assertEqual(get_mock.call_count, 2)
+        self.assertEqual(get_mock.call_args_list[0][1]['params'], get_mock.call_args_list[1][1]['params'])
+
+    @mock.patch('jockmkt_sdk.client.requests.post')
+    def test_orders_not_retried_after_server_error(self, post_mock):
+        post_mock.return_value = self._response(500, {'status': 'error', 'error': 'internal_error'})
+        mock_client = client.Client(_test_secret_key, _test_api_key, retry_policy=retry.RetryPolicy(base=0))
+        mock_client.auth = _test_auth_dict
+
+        with self.assertRaises(exception.ServerError):
+            mock_client.place_order('tdbl_xxx', price=10)
+        self.assertEqual(post_mock.call_count, 1)
+
+    def test_budget_and_hedging(self):
+        policy = retry.RetryPolicy(base=0, budget=1)
+        calls = []
+
+        def failing(attempt):
+            calls.append(attempt)
+            raise self._unavailable()
+
+        with self.assertRaises(exception.ServerError):
+            policy.call('get', 'events', failing)
+        self.assertEqual(calls, [0, 1])
+
+        hedging = retry.RetryPolicy(hedge_after=0.05)
+
+        def slow_first(attempt):
+            calls.append(attempt)
+            if len(calls) == 3:
+                time.sleep(0.5)
+                return 'slow'
+            return 'fast'
+
+        self.assertEqual(hedging.call('get', 'events', slow_first), 'fast')
+
+    def test_call_async(self):
+        policy = retry.RetryPolicy(base=0)
+        calls = []
+
+        def flaky(attempt):
+            calls.append(attempt)
+            if attempt == 0:
+                raise self._unavailable()
+            return 'ok'
+
+        self.assertEqual(asyncio.new_event_loop().run_until_complete(policy.call_async('get', 'events', flaky)), 'ok')
+        self.assertEqual(calls, [0, 1])
+
+
+class TestTimeouts(TestCase):
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_timeouts_are_typed(self, get_mock):
+        get_mock.side_effect = client.requests.exceptions.ReadTimeout('stalled')
+        mock_client = client.Client(_test_secret_key, _test_api_key, retry_policy=retry.RetryPolicy(max_retries=0),
+                                    timeout=(1, 2))
+        mock_client.auth = _test_auth_dict
+
+        with self.assertRaises(exception.RequestTimeout) as raised:
+            mock_client.get_event('evt_xxx')
+        self.assertEqual(raised.exception.phase, 'read')
+        self.assertIn('attempt', raised.exception.timings)
+        self.assertEqual(get_mock.call_args[1]['timeout'], (1, 2))
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_deadline_cancels_retries(self, get_mock):
+        unavailable = mock.Mock(status_code=503, headers={})
+        unavailable.json.return_value = {'status': 'error', 'error': 'internal_error'}
+        get_mock.return_value = unavailable
+        mock_client = client.Client(_test_secret_key, _test_api_key,
+                                    retry_policy=retry.RetryPolicy(base=1, jitter=False))
+        mock_client.auth = _test_auth_dict
+
+        started = time.monotonic()
+        with timeouts.deadline(total=0.5):
+            with self.assertRaises(exception.DeadlineExceeded):
+                mock_client.get_event('evt_xxx')
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(get_mock.call_count, 1)
+
+    def test_rate_limit_waits_respect_the_deadline(self):
+        limiter = ratelimit.RateLimiter(1, period=60)
+        limiter.acquire()
+        started = time.monotonic()
+        with timeouts.deadline(total=0.5):
+            with self.assertRaises(exception.DeadlineExceeded) as raised:
+                limiter.acquire()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertIn('rate_limit_wait', raised.exception.timings)
+
+    @mock.patch('jockmkt_sdk.client.requests.post')
+    def test_auth_token_timeouts_are_typed(self, post_mock):
+        post_mock.side_effect = client.requests.exceptions.ConnectTimeout('unreachable')
+        with self.assertRaises(exception.RequestTimeout) as raised:
+            client._request_auth_token(_test_api_key, _test_secret_key)
+        self.assertEqual(raised.exception.phase, 'connect')
+
+    def test_async_token_refresh_keeps_the_deadline(self):
+        deadlines = []
+
+        def fetch(api_key, secret):
+            deadlines.append(timeouts.current())
+            return dict(_test_auth_dict)
+
+        manager = auth.TokenManager('jm_key_async_deadline', _test_secret_key, fetch, background_refresh=False)
+
+        async def get_token():
+            with timeouts.deadline(total=5) as running:
+                await manager.get_token_async()
+            return running
+
+        loop = asyncio.new_event_loop()
+        try:
+            running = loop.run_until_complete(get_token())
+        finally:
+            loop.close()
+        self.assertIs(deadlines[0], running)
+
+    def test_nested_deadlines_only_shorten(self):
+        with timeouts.deadline(total=10):
+            with timeouts.deadline(total=60, read=1):
+                connect, read = timeouts.request_timeout((3, 30))
+                self.assertLessEqual(timeouts.current().remaining(), 10)
+        self.assertEqual((connect, read), (3, 1))
+        self.assertIsNone(timeouts.current())
+
+
+class TestAccountManager(TestCase):
+
+    @mock.patch('jockmkt_sdk.client.requests.get')
+    def test_fan_out_over_shared_session(self, get_mock):
+        session = mock.Mock()
+        positions_response = mock.Mock(status_code=200)
+        positions_response.json.return_value = position_res
+        session.get.return_value = positions_response
+        manager = accounts.AccountManager({'main': ('secret_a', 'jm_key_a'), 'hedge': ('secret_b', 'jm_key_b')},
+                                          session=session, request_rate_limit=250)
+        for account_client in manager.clients.values():
+            account_client.auth = _test_auth_dict
+
+        positions = manager.get_positions()
+
+        self.assertEqual(set(positions), {'main', 'hedge'})
+        self.assertEqual(len(manager.merge(positions)), 2 * len(position_res['positions']))
+        self.assertEqual(session.get.call_count, 2)
+        get_mock.assert_not_called()
+        self.assertIsNot(manager.clients['main'].request_limiter, manager.clients['hedge'].request_limiter)
+
+        def fail_hedge(account_client):
+            if account_client.api_key == 'jm_key_b':
+                raise ValueError('unavailable')
+            return account_client.api_key
+
+        results = manager.fan_out(fail_hedge)
+        self.assertEqual(results['main'], 'jm_key_a')
+        self.assertIsInstance(results['hedge'], ValueError)
+        manager.close()
+
+    def test_account_clients_keep_their_own_limits_and_balances(self):
+        manager = accounts.AccountManager({'main': ('secret_c', 'jm_key_c')}, session=mock.Mock(),
+                                          request_rate_limit=250)
+        self.assertEqual(manager.clients['main'].balance, {})
+        # a second budget for the same api key shares the stricter of the two
+        with self.assertLogs('jockmkt_sdk.ratelimit', logging.WARNING):
+            again = manager.add_account('again', 'secret_c', 'jm_key_c', request_rate_limit=100)
+        self.assertIs(again.request_limiter, manager.clients['main'].request_limiter)
+        self.assertEqual(again.request_limiter.limit, 100)
+        with self.assertLogs('jockmkt_sdk.ratelimit', logging.WARNING):
+            looser = manager.add_account('looser', 'secret_c', 'jm_key_c', request_rate_limit=500)
+        self.assertEqual(looser.request_limiter.limit, 100)
+        self.assertIs(manager.add_account('same', 'secret_c', 'jm_key_c').request_limiter,
+                      manager.clients['main'].request_limiter)
+        manager.close()
+
+
+class TestGameStateEngine(TestCase):
+
+    @staticmethod
+    def _game(status, period, clock, home, away, completed):
+        return {'id': 'game_xxx', 'league': 'nhl', 'status': status, 'amount_completed': completed,
+                'state': {'phase': 'regulation', 'clock': clock, 'period': period},
+                'home': {'team_id': 'team_home', 'points': home}, 'away': {'team_id': 'team_away', 'points': away}}
+
+    def test_transitions_and_history(self):
+        engine = gamestate.GameStateEngine()
+        scores, finals = [], []
+        engine.on('score', lambda game, old, new: scores.append((old, new)))
+        engine.on('final', lambda game, old, new: finals.append(game.game_id))
+
+        self.assertEqual(engine.apply(self._game('in_progress', 1, '20:00', 0, 0, 0)), ['update'])
+        self.assertEqual(engine.apply(self._game('in_progress', 1, '20:00', 0, 0, 0)), [])
+        self.assertEqual(engine.apply(self._game('in_progress', 1, '12:31', 1, 0, 0.1)), ['score', 'update'])
+        # a partial update keeps the rest of the state
+        self.assertEqual(engine.apply({'id': 'game_xxx', 'state': {'period': 2, 'clock': '20:00'}}),
+                         ['period_end', 'update'])
+        self.assertEqual(engine.apply(self._game('final', 3, '00:00', 3, 2, 1)),
+                         ['score', 'period_end', 'status', 'final', 'update'])
+
+        game = engine.state('game_xxx')
+        self.assertEqual(scores, [((0, 0), (1, 0)), ((1, 0), (3, 2))])
+        self.assertEqual(finals, ['game_xxx'])
+        self.assertEqual(game.state['phase'], 'regulation')
+        self.assertEqual(len(game.history), 4)
+        self.assertEqual(game.history[-1][1:], ('final', 3, '00:00', 3, 2, 1))
+
+
+class TestLiveProjector(TestCase):
+
+    def test_incremental_projection(self):
+        log_res = next(game_log for game_log in game_logs_res['game_logs']
+                       if game_log['stats'].get('league') == 'mlb')
+        game_log = objects.GameLog(log_res)
+        tradeable = objects.Tradeable({'id': 'tdbl_xxx', 'league': 'mlb', 'entity_id': game_log.entity_id,
+                                       'focus_game_id': game_log.game_id, 'rank': {}})
+        projector = projection.LiveProjector('mlb')
+        projector.add_tradeables([tradeable])
+        changes = []
+        projector.subscribe(changes.append)
+
+        changed = projector.update_game_logs([game_log])
+        # 3.5 points scored, plus 56% of the 6.398 projected for the whole game
+        self.assertAlmostEqual(changed['tdbl_xxx'], 3.5 + 6.39785 * (1 - 0.44), places=3)
+
+        self.assertFalse(projector.update_game_log(game_log))
+        self.assertEqual(projector.recompute(), {})
+        final = objects.Game({'id': game_log.game_id, 'amount_completed': 1})
+        projector.on_message({'object': 'game', 'game': final})
+        self.assertAlmostEqual(projector.projection('tdbl_xxx'), 3.5)
+        self.assertEqual(len(changes), 2)
+        self.assertGreater(projector.updates_per_second, 0)
+
+    def test_nba_projection_matches_fpts_scored(self):
+        tradeable = next(tdbl for tdbl in event_res['event']['tradeables']
+                         if tdbl['entity']['name'] == 'Luka Doncic')
+        game_log = objects.GameLog({'id': 'gl_luka', 'entity_id': tradeable['entity_id'],
+                                    'game_id': tradeable['focus_game_id'], 'stats': tradeable['stats'][0],
+                                    'projected_stats': {'league': 'nba'}})
+        projector = projection.LiveProjector('nba')
+        projector.add_tradeables([objects.Tradeable(tradeable)])
+        projector.update_game(objects.Game({'id': tradeable['focus_game_id'], 'amount_completed': 1}))
+
+        changed = projector.update_game_logs([game_log])
+        # missed_fg (att - made) and the 10 point bonus are derived from the stats
+        self.assertAlmostEqual(changed[tradeable['id']], tradeable['points']['scored'])
+
+    def test_unmatched_keys_are_reported_once(self):
+        projector = projection.LiveProjector('nba')
+        with self.assertLogs('jockmkt_sdk.projection', logging.WARNING) as logs:
+            projector._vector({'points': 20, 'stl_total': 1})
+            projector._vector({'points': 20, 'stl_total': 1})
+        self.assertEqual(len([line for line in logs.output if "key steal " in line]), 1)
+
+
+class TestTradeAggregator(TestCase):
+
+    @staticmethod
+    def _trade(price, quantity, seconds):
+        return objects.Trade({'id': f'trd_{seconds}', 'price': price, 'quantity': quantity, 'tradeable_id': 'tdbl_xxx',
+                              'created_at': 1650000000000 + seconds * 1000})
+
+    def test_bars_vwap_and_ring_buffer(self):
+        aggregator = bars.TradeAggregator(interval=60, size=2, window=120)
+        closed = []
+        aggregator.subscribe(lambda tradeable_id, bar: closed.append(bar))
+        for price, quantity, seconds in [(10, 2, 0), (12, 1, 10), (9, 3, 30)]:
+            aggregator.on_message({'object': 'trade', 'trade': self._trade(price, quantity, seconds)})
+        aggregator.add_trade(self._trade(11, 5, 70))
+
+        self.assertEqual(len(closed), 1)
+        self.assertEqual(tuple(closed[0])[1:], (10, 12, 9, 9, 6, 59, 3))
+        self.assertAlmostEqual(aggregator.vwap('tdbl_xxx'), (59 + 55) / 11)
+        self.assertEqual(aggregator.volume('tdbl_xxx'), 11)
+
+        for seconds in (130, 190, 250):
+            aggregator.add_trade(self._trade(20, 1, seconds))
+        # only the last `size` bars are kept, and the rolling window drops bars that left it
+        self.assertEqual([bar.close for bar in aggregator.bars('tdbl_xxx')], [20, 20])
+        self.assertEqual(aggregator.volume('tdbl_xxx'), 2)
+        exported = aggregator.to_numpy(include_current=True)
+        self.assertEqual(len(exported), 3)
+        self.assertEqual(exported['tradeable_id'][0], 'tdbl_xxx')
+
+    def test_flush_closes_bars_on_time(self):
+        aggregator = bars.TradeAggregator(interval=60, size=10, window=120)
+        closed = []
+        aggregator.subscribe(lambda tradeable_id, bar: closed.append(bar))
+        aggregator.add_trade(self._trade(10, 2, 0))
+
+        start = 1650000000000
+        self.assertEqual(aggregator.flush(start + 59000), {})
+        flushed = aggregator.flush(start + 60000)
+        self.assertEqual(tuple(flushed['tdbl_xxx'])[1:], (10, 10, 10, 10, 2, 20, 1))
+        self.assertEqual(closed, [flushed['tdbl_xxx']])
+        self.assertEqual(aggregator.bars('tdbl_xxx', include_current=True), closed)
+        self.assertEqual(aggregator.volume('tdbl_xxx'), 2)
+        # the closed bar leaves the rolling window once it started more than `window` seconds ago
+        aggregator.flush(start + 121000)
+        self.assertEqual(aggregator.volume('tdbl_xxx'), 0)
+        self.assertIsNone(aggregator.vwap('tdbl_xxx'))
+        self.assertRaises(ValueError, bars.TradeAggregator, interval=60, size=10, window=601)
+
+
+class TestOrderFlowMonitor(TestCase):
+
+    @staticmethod
+    def _order(user_id, side, seconds, tags=None):
+        return objects.PublicOrder({'account': {'id': user_id, 'tags': tags, 'display_name': user_id},
+                                    'tradeable_id': 'tdbl_xxx', 'side': side,
+                                    'created_at': 1650000000000 + seconds * 1000})
+
+    def test_imbalance_users_and_market_makers(self):
+        monitor = orderflow.OrderFlowMonitor(half_life=60, top_k=2)
+        for _ in range(3):
+            monitor.on_message({'object': 'order', 'order': self._order('acct_mm', 'sell', 0, ['market_maker'])})
+        monitor.add_order(self._order('acct_a', 'buy', 0))
+        monitor.add_order(self._order('acct_b', 'buy', 0))
+
+        self.assertAlmostEqual(monitor.imbalance('tdbl_xxx'), (2 - 3) / 5)
+        self.assertEqual(monitor.imbalance('tdbl_xxx', exclude_market_makers=True), 1)
+        # counts halve every half_life
+        buys, sells = monitor.flow('tdbl_xxx', now=1650000000 + 60)
+        self.assertAlmostEqual(buys, 1)
+        self.assertAlmostEqual(sells, 1.5)
+        self.assertIsNone(monitor.imbalance('tdbl_other'))
+
+        self.assertTrue(monitor.is_market_maker('acct_mm'))
+        self.assertFalse(monitor.is_market_maker('acct_a'))
+        self.assertGreaterEqual(monitor.user_orders('acct_mm'), 3)
+        self.assertEqual(monitor.top_users(1), [('acct_mm', 3)])
+
+
+class TestThreadedSocketManager(TestCase):
+
+    class _Manager(object):
+
+        def __init__(self):
+            self.listeners = []
+            self.subscribed = []
+            self.balances = {}
+            self.close = False
+            self.conn = None
+            self._writer = mock.Mock()
+
+        def add_listener(self, listener):
+            self.listeners.append(listener)
+
+        async def subscribe(self, topic, id=None, league=None):
+            self.subscribed.append((topic, id, league))
+
+    def _socket(self, **kwargs):
+        manager = self._Manager()
+
+        async def create(*args, **create_kwargs):
+            return manager
+
+        patcher = mock.patch.object(sockets_update.JockmktSocketManager, 'create', side_effect=create)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        socket = threaded.ThreadedSocketManager(mock.Mock(WS_BASE_URL='wss://test'), [], **kwargs).start(5)
+        self.addCleanup(socket.stop)
+        return socket, manager
+
+    @staticmethod
+    def _emit(socket, manager, messages):
+        # deliver messages from the socket's own thread, as its receive loop would
+        done = threading.Event()
+
+        def emit():
+            for message in messages:
+                manager.listeners[0](message)
+            done.set()
+        socket.loop.call_soon_threadsafe(emit)
+        done.wait(5)
+
+    def test_queue_delivery_drops_oldest_when_behind(self):
+        socket, manager = self._socket(maxsize=2)
+        self.assertNotEqual(socket._thread.ident, threading.get_ident())
+        socket.subscribe('games', league='nba')
+        self.assertEqual(manager.subscribed, [('games', None, 'nba')])
+
+        self._emit(socket, manager, [{'object': 'n', 'n': i} for i in range(3)])
+        self.assertEqual(socket.dropped, 1)
+        self.assertEqual([socket.get(timeout=1)['n'], socket.get(timeout=1)['n']], [1, 2])
+        self.assertRaises(queue.Empty, socket.get, timeout=0.01)
+
+        socket.stop()
+        self.assertFalse(socket.running)
+        self.assertIsNone(socket.get(timeout=1))
+
+    def test_delivers_to_user_loop(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        received = []
+
+        async def handler(message):
+            received.append((message['n'], threading.get_ident()))
+        socket, manager = self._socket(callback=handler, loop=loop)
+        self._emit(socket, manager, [{'object': 'n', 'n': 1}])
+        loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual(received, [(1, threading.get_ident())])
+
+    def test_stream_batches_and_timeout(self):
+        socket, manager = self._socket()
+        self._emit(socket, manager, [{'object': 'n', 'n': i} for i in range(5)])
+        stream = threaded.MessageStream(socket, batch_size=3, timeout=0.05)
+        iterator = iter(stream)
+        self.assertEqual([[m['n'] for m in batch] for batch in (next(iterator), next(iterator))], [[0, 1, 2], [3, 4]])
+        self.assertRaises(exception.RequestTimeout, next, iterator)
+        # the socket is stopped once iteration ends
+        self.assertFalse(socket.running)
+
+    def test_client_stream_yields_messages_until_duration(self):
+        socket, manager = self._socket()
+        self._emit(socket, manager, [{'object': 'n', 'n': i} for i in range(3)])
+        with mock.patch.object(client.Client, 'ws_connect_threaded', return_value=socket) as connect:
+            stream = client.Client('secret', 'key').stream([{'endpoint': 'account'}], duration=0.1)
+            self.assertEqual([message['n'] for message in stream], [0, 1, 2])
+        connect.assert_called_once_with([{'endpoint': 'account'}], maxsize=10000, overflow='drop_oldest')
+        self.assertFalse(socket.running)
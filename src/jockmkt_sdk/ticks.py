@@ -0,0 +1,197 @@
+import logging
+import math
+import os
+import struct
+import time
+
+from .objects import Tradeable
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'JMTICKS1'
+HEADER = struct.Struct('<8sI4x')
+ID_WIDTH = 40
+PRICE_FIELDS = ('bid', 'ask', 'last', 'estimated', 'fpts_proj_live')
+RECORD = struct.Struct('<{}sq{}d'.format(ID_WIDTH, len(PRICE_FIELDS)))
+
+
+def tick_dtype():
+    """
+    the numpy dtype of one tick record: tradeable_id (bytes), timestamp (ms), then one float64 per PRICE_FIELDS entry.
+    Missing prices are stored as NaN.
+    """
+    import numpy as np
+    return np.dtype([('tradeable_id', 'S{}'.format(ID_WIDTH)), ('timestamp', '<i8')] +
+                    [(field, '<f8') for field in PRICE_FIELDS])
+
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+class TickWriter(object):
+    """
+    Appends tradeable price ticks to a binary file of fixed-width records:
+
+    - a 16 byte header (magic, record size)
+    - one RECORD per tick: tradeable_id, timestamp in ms, bid, ask, last, estimated, fpts_proj_live
+
+    Files are append-only, so a writer can be attached to a live socket and a :class:`TickReader` can map the same
+    file at any time. One file per event keeps files small and makes whole events easy to load or delete.
+
+    .. code-block:: python
+
+        writer = TickWriter(f'ticks/{event_id}.ticks')
+        writer.attach(socket_manager)
+
+    :ivar path:   the file ticks are appended to
+    :ivar dedupe: skip ticks whose prices did not change since the tradeable's previous tick, default: True
+    """
+
+    def __init__(self, path: str, dedupe: bool = True):
+        self.path = path
+        self.dedupe = dedupe
+        self._last = {}
+        self._managers = []
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, 'rb') as f:
+                _check_header(f.read(HEADER.size), path)
+        self._file = open(path, 'ab')
+        if not exists:
+            self._file.write(HEADER.pack(MAGIC, RECORD.size))
+
+    def write(self, tradeable_id: str, timestamp: int, bid: float = None, ask: float = None, last: float = None,
+              estimated: float = None, fpts_proj_live: float = None) -> bool:
+        """
+        appends a tick
+
+        :returns: whether the tick was written (False if dedupe is on and nothing changed)
+        :rtype: bool
+        """
+        key = tradeable_id.encode()
+        if len(key) > ID_WIDTH:
+            raise ValueError(f'tradeable id {tradeable_id} is longer than {ID_WIDTH} bytes')
+        prices = (_float(bid), _float(ask), _float(last), _float(estimated), _float(fpts_proj_live))
+        if self.dedupe:
+            previous = self._last.get(key)
+            if previous is not None and _same(previous, prices):
+                return False
+            self._last[key] = prices
+        self._file.write(RECORD.pack(key, int(timestamp), *prices))
+        return True
+
+    def write_tradeable(self, tradeable: Tradeable, timestamp: int = None) -> bool:
+        """
+        appends a tick from a :class:`objects.Tradeable`, timestamped with its updated_at unless given
+        """
+        if timestamp is None:
+            timestamp = tradeable.updated_at or round(time.time() * 1000)
+        return self.write(tradeable.tradeable_id, timestamp, tradeable.bid, tradeable.ask, tradeable.last,
+                          tradeable.estimated, tradeable.fpts_proj_live)
+
+    def on_message(self, message: dict):
+        """
+        socket listener: records every tradeable message
+        """
+        if message.get('object') == 'tradeable':
+            self.write_tradeable(message['tradeable'])
+
+    def attach(self, socket_manager):
+        """
+        records the tradeable messages a socket manager receives
+        """
+        socket_manager.add_listener(self.on_message)
+        self._managers.append(socket_manager)
+
+    def flush(self):
+        """
+        makes written ticks visible to readers
+        """
+        self._file.flush()
+
+    def close(self):
+        for manager in self._managers:
+            manager.remove_listener(self.on_message)
+        self._managers = []
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _same(a: tuple, b: tuple) -> bool:
+    return all(x == y or (math.isnan(x) and math.isnan(y)) for x, y in zip(a, b))
+
+
+def _check_header(header: bytes, path: str):
+    if len(header) < HEADER.size:
+        raise ValueError(f'{path} is not a tick file')
+    magic, record_size = HEADER.unpack(header)
+    if magic != MAGIC or record_size != RECORD.size:
+        raise ValueError(f'{path} is not a tick file, or was written by an incompatible version')
+
+
+class TickReader(object):
+    """
+    Memory-maps a tick file written by :class:`TickWriter`. Nothing is read into memory until it is used: ``ticks``
+    is a read-only numpy structured array backed by the file, and columns (``reader['bid']``) are views of it.
+    Requires numpy.
+
+    .. code-block:: python
+
+        reader = TickReader(f'ticks/{event_id}.ticks')
+        spread = reader['ask'] - reader['bid']
+        history = reader.tradeable('tdbl_xxx')
+
+    Ticks are in the order they were written. A trailing partial record (e.g. from a writer that is still running)
+    is ignored; open a new reader to see ticks written since.
+
+    :ivar path:  the mapped file
+    :ivar ticks: the numpy structured array of ticks, see :func:`tick_dtype`
+    """
+
+    def __init__(self, path: str):
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError('TickReader requires numpy: pip install numpy')
+        self.path = path
+        with open(path, 'rb') as f:
+            _check_header(f.read(HEADER.size), path)
+        count = (os.path.getsize(path) - HEADER.size) // RECORD.size
+        if count == 0:
+            self.ticks = np.empty(0, dtype=tick_dtype())
+        else:
+            self.ticks = np.memmap(path, dtype=tick_dtype(), mode='r', offset=HEADER.size, shape=(count,))
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __getitem__(self, item):
+        return self.ticks[item]
+
+    def tradeable_ids(self) -> list:
+        """
+        the distinct tradeable ids in the file
+        """
+        import numpy as np
+        return [tradeable_id.decode() for tradeable_id in np.unique(self.ticks['tradeable_id'])]
+
+    def tradeable(self, tradeable_id: str):
+        """
+        the ticks of one tradeable, as a (copied) structured array
+        """
+        return self.ticks[self.ticks['tradeable_id'] == tradeable_id.encode()]
+
+    def between(self, start: int = None, end: int = None):
+        """
+        the ticks with start <= timestamp < end, timestamps in ms
+        """
+        mask = self.ticks['timestamp'] >= (start if start is not None else -2 ** 63)
+        if end is not None:
+            mask &= self.ticks['timestamp'] < end
+        return self.ticks[mask]
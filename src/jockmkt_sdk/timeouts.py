@@ -0,0 +1,152 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple, Union
+
+import requests
+
+from .exception import DeadlineExceeded, RequestTimeout
+
+log = logging.getLogger(__name__)
+
+# (connect, read) seconds for each attempt of a request
+DEFAULT_TIMEOUT = (3.05, 30)
+
+_CURRENT = contextvars.ContextVar('jockmkt_deadline', default=None)
+
+
+def _pair(timeout: Union[float, Tuple[float, float], None]) -> Tuple[Optional[float], Optional[float]]:
+    if timeout is None:
+        return None, None
+    if isinstance(timeout, (int, float)):
+        return timeout, timeout
+    return tuple(timeout)
+
+
+class Deadline(object):
+    """
+    Time limits for a call and everything it does: auth refresh, every attempt and the waits between retries. Created
+    with :func:`deadline` and found by the client through a context variable, so it follows the call through threads
+    started for it (hedged requests) and asyncio tasks.
+
+    :ivar total:    seconds the whole call may take, or None for no limit
+    :ivar connect:  seconds each attempt may spend connecting, or None for the client's default
+    :ivar read:     seconds each attempt may wait for the response, or None for the client's default
+    :ivar started:  time.monotonic() when the deadline started
+    :ivar attempts: requests sent under the deadline so far
+    """
+
+    def __init__(self, total: float = None, connect: float = None, read: float = None, parent: 'Deadline' = None):
+        self.started = time.monotonic()
+        self.total = total
+        self.connect = connect
+        self.read = read
+        self.attempts = 0
+        self._expires_at = None if total is None else self.started + total
+        if parent is not None:
+            # a nested deadline can shorten its parent's, never extend it
+            if parent._expires_at is not None and (self._expires_at is None or parent._expires_at < self._expires_at):
+                self._expires_at = parent._expires_at
+            self.connect = parent.connect if connect is None else connect
+            self.read = parent.read if read is None else read
+
+    def remaining(self) -> Optional[float]:
+        """
+        :returns: seconds left, or None without a total limit
+        :rtype: float
+        """
+        if self._expires_at is None:
+            return None
+        return self._expires_at - time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def timings(self, **extra) -> dict:
+        """the timing breakdown attached to timeout errors"""
+        timings = {'elapsed': round(self.elapsed, 4), 'attempts': self.attempts, 'total': self.total,
+                   'connect': self.connect, 'read': self.read}
+        timings.update(extra)
+        return timings
+
+    def check(self, what: str = 'request'):
+        """
+        :raises DeadlineExceeded: if the deadline has passed
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f'deadline of {self.total}s exceeded before {what}', phase='deadline',
+                                   timings=self.timings())
+
+    def __repr__(self):
+        return str(self.__dict__) + '\n'
+
+
+def current() -> Optional[Deadline]:
+    """
+    :returns: the deadline of the running call, if any
+    :rtype: Deadline
+    """
+    return _CURRENT.get()
+
+
+@contextmanager
+def deadline(total: float = None, connect: float = None, read: float = None):
+    """
+    limits the block as a whole: every client call made inside it shares one :class:`Deadline`, so ``total`` is spread
+    over all of them, not granted to each. Nested deadlines can only shorten the enclosing one.
+
+    .. code-block:: python
+
+        with deadline(total=0.5, connect=0.2):
+            client.place_order(tradeable_id, price=10)
+
+    :param total: seconds the whole block may take, including every call's retries, auth refresh and rate limit waits
+    :param connect: seconds each attempt may spend connecting
+    :param read: seconds each attempt may wait for the response
+    """
+    token = _CURRENT.set(Deadline(total, connect, read, parent=_CURRENT.get()))
+    try:
+        yield _CURRENT.get()
+    finally:
+        _CURRENT.reset(token)
+
+
+def request_timeout(default=DEFAULT_TIMEOUT, what: str = 'request') -> Tuple[float, float]:
+    """
+    the (connect, read) timeout for the next request: the current deadline's, or ``default``, shortened to fit in what
+    remains of the deadline
+
+    :raises DeadlineExceeded: if the deadline has already passed
+    """
+    connect, read = _pair(default)
+    running = current()
+    if running is None:
+        return connect, read
+    running.check(what)
+    running.attempts += 1
+    connect = running.connect if running.connect is not None else connect
+    read = running.read if running.read is not None else read
+    remaining = running.remaining()
+    if remaining is not None:
+        connect = remaining if connect is None else min(connect, remaining)
+        read = remaining if read is None else min(read, remaining)
+    return connect, read
+
+
+def timeout_error(error: requests.exceptions.Timeout, method: str, path: str, attempt_started: float,
+                  timeout: Tuple[float, float]) -> RequestTimeout:
+    """
+    converts a requests timeout into a :class:`exception.RequestTimeout` with a timing breakdown
+    """
+    phase = 'connect' if isinstance(error, requests.exceptions.ConnectTimeout) else 'read'
+    timings = {'attempt': round(time.monotonic() - attempt_started, 4), 'connect': timeout[0], 'read': timeout[1]}
+    running = current()
+    if running is not None:
+        timings = running.timings(**timings)
+    remaining = running.remaining() if running is not None else None
+    exception_type = DeadlineExceeded if remaining is not None and remaining <= 0 else RequestTimeout
+    log.debug('%s %s timed out (%s): %s', method.upper(), path, phase, timings)
+    return exception_type(f'{method.upper()} {path} timed out while {phase}ing', phase=phase, timings=timings)
@@ -0,0 +1,233 @@
+import logging
+import threading
+from typing import Dict, List, Union
+
+from .objects import Position, Tradeable
+
+log = logging.getLogger(__name__)
+
+MARKS = ('last', 'bid', 'estimated', 'final')
+
+
+class Portfolio(object):
+    """
+    The running valuation of one account's positions in one event. Totals are updated by the delta of each position or
+    price change, never recomputed from scratch. Created and updated by :class:`ValuationEngine`.
+
+    :ivar event_id:         the event
+    :ivar account:          the account label passed to the engine, default: None
+    :ivar positions:        the account's :class:`objects.Position` objects by tradeable_id
+    :ivar market_value:     sum of shares owned * mark price
+    :ivar estimated_payout: sum of shares owned * the payout at each tradeable's current rank
+    :ivar cost_basis:       total spent on shares currently owned
+    :ivar realized_pnl:     profit from shares already sold: proceeds_all_time - cost of shares no longer owned
+    """
+
+    def __init__(self, event_id: str, account: str = None):
+        self.event_id = event_id
+        self.account = account
+        self.positions = {}
+        self.market_value = 0.0
+        self.estimated_payout = 0.0
+        self.cost_basis = 0.0
+        self.realized_pnl = 0.0
+        self._values = {}
+
+    @property
+    def unrealized_pnl(self) -> float:
+        """market value of shares owned minus their cost"""
+        return self.market_value - self.cost_basis
+
+    @property
+    def pnl(self) -> float:
+        """mark-to-market profit: realized + unrealized"""
+        return self.realized_pnl + self.unrealized_pnl
+
+    @property
+    def payout_pnl(self) -> float:
+        """profit if the event finished with the current ranks: realized + estimated payout - cost of shares owned"""
+        return self.realized_pnl + self.estimated_payout - self.cost_basis
+
+    @staticmethod
+    def _realized(position: Position) -> float:
+        return (position.proceeds_all_time or 0) - ((position.cost_basis_all_time or 0) - (position.cost_basis or 0))
+
+    def _set_position(self, position: Position):
+        old = self.positions.get(position.tradeable_id)
+        if old is not None:
+            self.cost_basis -= old.cost_basis or 0
+            self.realized_pnl -= self._realized(old)
+        self.positions[position.tradeable_id] = position
+        self.cost_basis += position.cost_basis or 0
+        self.realized_pnl += self._realized(position)
+
+    def _revalue(self, tradeable_id: str, price: float, payout: float):
+        position = self.positions.get(tradeable_id)
+        quantity = (position.quantity_owned or 0) if position is not None else 0
+        value = (quantity * price, quantity * payout)
+        old = self._values.get(tradeable_id, (0.0, 0.0))
+        self._values[tradeable_id] = value
+        self.market_value += value[0] - old[0]
+        self.estimated_payout += value[1] - old[1]
+
+    def __repr__(self):
+        return str(self.__dict__) + '\n'
+
+    def __str__(self):
+        return str(self.__dict__) + '\n'
+
+
+class ValuationEngine(object):
+    """
+    Joins positions with live tradeable prices and keeps the mark-to-market value, P&L and estimated payout of many
+    portfolios (one per account and event) up to date. Each position or price update costs O(1) per portfolio holding
+    that tradeable, so hundreds of entries can be valued from one stream of socket messages.
+
+    Tradeables are marked at their ``final`` price once it is set, otherwise at ``mark`` (falling back to estimated).
+    Estimated payouts use the event's payout tiers and each tradeable's final rank, or its live projected rank before
+    that.
+
+    .. code-block:: python
+
+        engine = ValuationEngine(mark='bid')
+        engine.load(client, event_id)
+        engine.attach(socket_manager)
+        print(engine.portfolio(event_id).pnl)
+
+    :ivar mark: price used to value shares: one of 'last', 'bid', 'estimated' or 'final', default: 'estimated'
+    """
+
+    def __init__(self, mark: str = 'estimated'):
+        if mark not in MARKS:
+            raise ValueError(f'mark must be one of {MARKS}')
+        self.mark = mark
+        self._lock = threading.RLock()
+        self._portfolios = {}
+        self._holders = {}
+        self._marks = {}
+        self._tiers = {}
+        self._managers = []
+
+    def _price(self, tradeable: Tradeable) -> float:
+        for price in (tradeable.final, getattr(tradeable, self.mark), tradeable.estimated):
+            if price is not None:
+                return float(price)
+        return 0.0
+
+    @staticmethod
+    def _rank(tradeable: Tradeable):
+        for rank in (tradeable.rank_final, tradeable.rank_proj_live, tradeable.rank_proj_pregame):
+            if rank is not None:
+                return rank
+        return None
+
+    def _payout(self, event_id: str, rank) -> float:
+        return self._tiers.get(event_id, {}).get(rank, 0.0)
+
+    def portfolio(self, event_id: str, account: str = None) -> Portfolio:
+        """
+        the portfolio of an account in an event, created empty if necessary
+
+        :rtype: Portfolio
+        """
+        with self._lock:
+            key = (account, event_id)
+            portfolio = self._portfolios.get(key)
+            if portfolio is None:
+                portfolio = self._portfolios[key] = Portfolio(event_id, account)
+            return portfolio
+
+    def portfolios(self) -> List[Portfolio]:
+        """
+        :rtype: List[Portfolio]
+        """
+        return list(self._portfolios.values())
+
+    def set_payouts(self, event_id: str, payouts: Union[List[Dict], Dict]):
+        """
+        sets an event's payout tiers and revalues its tradeables
+
+        :param payouts: a list of {'position': rank, 'amount': payout per share}, as in Event.payouts, or the response
+            of Client.get_event_payouts
+        :type payouts: list or dict, required
+        """
+        if isinstance(payouts, dict):
+            payouts = payouts.get('payouts', [])
+        with self._lock:
+            self._tiers[event_id] = {tier['position']: float(tier['amount']) for tier in payouts}
+            for tradeable_id, (tradeable_event_id, price, rank, _) in list(self._marks.items()):
+                if tradeable_event_id == event_id:
+                    self._apply_mark(tradeable_id, event_id, price, rank)
+
+    def _apply_mark(self, tradeable_id: str, event_id: str, price: float, rank):
+        payout = self._payout(event_id, rank)
+        self._marks[tradeable_id] = (event_id, price, rank, payout)
+        for portfolio in self._holders.get(tradeable_id, {}).values():
+            portfolio._revalue(tradeable_id, price, payout)
+
+    def update_tradeable(self, tradeable: Tradeable):
+        """
+        applies a tradeable's latest price and rank to every portfolio holding it
+        """
+        with self._lock:
+            self._apply_mark(tradeable.tradeable_id, tradeable.event_id, self._price(tradeable), self._rank(tradeable))
+
+    def update_position(self, position: Position, account: str = None):
+        """
+        applies a position update to the account's portfolio
+        """
+        with self._lock:
+            portfolio = self.portfolio(position.event_id, account)
+            portfolio._set_position(position)
+            self._holders.setdefault(position.tradeable_id, {})[(account, position.event_id)] = portfolio
+            _, price, _, payout = self._marks.get(position.tradeable_id, (None, 0.0, None, 0.0))
+            portfolio._revalue(position.tradeable_id, price, payout)
+
+    def on_message(self, message: dict, account: str = None):
+        """
+        socket listener: applies tradeable and position messages
+        """
+        obj = message.get(message.get('object'))
+        if isinstance(obj, Tradeable):
+            self.update_tradeable(obj)
+        elif isinstance(obj, Position):
+            self.update_position(obj, account)
+
+    def attach(self, socket_manager, account: str = None):
+        """
+        keeps the engine up to date with a socket manager's tradeable and position messages. Subscribe the manager to
+        'account' and to each 'event' being valued.
+
+        :param account: the portfolio label for the positions this socket receives, e.g. when valuing entries from
+            several accounts with one engine
+        :type account: str, optional
+        """
+        def listener(message):
+            self.on_message(message, account)
+        socket_manager.add_listener(listener)
+        self._managers.append((socket_manager, listener))
+
+    def detach(self):
+        for manager, listener in self._managers:
+            manager.remove_listener(listener)
+        self._managers = []
+
+    def load(self, client, event_id: str, account: str = None) -> Portfolio:
+        """
+        seeds an event's payouts, tradeables and the account's positions from the REST api
+
+        :param client: the client of the account
+        :type client: client.Client, required
+
+        :returns: the account's portfolio in the event
+        :rtype: Portfolio
+        """
+        event = client.get_event(event_id)
+        if event.payouts:
+            self.set_payouts(event_id, event.payouts)
+        for tradeable in event.tradeables:
+            self.update_tradeable(tradeable)
+        for position in client.get_positions():
+            if position.event_id == event_id:
+                self.update_position(position, account)
+        return self.portfolio(event_id, account)